@@ -0,0 +1,2 @@
+# Benchmarks for performance-sensitive parts of the bot.
+# Run them from the repository root, e.g. python -m bench.messages
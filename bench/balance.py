@@ -0,0 +1,237 @@
+""" Estimate how balanced each game mode is, by simulating many games across a process pool.
+
+Games are played by the scripted players of bench.simulate, through the real role commands. By
+default, players follow simple heuristics: wolves never target their allies, and everyone tends to
+vote for whoever already has the most votes, so that lynches happen. With --agent random, every
+choice is made at random.
+
+Every worker process imports the bot once, and plays its share of the games against its own database.
+Once all games are played, the worker databases are bulk-loaded into a results database that uses the
+bot's schema (the game tables and the stats tables built from them), in the data.sqlite3 file of the
+--output directory. Results accumulate across runs, and databases from other runs can be bulk-loaded
+with --load. Team win rates per game size and, with --roles, win rates per role are then reported for
+every mode. With --compare, the same figures from another database (such as the bot's live database)
+are shown alongside.
+
+Usage: python -m bench.balance [--games N] [--sizes MIN-MAX] [--workers N] [--seed N] [--agent {heuristic,random}]
+                               [--output DIR] [--load DB ...] [--compare DB] [--roles] [mode ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Optional
+
+import src # initialize the bot (config, messages, roles)
+from src import db
+from src.gamemodes import GAME_MODES
+from src.gamestate import GameState
+from src.roles.helper.wolves import is_known_wolf_ally
+from src.users import User
+from src.votes import VOTES
+from bench import simulate
+
+# Number of games played by a worker at a time
+CHUNK_SIZE = 25
+# Probability that a player votes for whoever has the most votes, instead of choosing on their own
+BANDWAGON_CHANCE = 0.5
+
+class HeuristicAgent(simulate.Agent):
+    """Scripted player which never targets known wolf allies, and tends to vote with the majority."""
+    def targets(self, var: GameState, alive: list[User], command: str, count: int = 2) -> list[User]:
+        others = [p for p in alive if p is not self.user and not is_known_wolf_ally(var, self.user, p)]
+        if not others:
+            return super().targets(var, alive, command, count)
+        return self.rng.sample(others, min(count, len(others)))
+
+    def vote(self, var: GameState, alive: list[User]) -> User:
+        leading = [p for p, voters in VOTES.items() if voters and p in alive and not is_known_wolf_ally(var, self.user, p)]
+        if leading and self.rng.random() < BANDWAGON_CHANCE:
+            return max(leading, key=lambda p: len(VOTES[p]))
+        return super().vote(var, alive)
+
+AGENTS = {"heuristic": HeuristicAgent, "random": simulate.Agent}
+
+_sim: Optional[simulate.Simulator] = None
+
+def _init_worker(directory: str, players: int, agent: str):
+    global _sim
+    path = os.path.join(directory, str(os.getpid()))
+    os.mkdir(path)
+    os.chdir(path)
+    _sim = simulate.setup(players, AGENTS[agent])
+
+def _play(task: tuple[str, int, list[str]]) -> tuple[str, int, int, int]:
+    """Play a chunk of games in a worker.
+
+    :return: The mode, game size, number of games played, and number of games which didn't start
+    """
+    mode, size, seeds = task
+    aborted = 0
+    for seed in seeds:
+        if _sim.play(mode, seed, size).winner == "aborted":
+            aborted += 1
+    db.flush()
+    return mode, size, len(seeds), aborted
+
+def parse_sizes(value: str) -> list[int]:
+    low, _, high = value.partition("-")
+    return list(range(int(low), int(high or low) + 1))
+
+def make_tasks(modes: list[str], sizes: list[int], games: int, seed: int) -> list[tuple[str, int, list[str]]]:
+    tasks = []
+    for mode in modes:
+        cls, minimum, maximum, chance = GAME_MODES[mode]
+        for size in sizes:
+            if not minimum <= size <= maximum:
+                continue
+            seeds = [f"{seed}:{mode}:{size}:{i}" for i in range(games)]
+            for i in range(0, games, CHUNK_SIZE):
+                tasks.append((mode, size, seeds[i:i + CHUNK_SIZE]))
+    return tasks
+
+def simulate_games(tasks, players: int, workers: int, agent: str, directory: str):
+    """Play every task across a process pool, leaving a database per worker in directory."""
+    played = aborted = 0
+    start = time.perf_counter()
+    # spawn rather than fork, so that workers don't inherit the database writer thread
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, _init_worker, (directory, players, agent)) as pool:
+        for mode, size, count, failed in pool.imap_unordered(_play, tasks):
+            played += count
+            aborted += failed
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+    print(f"played {played} games in {elapsed:.1f} s ({played / elapsed:.1f} games/s with {workers} workers), "
+          f"{aborted} did not start", file=sys.stderr)
+
+def load(path: str):
+    """Bulk-load every game of another database with the same schema into the current database.
+
+    The stats tables are not updated; call db.check_stats(repair=True) once everything is loaded.
+    """
+    conn = db._conn()
+    conn.commit()
+    c = conn.cursor()
+    c.execute("ATTACH DATABASE ? AS source", (path,))
+    try:
+        # players are matched by account, since ids differ between databases
+        c.execute("SELECT id, account_display FROM source.player")
+        players = [(plid, db._get_ids(account, add=True)[1]) for plid, account in c.fetchall()]
+        c.execute("CREATE TEMP TABLE player_map (source INTEGER PRIMARY KEY, target INTEGER NOT NULL)")
+        c.executemany("INSERT INTO temp.player_map (source, target) VALUES (?, ?)", players)
+        c.execute("SELECT COALESCE(MAX(id), 0) FROM main.game")
+        game_offset = c.fetchone()[0]
+        c.execute("SELECT COALESCE(MAX(id), 0) FROM main.game_player")
+        player_offset = c.fetchone()[0]
+        c.execute("""INSERT INTO main.game (id, gamemode, options, started, finished, gamesize, winner)
+                     SELECT id + ?, gamemode, options, started, finished, gamesize, winner
+                     FROM source.game""", (game_offset,))
+        c.execute("""INSERT INTO main.game_player (id, game, player, team_win, indiv_win, dced)
+                     SELECT gp.id + ?, gp.game + ?, pm.target, gp.team_win, gp.indiv_win, gp.dced
+                     FROM source.game_player gp
+                     JOIN temp.player_map pm
+                       ON pm.source = gp.player""", (player_offset, game_offset))
+        c.execute("""INSERT INTO main.game_player_role (game_player, role, special)
+                     SELECT game_player + ?, role, special
+                     FROM source.game_player_role""", (player_offset,))
+        c.execute("DROP TABLE temp.player_map")
+        conn.commit()
+    finally:
+        c.execute("DETACH DATABASE source")
+
+def team_rates(conn: sqlite3.Connection, mode: str) -> dict[int, Counter]:
+    c = conn.cursor()
+    c.execute("SELECT gamesize, winner, games FROM stats_game WHERE gamemode = ?", (mode,))
+    result: dict[int, Counter] = defaultdict(Counter)
+    for size, winner, games in c:
+        result[size][winner or "no winner"] += games
+    return result
+
+def role_rates(conn: sqlite3.Connection, mode: str) -> dict[str, tuple[int, int]]:
+    c = conn.cursor()
+    c.execute("SELECT role, overall_wins, games FROM stats_role WHERE gamemode = ?", (mode,))
+    return {role: (wins, games) for role, wins, games in c}
+
+def format_teams(teams: list[str], winners: Counter) -> str:
+    total = sum(winners.values())
+    rates = "  ".join(f"{team} {winners[team] / total:6.1%}" for team in teams)
+    return f"{total:6} games  {rates}"
+
+def report(results: sqlite3.Connection, live: Optional[sqlite3.Connection], modes: list[str], roles: bool):
+    for mode in modes:
+        simulated = team_rates(results, mode)
+        if not simulated:
+            continue
+        compared = team_rates(live, mode) if live else {}
+        print(mode)
+        for size in sorted(simulated):
+            teams = sorted(set(simulated[size]) | set(compared.get(size, ())))
+            line = f"  {size:>3}p  {format_teams(teams, simulated[size])}"
+            if compared.get(size):
+                line += f"  | live {format_teams(teams, compared[size])}"
+            print(line)
+        if roles:
+            compared_roles = role_rates(live, mode) if live else {}
+            for role, (wins, games) in sorted(role_rates(results, mode).items()):
+                line = f"  {role:>24}  {wins / games:6.1%} of {games:6}"
+                if role in compared_roles:
+                    live_wins, live_games = compared_roles[role]
+                    line += f"  | live {live_wins / live_games:6.1%} of {live_games:6}"
+                print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate how balanced each game mode is.")
+    parser.add_argument("--games", type=int, default=100, help="Number of games per mode and size")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("8-12"), help="Game sizes, such as 8-12")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="heuristic")
+    parser.add_argument("--output", default="balance", help="Directory of the results database")
+    parser.add_argument("--load", action="append", default=[], metavar="DB",
+                        help="Load the games of another database instead of simulating")
+    parser.add_argument("--compare", metavar="DB", help="Database to compare the results with")
+    parser.add_argument("--roles", action="store_true", help="Also report win rates per role")
+    parser.add_argument("modes", nargs="*", help="Modes to play (default: every mode except roles)")
+    options = parser.parse_args()
+
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        # see bench.simulate; the workers inherit the environment
+        os.environ["PYTHONHASHSEED"] = "0"
+        os.execv(sys.executable, [sys.executable, "-m", "bench.balance"] + sys.argv[1:])
+
+    modes = options.modes or sorted(GAME_MODES.keys() - {"roles"})
+    output = os.path.abspath(options.output)
+    load_paths = [os.path.abspath(path) for path in options.load]
+    os.makedirs(output, exist_ok=True)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        if not load_paths:
+            tasks = make_tasks(modes, options.sizes, options.games, options.seed)
+            simulate_games(tasks, max(options.sizes), options.workers, options.agent, directory)
+            load_paths = [os.path.join(directory, worker, "data.sqlite3") for worker in os.listdir(directory)]
+        os.chdir(output)
+        db._ts = threading.local()
+        db._invalidate_ids()
+        db._init()
+        for path in load_paths:
+            load(path)
+        db.check_stats(repair=True)
+        db._conn().close()
+        os.chdir(cwd)
+
+    results = sqlite3.connect(os.path.join(output, "data.sqlite3"))
+    live = sqlite3.connect(f"file:{options.compare}?mode=ro", uri=True) if options.compare else None
+    report(results, live, modes, options.roles)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+""" Shared helpers for benchmarks. """
+
+from src import channels, config, users
+from src.users import BotUser
+
+__all__ = ["FakeClient", "setup_transport"]
+
+class FakeClient:
+    """Stand-in for IRCClient which records how many lines were sent, but otherwise discards them."""
+    nickname = "bot"
+    ident = "bot"
+    hostmask = "bot.host"
+
+    def __init__(self):
+        self.lines = 0
+
+    def send(self, *args, **kwargs):
+        self.lines += 1
+
+def setup_transport(channel: str = "#bench") -> FakeClient:
+    """Configure a minimal irc transport and set up the bot user and main channel.
+
+    :param channel: Name of the main channel
+    :return: The client that the bot user and channel are bound to
+    """
+    if not config.Main.get("transports", []):
+        config.Main.set("transports", [{
+            "type": "irc",
+            "name": "bench",
+            "module": "generic",
+            "user": {"nick": "bot", "command_prefix": "!"},
+            "channels": {"main": channel},
+            "connection": {"host": "localhost", "port": 6667},
+            "authentication": {"services": {"module": "none"}}
+        }])
+    cli = FakeClient()
+    users.Bot = BotUser(cli, "bot", "bot", "bot.host", "bot")
+    channels.Main = channels.add(channel, cli)
+    return cli
@@ -0,0 +1,66 @@
+""" Benchmark config lookups and their effect on handler.on_privmsg throughput.
+
+"uncached" emulates the previous behavior of Config.get(), which walked the metadata and
+deep-copied the result on every call. "cached" uses the current implementation.
+
+Usage: python -m bench.config [--messages N]
+"""
+
+import argparse
+import copy
+import time
+
+import src # initialize the bot (config, messages, roles)
+from src import channels, config, handler, users
+from bench.common import setup_transport
+
+def uncached_get(key, default=config.Empty):
+    try:
+        cur, _ = config.Main._walk_key(key)
+    except KeyError:
+        if default is not config.Empty:
+            return default
+        raise
+    return copy.deepcopy(cur)
+
+def run_privmsg(cli, count: int) -> float:
+    lines = ["just chatting in the channel", "!stats", "hello there", "!time"]
+    start = time.perf_counter()
+    for i in range(count):
+        handler.on_privmsg(cli, "Someone!someone@some.host", "#bench", lines[i % len(lines)])
+    return time.perf_counter() - start
+
+def run_get(count: int) -> float:
+    keys = ["transports[0].user.command_prefix", "gameplay.wolfchat.disable_night",
+            "telemetry.errors.user_data_level", "access.entries"]
+    start = time.perf_counter()
+    for i in range(count):
+        config.Main.get(keys[i % len(keys)])
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000, help="Number of messages to handle")
+    options = parser.parse_args()
+
+    cli = setup_transport("#bench")
+    chan = channels.Main
+    user = users.add(cli, nick="Someone", ident="someone", host="some.host")
+    user.channels[chan] = set()
+    chan.users.add(user)
+
+    results = {}
+    for name in ("uncached", "cached"):
+        if name == "uncached":
+            config.Main.get = uncached_get
+        else:
+            del config.Main.get
+        results[name] = (run_get(options.messages * 5), run_privmsg(cli, options.messages))
+
+    for name, (get_time, privmsg_time) in results.items():
+        print("{0:>9}: Config.get {1:6.2f} us/call, on_privmsg {2:8.0f} msgs/s".format(
+            name, get_time * 1e6 / (options.messages * 5), options.messages / privmsg_time))
+    print("on_privmsg speedup: {0:.2f}x".format(results["uncached"][1] / results["cached"][1]))
+
+if __name__ == "__main__":
+    main()
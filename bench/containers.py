@@ -0,0 +1,64 @@
+""" Benchmark User.swap on a 24-player game.
+
+Every player has a role, and role state is kept the way role modules keep it: action targets in
+UserDicts (with users as both keys and values), and UserSets of players who acted or are affected
+by something. Each swap replaces a random player with a new user everywhere, as happens on nick changes.
+
+Usage: python -m bench.containers [--swaps N] [--seed N]
+"""
+
+import argparse
+import random
+import time
+
+import src # initialize the bot (config, messages, roles)
+from src import users
+from src.containers import UserDict, UserSet
+from src.gamestate import GameState, PregameState
+from bench.common import setup_transport
+
+PLAYERS = 24
+ROLES = ["wolf", "wolf", "wolf", "werecrow", "traitor", "seer", "oracle", "harlot", "guardian angel",
+         "detective", "hunter", "cursed villager", "gunner", "vigilante", "shaman", "wolf shaman",
+         "villager", "villager", "villager", "villager", "villager", "villager", "fool", "jester"]
+ACTION_DICTS = 30
+STATUS_SETS = 20
+
+def setup_game(rng: random.Random, cli):
+    var = GameState(PregameState())
+    var.begin_setup()
+    players = [users.add(cli, nick=f"player{i}", ident="player", host=f"player{i}.host") for i in range(PLAYERS)]
+    for player, role in zip(players, ROLES):
+        var.players.append(player)
+        var.roles[role].add(player)
+        var.main_roles[player] = role
+    var.roles["blessed villager"].update(rng.sample(players, 3))
+    var.finish_setup()
+    actions = [UserDict({actor: rng.choice(players) for actor in rng.sample(players, 6)}) for _ in range(ACTION_DICTS)]
+    statuses = [UserSet(rng.sample(players, 4)) for _ in range(STATUS_SETS)]
+    return var, players, actions, statuses
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark User.swap on a 24-player game.")
+    parser.add_argument("--swaps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cli = setup_transport()
+    var, players, actions, statuses = setup_game(rng, cli)
+    elapsed = 0.0
+    for i in range(args.swaps):
+        index = rng.randrange(PLAYERS)
+        new = users.add(cli, nick=f"player{index}_{i}", ident="player", host=f"player{index}.host")
+        start = time.perf_counter()
+        players[index].swap(new)
+        elapsed += time.perf_counter() - start
+        players[index] = new
+
+    containers = len(players[0].sets) + len(players[0].lists) + len(players[0].dict_keys) + len(players[0].dict_values)
+    print(f"{args.swaps} swaps: {elapsed * 1000:8.2f} ms total, {elapsed / args.swaps * 1e6:7.1f} us/swap "
+          f"({containers} containers referencing the first player)")
+
+if __name__ == "__main__":
+    main()
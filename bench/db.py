@@ -0,0 +1,119 @@
+""" Benchmark recording game results in the database.
+
+"legacy" emulates the previous implementation of db.add_game, which ran one INSERT per row and
+committed every game from the calling thread, using SQLite's default journal settings. "current"
+queues games with db.add_game, which are written in batches from the database writer thread using
+the journal settings in the database config section.
+
+For each implementation, the time the caller is blocked per game and the total time until every
+game is committed are reported. Each implementation writes to a fresh database in a temporary directory.
+
+Usage: python -m bench.db [--games N] [--accounts N] [--seed N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+import src # initialize the bot (config, messages, roles)
+from src import config, db
+
+ROLES = ["villager", "seer", "wolf", "harlot", "cursed villager", "detective", "werecrow", "gunner",
+         "traitor", "guardian angel", "sorcerer", "hunter", "vigilante", "fool", "wolf cub", "augur"]
+SPECIAL = ["lover", "entranced", "bitten"]
+
+def synthetic_games(rng: random.Random, count: int, accounts: int) -> list[tuple]:
+    games = []
+    for i in range(count):
+        size = rng.randint(6, 24)
+        players = []
+        for account in rng.sample(range(accounts), size):
+            players.append({
+                "version": 3,
+                "account": f"player{account}",
+                "main_role": rng.choice(ROLES),
+                "all_roles": rng.sample(ROLES, rng.randint(1, 2)),
+                "special": rng.sample(SPECIAL, rng.randint(0, 1)),
+                "team_win": rng.random() < 0.5,
+                "individual_win": rng.random() < 0.5,
+                "dced": rng.random() < 0.05,
+            })
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_600_000_000 + i * 600))
+        finished = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_600_000_000 + i * 600 + 480))
+        games.append(("default", size, started, finished, rng.choice(["villagers", "wolves"]), players,
+                      {"role reveal": "on", "stats": "default", "abstain": "on", "roles": {}}))
+    return games
+
+def legacy_add_game(mode, size, started, finished, winner, players, options):
+    conn = db._conn()
+    for p in players:
+        p["personid"], p["playerid"] = db._get_ids(p["account"], add=True)
+
+    c = conn.cursor()
+    c.execute("""INSERT INTO game (gamemode, options, started, finished, gamesize, winner)
+                 VALUES (?, ?, ?, ?, ?, ?)""", (mode, json.dumps(options), started, finished, size, winner))
+    gameid = c.lastrowid
+    for p in players:
+        c.execute("""INSERT INTO game_player (game, player, team_win, indiv_win, dced)
+                     VALUES (?, ?, ?, ?, ?)""", (gameid, p["playerid"], p["team_win"], p["individual_win"], p["dced"]))
+        gpid = c.lastrowid
+        for role in p["all_roles"]:
+            c.execute("""INSERT INTO game_player_role (game_player, role, special)
+                         VALUES (?, ?, 0)""", (gpid, role))
+        for sq in p["special"]:
+            c.execute("""INSERT INTO game_player_role (game_player, role, special)
+                         VALUES (?, ?, 1)""", (gpid, sq))
+
+    conn.commit()
+
+def fresh_database(directory: str, journal_mode: str, synchronous: str):
+    os.chdir(directory)
+    config.Main.set("database.journal_mode", journal_mode)
+    config.Main.set("database.synchronous", synchronous)
+    db._ts = threading.local()
+    db._invalidate_ids()
+    db._init()
+
+def run(name: str, add_game, games: list[tuple]):
+    blocked = []
+    start = time.perf_counter()
+    for game in games:
+        t = time.perf_counter()
+        add_game(*game)
+        blocked.append(time.perf_counter() - t)
+    db.flush()
+    total = time.perf_counter() - start
+    c = db._conn().cursor()
+    c.execute("SELECT COUNT(*) FROM game")
+    assert c.fetchone()[0] == len(games)
+    print(f"{name:>8}: {total:8.2f} s total, {len(games) / total:8.0f} games/s, "
+          f"blocked {statistics.mean(blocked) * 1000:.3f} ms/game (max {max(blocked) * 1000:.1f} ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recording game results in the database.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    games = synthetic_games(random.Random(args.seed), args.games, args.accounts)
+    journal_mode = config.Main.get("database.journal_mode")
+    synchronous = config.Main.get("database.synchronous")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as legacy_dir, tempfile.TemporaryDirectory() as current_dir:
+        fresh_database(legacy_dir, "delete", "full")
+        run("legacy", legacy_add_game, [json.loads(json.dumps(g)) for g in games])
+        fresh_database(current_dir, journal_mode, synchronous)
+        run("current", db.add_game, games)
+        # leave the temporary directories so they can be removed
+        os.chdir(cwd)
+
+if __name__ == "__main__":
+    main()
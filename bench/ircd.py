@@ -0,0 +1,120 @@
+""" A loopback fake IRC server for exercising the transport without a real network.
+
+The server runs its own event loop in a background thread and accepts a single client.
+It records every line the client sends, and can push arbitrary lines to the client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+__all__ = ["FakeIRCd", "run_client"]
+
+class FakeIRCd:
+    """Minimal IRC server listening on 127.0.0.1 on a random port.
+
+    Usage:
+        with FakeIRCd() as ircd:
+            cli = IRCClient(handler, host="127.0.0.1", port=ircd.port)
+            thread = run_client(cli)
+            ircd.wait_for_client()
+            ircd.push(b":server 001 bot :Welcome")
+    """
+
+    def __init__(self):
+        self.port: int = 0
+        self.received: list[bytes] = []
+        self.received_at: list[float] = []
+        self._loop = asyncio.new_event_loop()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+        future = asyncio.run_coroutine_threadsafe(asyncio.start_server(self._handle, "127.0.0.1", 0), self._loop)
+        self._server = future.result(5)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+
+    async def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writer = writer
+        self._connected.set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            with self._cond:
+                self.received.append(line.rstrip(b"\r\n"))
+                self.received_at.append(time.perf_counter())
+                self._cond.notify_all()
+
+    def wait_for_client(self, timeout: float = 5):
+        if not self._connected.wait(timeout):
+            raise TimeoutError("client did not connect")
+
+    def wait_for_lines(self, count: int, timeout: float = 5) -> list[bytes]:
+        """Block until the client sent at least count lines in total.
+
+        :param count: Number of lines to wait for
+        :param timeout: Maximum number of seconds to wait
+        :return: All lines received so far, without line endings
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self.received) >= count, timeout):
+                raise TimeoutError("received {0} of {1} lines".format(len(self.received), count))
+            return list(self.received)
+
+    def push(self, *lines: bytes, chunk: Optional[int] = None):
+        """Send lines to the connected client.
+
+        :param lines: Lines to send, without line endings
+        :param chunk: If given, split the data into writes of this many bytes to exercise line framing
+        """
+        data = b"".join(line + b"\r\n" for line in lines)
+
+        async def write():
+            if chunk is None:
+                self._writer.write(data)
+            else:
+                for i in range(0, len(data), chunk):
+                    self._writer.write(data[i:i+chunk])
+                    await self._writer.drain()
+            await self._writer.drain()
+
+        asyncio.run_coroutine_threadsafe(write(), self._loop).result(30)
+
+    def disconnect(self):
+        """Close the connection to the client."""
+        async def close():
+            self._writer.close()
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result(5)
+
+def run_client(cli) -> threading.Thread:
+    """Run cli.connect() in a background thread, as wolfbot.py would in the main thread."""
+    thread = threading.Thread(target=asyncio.run, args=(cli.connect(),), daemon=True)
+    thread.start()
+    return thread
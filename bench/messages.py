@@ -0,0 +1,113 @@
+""" Benchmark compiled message templates against the ANTLR parse-per-call path.
+
+Every message in the language file (including every entry of list-valued keys) is formatted with
+placeholder arguments. Messages which cannot be formatted with any of the placeholders (for example
+because they need a live transport configuration) are skipped. Both paths are checked to produce
+identical output before timing.
+
+Usage: python -m bench.messages [--rounds N]
+"""
+
+import argparse
+import random
+import time
+
+from antlr4 import InputStream, CommonTokenStream, ParseTreeWalker
+
+import src # initialize the bot (config, messages, roles)
+from src.messages import messages, message_formatter
+from src.messages.compiler import compile_message
+from src.messages.lexer import Lexer
+from src.messages.listener import Listener, MessageErrorListener, parse
+from src.messages.message import Message
+from src.messages.parser import Parser
+
+class SampleStr(str):
+    """Placeholder string that tolerates custom format specs such as :@ (normally handled by User)."""
+    def __format__(self, format_spec):
+        try:
+            return super().__format__(format_spec)
+        except ValueError:
+            return str(self)
+
+class SampleKwargs(dict):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    def __missing__(self, key):
+        return self.value
+
+CANDIDATES = (SampleStr("villager"), 2, ["villager", "seer"])
+
+def format_antlr(message: Message, args, kwargs) -> str:
+    error_listener = MessageErrorListener()
+    lexer = Lexer(message.key, InputStream(message.value))
+    lexer.addErrorListener(error_listener)
+    parser = Parser(message.key, CommonTokenStream(lexer))
+    parser.addErrorListener(error_listener)
+    tree = parser.main()
+    listener = Listener(message, args, kwargs)
+    ParseTreeWalker().walk(listener, tree)
+    return listener.value()
+
+def format_compiled(message: Message, args, kwargs) -> str:
+    return compile_message(message.key, message.value).render(message_formatter, args, kwargs)
+
+def collect_cases():
+    cases = []
+    skipped = 0
+    for key, value in messages.messages.items():
+        if key.startswith("_"):
+            continue
+        values = value if isinstance(value, list) else [value]
+        for i in range(len(values)):
+            message = Message(key, value, i)
+            for candidate in CANDIDATES:
+                args = (candidate,) * 10
+                kwargs = SampleKwargs(candidate)
+                random.seed(0)
+                try:
+                    expected = format_antlr(message, args, kwargs)
+                except Exception:
+                    continue
+                random.seed(0)
+                actual = format_compiled(message, args, kwargs)
+                if actual != expected:
+                    raise AssertionError("Output mismatch for {0}: {1!r} != {2!r}".format(key, actual, expected))
+                cases.append((message, args, kwargs))
+                break
+            else:
+                skipped += 1
+    return cases, skipped
+
+def run(func, cases, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message, args, kwargs in cases:
+            func(message, args, kwargs)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5, help="Number of times to format every message")
+    options = parser.parse_args()
+
+    cases, skipped = collect_cases()
+    print("Formatting {0} messages ({1} skipped) x {2} rounds".format(len(cases), skipped, options.rounds))
+
+    start = time.perf_counter()
+    for message, _, _ in cases:
+        parse(message.key, message.value)
+    compile_time = time.perf_counter() - start
+
+    antlr_time = run(format_antlr, cases, options.rounds)
+    compiled_time = run(format_compiled, cases, options.rounds)
+    per_call = 1e6 / (len(cases) * options.rounds)
+    print("compile (once): {0:8.3f}s".format(compile_time))
+    print("antlr:          {0:8.3f}s ({1:.1f} us/message)".format(antlr_time, antlr_time * per_call))
+    print("compiled:       {0:8.3f}s ({1:.1f} us/message)".format(compiled_time, compiled_time * per_call))
+    print("speedup:        {0:8.1f}x".format(antlr_time / compiled_time))
+
+if __name__ == "__main__":
+    main()
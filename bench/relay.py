@@ -0,0 +1,92 @@
+""" Benchmark relaying wolfchat with 12 wolfchat members and 10 spectators.
+
+"legacy" emulates the previous implementation of relay.relay_wolfchat, which formatted the
+message once per recipient. "current" uses relay.relay_wolfchat, which formats each variant once.
+Both look up the wolfchat members through get_players.
+
+Both implementations queue the same lines, which are sent to a client that discards them.
+
+Usage: python -m bench.relay [--messages N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import src # initialize the bot (config, messages, roles)
+from src import channels, config, relay, users
+from src.cats import Wolf
+from src.context import Priority
+from src.dispatcher import MessageDispatcher
+from src.functions import get_players
+from src.gamestate import GameState, PregameState
+from src.messages import messages
+from src.roles.helper.wolves import get_talking_roles
+from src.users import User
+from bench.common import setup_transport
+
+ROLES = ["wolf"] * 7 + ["werecrow", "wolf cub", "alpha wolf", "traitor", "sorcerer"]
+SPECTATORS = 10
+
+def legacy_relay_wolfchat(wrapper: MessageDispatcher, message: str):
+    var = wrapper.game_state
+    if message.startswith(config.Main.get("transports[0].user.command_prefix")):
+        return
+    badguys = get_players(var, get_talking_roles())
+    wolves = get_players(var, Wolf)
+    if wrapper.source in badguys and len(badguys) > 1:
+        if not config.Main.get("gameplay.wolfchat.traitor_non_wolf"):
+            wolves.extend(var.roles["traitor"])
+        if var.current_phase == "night" and config.Main.get("gameplay.wolfchat.disable_night"):
+            return
+        badguys.remove(wrapper.source)
+        key = "relay_message"
+        if message.startswith("\u0001ACTION"):
+            key = "relay_action"
+            message = message[8:-1]
+        for player in badguys:
+            player.queue_message(messages[key].format(wrapper.source, message))
+        for player in relay.WOLFCHAT_SPECTATE:
+            player.queue_message(messages[key + "_wolfchat"].format(wrapper.source, message))
+        User.send_messages(priority=Priority.RELAY)
+
+def setup_game(cli) -> list[MessageDispatcher]:
+    var = GameState(PregameState())
+    var.begin_setup()
+    var.current_phase = "night"
+    channels.Main.game_state = var
+    wrappers = []
+    for i, role in enumerate(ROLES):
+        user = users.add(cli, nick=f"wolf{i}", ident="wolf", host=f"wolf{i}.host")
+        var.players.append(user)
+        var.roles[role].add(user)
+        var.main_roles[user] = role
+        wrappers.append(MessageDispatcher(user, users.Bot))
+    for i in range(SPECTATORS):
+        relay.WOLFCHAT_SPECTATE.add(users.add(cli, nick=f"spectator{i}", ident="spec", host=f"spec{i}.host"))
+    return wrappers
+
+def run(name: str, func, cli, wrappers: list[MessageDispatcher], count: int):
+    lines = ["I think we should kill the seer tonight", "\u0001ACTION nods\u0001", "who has the gun?"]
+    cli.lines = 0
+    start = time.perf_counter()
+    for i in range(count):
+        func(wrappers[i % len(wrappers)], lines[i % len(lines)])
+    elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {count / elapsed:8.0f} msgs/s, {elapsed / count * 1e6:7.1f} us/msg, {cli.lines / count:.1f} lines/msg")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark relaying wolfchat.")
+    parser.add_argument("--messages", type=int, default=5000, help="Number of messages to relay")
+    options = parser.parse_args()
+
+    cli = setup_transport("#bench")
+    wrappers = setup_game(cli)
+    legacy = run("legacy", legacy_relay_wolfchat, cli, wrappers, options.messages)
+    current = run("current", relay.relay_wolfchat.func, cli, wrappers, options.messages)
+    print("speedup: {0:.2f}x".format(legacy / current))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+""" Benchmark !stats bookkeeping for a 24-player random mode game with repeated deaths.
+
+"legacy" emulates the previous implementation, which stored role stats as a set of frozensets,
+built them from itertools.combinations over every role set, and rebuilt every roleset through a
+Counter for each death. "current" uses src.rolestats.RoleStats.
+
+Deaths are revealed by team only, so each death may have been any role of the dead player's team,
+which is the worst case for the number of possible rolesets.
+
+Usage: python -m bench.rolestats [--games N] [--deaths N] [--seed N]
+"""
+
+import argparse
+import itertools
+import random
+import time
+from collections import Counter
+
+import src # initialize the bot (config, messages, roles)
+from src.cats import All, Wolf, Killer, Wolf_Objective, Wolfteam, Neutral
+from src.events import Event
+from src.gamemodes.random import RandomMode
+from src.gamestate import GameState, PregameState
+from src.rolestats import RoleStats, reconfigure_stats
+
+PLAYERS = 24
+
+def random_roles(rng: random.Random, mode: RandomMode) -> Counter:
+    # mirrors RandomMode.role_attribution, without the win condition check
+    addroles = Counter()
+    addroles[rng.choice(sorted(Wolf & Killer))] += 1
+    lwolves = 1
+    roles = sorted(All - mode.SECONDARY_ROLES.keys() - {"villager", "cultist", "amnesiac"})
+    for i in range(1, PLAYERS):
+        if lwolves >= (PLAYERS / 2) - 1:
+            role = rng.choice(sorted(set(roles) - Wolf_Objective))
+        else:
+            role = rng.choice(roles)
+        addroles[role] += 1
+        if role in Wolf_Objective:
+            lwolves += 1
+    addroles["gunner/sharpshooter"] = int(PLAYERS ** 1.2 / 4) - 1
+    addroles["assassin"] = rng.randrange(max(int(PLAYERS ** 1.2 / 8), 1))
+    return addroles
+
+def split_role_sets(addroles: Counter, mode: RandomMode):
+    fixed = Counter()
+    role_sets = []
+    for role, amt in addroles.items():
+        if role in mode.ROLE_SETS:
+            rs = Counter(mode.ROLE_SETS[role])
+            for r in rs:
+                fixed[r] += 0
+            role_sets.append((rs, amt))
+        else:
+            fixed[role] += amt
+    return fixed, role_sets
+
+def team_of(role: str) -> frozenset:
+    for team in (Wolfteam, Neutral):
+        if role in team:
+            return frozenset(team)
+    return frozenset(All - Wolfteam - Neutral)
+
+def legacy_game(var, fixed, role_sets, deaths):
+    possible_rolesets = [Counter(fixed)]
+    for rs, amt in role_sets:
+        temp_rolesets = []
+        for c in itertools.combinations(rs.elements(), amt):
+            for pr in possible_rolesets:
+                temp = Counter(pr)
+                temp.update(Counter(c))
+                temp_rolesets.append(temp)
+        possible_rolesets = temp_rolesets
+    stats = legacy_reconfigure(var, [frozenset(pr.items()) for pr in possible_rolesets], "start")
+    for possible in deaths:
+        newstats = set()
+        for p in possible:
+            for rs in stats:
+                d = Counter(dict(rs))
+                if p in d and d[p] >= 1:
+                    d[p] -= 1
+                    newstats.add(frozenset(d.items()))
+        stats = legacy_reconfigure(var, newstats, "del_player")
+        legacy_ranges(stats)
+    return stats
+
+def legacy_reconfigure(var, stats, reason):
+    newstats = set()
+    event = Event("reconfigure_stats", {"new": []})
+    for rs in stats:
+        d = Counter(dict(rs))
+        event.data["new"] = [d]
+        event.dispatch(var, d, reason)
+        for v in event.data["new"]:
+            if min(v.values()) >= 0:
+                newstats.add(frozenset(v.items()))
+    return newstats
+
+def legacy_ranges(stats):
+    role_stats = {}
+    for stat_set in stats:
+        for r, a in stat_set:
+            if r not in role_stats:
+                role_stats[r] = (a, a)
+            else:
+                mn, mx = role_stats[r]
+                role_stats[r] = (min(mn, a), max(mx, a))
+    return role_stats
+
+def current_game(var, fixed, role_sets, deaths):
+    stats = reconfigure_stats(var, RoleStats.from_role_sets(fixed, role_sets), "start")
+    for possible in deaths:
+        stats = reconfigure_stats(var, stats.remove_one(possible), "del_player")
+        stats.ranges()
+    return stats.as_frozensets()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=5, help="Number of games to simulate")
+    parser.add_argument("--deaths", type=int, default=5, help="Number of deaths per game")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    options = parser.parse_args()
+
+    rng = random.Random(options.seed)
+    mode = RandomMode()
+    pregame = PregameState()
+    pregame.current_mode = mode
+    var = GameState(pregame)
+    totals = {"legacy": 0.0, "current": 0.0}
+    for game in range(options.games):
+        addroles = random_roles(rng, mode)
+        fixed, role_sets = split_role_sets(addroles, mode)
+        main_roles = list(Counter({r: c for r, c in addroles.items() if r not in mode.SECONDARY_ROLES}).elements())
+        rng.shuffle(main_roles)
+        deaths = [team_of(role) for role in main_roles[:options.deaths]]
+        results = {}
+        for name, func in (("legacy", legacy_game), ("current", current_game)):
+            start = time.perf_counter()
+            results[name] = func(var, fixed, role_sets, deaths)
+            elapsed = time.perf_counter() - start
+            totals[name] += elapsed
+            print("game {0} {1:>7}: {2:8.3f}s, {3} possible rolesets left".format(game, name, elapsed, len(results[name])))
+        assert results["legacy"] == results["current"]
+    print("speedup: {0:.2f}x".format(totals["legacy"] / totals["current"]))
+
+if __name__ == "__main__":
+    main()
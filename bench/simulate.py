@@ -0,0 +1,415 @@
+""" Play complete games without a server, and measure end-to-end throughput.
+
+Every game is played by scripted players that go through the same code paths as people in a live
+game: they say "!join <mode>" and "!start" in the channel, send their roles' night commands to the bot
+in private, vote in the channel during the day, and the game runs until someone wins. Players pick
+their targets at random among the other living players. They are regular users with accounts rather than
+numeric fake users, since the bot drops messages to fake users instead of sending them. Whatever the bot
+sends goes to an in-memory client which counts the lines. Timers run on a virtual clock, which is moved to the next deadline
+whenever the players have nothing left to do, so a game takes only as long as the bot needs to process it.
+
+Games are deterministic for a given seed: each game seeds both the players and the random module,
+and the simulator runs with a fixed PYTHONHASHSEED so that iterating over sets of users is repeatable.
+The winners of every mode are reported, so that a change in behavior is visible next to a change in speed.
+
+For every mode, games/s, the number of lines sent per game, and the mean and maximum time spent in
+each phase are reported. With --tracemalloc, a second pass reports the peak memory allocated while
+a game runs, and the memory that is still allocated after it ended. With --channels, as many games
+are played at the same time, each in its own game channel with its own players; every player acts in
+turn in every game, so phase timings are not reported. Results are written to a database in a temporary
+directory.
+
+Usage: python -m bench.simulate [--games N] [--players N] [--channels N] [--seed N] [--tracemalloc] [mode ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Generator, NamedTuple, Optional
+
+import src # initialize the bot (config, messages, roles)
+from src import channels, config, db, handler, scope, timers, users
+from src.context import Features
+from src.decorators import COMMANDS
+from src.events import Event, EventListener
+from src.functions import get_all_roles, get_players
+from src.gamemodes import GAME_MODES
+from src.gamestate import GameState
+from src.channels import Channel
+from src.users import User
+from bench.common import FakeClient, setup_transport
+
+# What a typical network advertises in RPL_ISUPPORT; the bot needs these to parse modes and targets
+FEATURES = {"CHANTYPES": "#", "PREFIX": "(ov)@+", "STATUSMSG": "@+", "CHANMODES": "beI,k,l,imnpst",
+            "TARGMAX": "PRIVMSG:4,NOTICE:4"}
+# Commands which undo or skip an action, and are never used by the scripted players
+SKIPPED_COMMANDS = frozenset({"pass", "retract", "abstain"})
+# Commands which don't take players as their arguments
+COMMAND_ARGUMENTS = {"side": ("villager", "wolf")}
+# Probability that a player uses their role's day commands (such as shooting) on a given day
+DAY_ACTION_CHANCE = 0.3
+# Maximum number of steps in a game, in case a game can't end
+MAX_STEPS = 1000
+
+class VirtualClock:
+    """Clock for the timer scheduler, which only moves when it is advanced."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class Phase(NamedTuple):
+    name: str
+    seconds: float
+
+class GameResult(NamedTuple):
+    mode: str
+    winner: str
+    lines: int
+    phases: list[Phase]
+
+def role_commands() -> dict[str, dict[str, list[tuple[str, bool]]]]:
+    """Find the commands each role can use.
+
+    :return: A mapping of phase to role to a list of (command name, sent in private) pairs
+    """
+    result: dict[str, dict[str, list[tuple[str, bool]]]] = defaultdict(lambda: defaultdict(list))
+    for name, cmds in COMMANDS.items():
+        for cmd in cmds:
+            # aliases share the command object; only use each command once
+            if cmd.name != name or cmd.name in SKIPPED_COMMANDS or not cmd.roles:
+                continue
+            for phase in cmd.phases:
+                for role in cmd.roles:
+                    if (cmd.name, cmd.pm) not in result[phase][role]:
+                        result[phase][role].append((cmd.name, cmd.pm))
+    for roles in result.values():
+        for cmds in roles.values():
+            cmds.sort()
+    return result
+
+class Agent:
+    """Scripted player, which picks its targets at random among the other living players."""
+    def __init__(self, user: User, rng: random.Random):
+        self.user = user
+        self.rng = rng
+
+    def targets(self, var: GameState, alive: list[User], command: str, count: int = 2) -> list[User]:
+        """Choose the players a command is used on. Commands that need fewer ignore the rest."""
+        others = [p for p in alive if p is not self.user]
+        return self.rng.sample(others, min(count, len(others)))
+
+    def arguments(self, var: GameState, alive: list[User], command: str) -> str:
+        if command in COMMAND_ARGUMENTS:
+            return self.rng.choice(COMMAND_ARGUMENTS[command])
+        return " ".join(p.nick for p in self.targets(var, alive, command))
+
+    def night(self, var: GameState, alive: list[User], commands: dict[str, list[tuple[str, bool]]]) -> list[tuple[str, bool]]:
+        """Return the night actions, as (text, sent in private) pairs."""
+        actions = []
+        for role in sorted(get_all_roles(var, self.user)):
+            for command, private in commands.get(role, ()):
+                actions.append((f"{command} {self.arguments(var, alive, command)}", private))
+        return actions
+
+    def day(self, var: GameState, alive: list[User], commands: dict[str, list[tuple[str, bool]]]) -> list[tuple[str, bool]]:
+        """Return the day actions, as (text, sent in private) pairs. The last action is a vote."""
+        actions = []
+        for role in sorted(get_all_roles(var, self.user)):
+            for command, private in commands.get(role, ()):
+                if self.rng.random() < DAY_ACTION_CHANCE:
+                    actions.append((f"{command} {self.arguments(var, alive, command)}", private))
+        actions.append((f"lynch {self.vote(var, alive).nick}", False))
+        return actions
+
+    def vote(self, var: GameState, alive: list[User]) -> User:
+        """Choose who to vote for."""
+        return self.targets(var, alive, "lynch", 1)[0]
+
+class Simulator:
+    """Plays games in a game channel, with a fixed set of players."""
+    def __init__(self, cli: FakeClient, clock: VirtualClock, players: int, agent=Agent, channel: Optional[Channel] = None,
+                 prefix: str = "player"):
+        self.cli = cli
+        self.clock = clock
+        self.agent = agent
+        self.channel = channel or channels.Main
+        self.commands = role_commands()
+        self.users = [users.add(cli, nick=f"{prefix}{i}", ident="player", host=f"{prefix}{i}.host", account=f"{prefix}{i}")
+                      for i in range(players)]
+        for user in self.users:
+            join_channel(user, channel=self.channel)
+        self.winner = ""
+        listener = EventListener(self._team_win, listener_id=f"bench.simulate.{self.channel.name}", priority=10)
+        listener.install("team_win")
+
+    def _team_win(self, evt: Event, var: GameState, player: User, main_role: str, all_roles, winner: str):
+        if var is self.channel.game_state:
+            self.winner = winner
+
+    def say(self, user: User, text: str, private: bool):
+        if private:
+            handler.on_privmsg(self.cli, user.rawnick, users.Bot.nick, text)
+        else:
+            prefix = config.Main.get("transports[0].user.command_prefix")
+            handler.on_privmsg(self.cli, user.rawnick, self.channel.name, prefix + text)
+
+    def wait(self) -> bool:
+        """Advance the clock to the next timer and run it. Return False if there are no timers left."""
+        deadline = timers.Main.next_deadline()
+        if deadline is None:
+            return False
+        self.clock.now = max(self.clock.now, deadline)
+        timers.Main.run_pending()
+        return True
+
+    def play(self, mode: str, seed: str, players: Optional[int] = None) -> GameResult:
+        """Play a single game of the given mode, and return how it went.
+
+        :param players: Number of players in the game, or None to have everyone play
+        """
+        game = self.game(mode, seed, players)
+        while True:
+            try:
+                next(game)
+            except StopIteration as e:
+                return e.value
+            if not self.wait():
+                raise RuntimeError(f"{mode} is stuck in the {self.channel.game_state.current_phase} phase")
+
+    def game(self, mode: str, seed: str, players: Optional[int] = None) -> Generator[None, None, GameResult]:
+        """Play a game of the given mode, yielding whenever the players are waiting for a timer.
+
+        The game's result is the value of the StopIteration raised once the game ended.
+        """
+        random.seed(seed)
+        rng = random.Random(seed)
+        playing = self.users[:players]
+        agents = {user: self.agent(user, rng) for user in playing}
+        self.winner = ""
+        lines = self.cli.lines
+        phases = []
+
+        start = time.perf_counter()
+        for user in playing:
+            self.say(user, f"join {mode}", False)
+        for user in playing:
+            var = self.channel.game_state
+            if var is None or var.in_game:
+                break
+            self.say(user, "start", False)
+        var = self.channel.game_state
+        if var is None:
+            # role attribution can fail, for instance if there are not enough players for a template
+            return GameResult(mode, "aborted", self.cli.lines - lines, [Phase("join", time.perf_counter() - start)])
+        if not var.in_game or var.current_mode.name != mode:
+            raise RuntimeError(f"{mode} did not start")
+
+        phase = None
+        acted = None
+        for _ in range(MAX_STEPS):
+            if not var.in_game:
+                break
+            current = (var.current_phase, var.night_count, var.day_count)
+            if current != phase:
+                now = time.perf_counter()
+                phases.append(Phase(phase[0] if phase else "join", now - start))
+                phase, start = current, now
+            if current != acted:
+                acted = current
+                # players look at the module state of their own game when choosing what to do
+                with scope.enter(self.channel):
+                    self.act(var, agents)
+                continue
+            yield
+        else:
+            raise RuntimeError(f"{mode} did not end after {MAX_STEPS} steps")
+        phases.append(Phase(phase[0], time.perf_counter() - start))
+
+        return GameResult(mode, self.winner, self.cli.lines - lines, phases)
+
+    def act(self, var: GameState, agents: dict[User, Agent]):
+        phase = (var.current_phase, var.night_count, var.day_count)
+        for user in get_players(var):
+            # players may have died since the phase started
+            alive = get_players(var)
+            if user not in alive:
+                continue
+            agent = agents[user]
+            if var.current_phase == "night":
+                actions = agent.night(var, alive, self.commands["night"])
+            else:
+                actions = agent.day(var, alive, self.commands["day"])
+            for text, private in actions:
+                # someone may have been killed, or the phase may have ended
+                if not var.in_game or (var.current_phase, var.night_count, var.day_count) != phase:
+                    return
+                if user in get_players(var):
+                    self.say(user, text, private)
+
+class ErrorLog(logging.Handler):
+    """Collect the errors caught by the bot's error handlers."""
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.setFormatter(logging.Formatter())
+        self.tracebacks: list[str] = []
+
+    def emit(self, record):
+        if record.exc_info:
+            self.tracebacks.append(self.formatter.formatException(record.exc_info))
+        else:
+            self.tracebacks.append(record.getMessage())
+
+    def report(self):
+        """Print each distinct error once, and forget them."""
+        for tb, count in Counter(self.tracebacks).items():
+            print(f"{count}x {tb}", file=sys.stderr)
+        self.tracebacks.clear()
+
+def join_channel(user: User, modes=(), channel: Optional[Channel] = None):
+    channel = channel or channels.Main
+    channel.users.add(user)
+    user.channels[channel] = set(modes)
+    Event("chan_join", {}).dispatch(channel, user)
+
+def setup(players: int, agent=Agent) -> Simulator:
+    """Prepare the bot to run games without a server, using a database in the current directory."""
+    for key, value in FEATURES.items():
+        Features.set(key, value)
+    cli = setup_transport("#bench")
+    join_channel(users.Bot, "o")
+    scope.add_channel(channels.Main)
+    # start as soon as enough players voted to start, and don't kick or warn players for idling,
+    # since they only ever speak to act or vote
+    config.Main.set("timers.wait.enabled", False)
+    config.Main.set("ratelimits.start", 0)
+    config.Main.set("reaper.enabled", False)
+    config.Main.set("reaper.night_idle.enabled", False)
+    clock = VirtualClock()
+    timers.Main = timers.Scheduler(clock, threaded=False)
+    db._ts = threading.local()
+    db._invalidate_ids()
+    db._init()
+    return Simulator(cli, clock, players, agent)
+
+def add_channel(sim: Simulator, name: str, players: int) -> Simulator:
+    """Add a game channel, with its own players, next to the channel of an existing simulator."""
+    channel = channels.add(name, sim.cli)
+    join_channel(users.Bot, "o", channel=channel)
+    scope.add_channel(channel)
+    return Simulator(sim.cli, sim.clock, players, sim.agent, channel, prefix=f"{name.lstrip('#')}-player")
+
+def play_concurrently(sims: list[Simulator], mode: str, seeds: list[str]) -> list[GameResult]:
+    """Play a game in the channel of every simulator at the same time, and return how they went."""
+    games = {sim: sim.game(mode, seed) for sim, seed in zip(sims, seeds)}
+    results = {}
+    while games:
+        for sim, game in list(games.items()):
+            try:
+                next(game)
+            except StopIteration as e:
+                results[sim] = e.value
+                del games[sim]
+        if games and not sims[0].wait():
+            raise RuntimeError(f"{mode} is stuck in {', '.join(sim.channel.name for sim in games)}")
+    return [results[sim] for sim in sims]
+
+def playable_modes(players: int) -> list[str]:
+    # the roles mode needs an operator to pick the roles
+    return sorted(mode for mode, (cls, minimum, maximum, chance) in GAME_MODES.items()
+                  if mode != "roles" and minimum <= players <= maximum)
+
+def run(sim: Simulator, mode: str, games: int, seed: int, errors: ErrorLog):
+    results = []
+    start = time.perf_counter()
+    for i in range(games):
+        results.append(sim.play(mode, f"{seed}:{mode}:{i}"))
+    elapsed = time.perf_counter() - start
+
+    durations = defaultdict(list)
+    for result in results:
+        for phase in result.phases:
+            durations[phase.name].append(phase.seconds * 1000)
+    timings = "  ".join(f"{name} {statistics.mean(durations[name]):6.2f}/{max(durations[name]):6.2f}"
+                        for name in ("join", "night", "day") if durations[name])
+    winners = Counter(result.winner or "none" for result in results)
+    print(f"{mode:>12}: {games / elapsed:7.1f} games/s, {statistics.mean(r.lines for r in results):6.1f} lines/game, "
+          f"ms mean/max {timings}, {len(errors.tracebacks)} errors, winners {dict(sorted(winners.items()))}")
+    errors.report()
+
+def run_concurrent(sims: list[Simulator], mode: str, games: int, seed: int, errors: ErrorLog):
+    results = []
+    # the lines counted by each game include those of the other games
+    lines = sims[0].cli.lines
+    start = time.perf_counter()
+    for i in range(games):
+        results.extend(play_concurrently(sims, mode, [f"{seed}:{mode}:{i}:{sim.channel.name}" for sim in sims]))
+    elapsed = time.perf_counter() - start
+    winners = Counter(result.winner or "none" for result in results)
+    print(f"{mode:>12}: {len(results) / elapsed:7.1f} games/s in {len(sims)} channels, "
+          f"{(sims[0].cli.lines - lines) / len(results):6.1f} lines/game, {len(errors.tracebacks)} errors, "
+          f"winners {dict(sorted(winners.items()))}")
+    errors.report()
+
+def run_tracemalloc(sim: Simulator, mode: str, games: int, seed: int):
+    peaks = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(games):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        sim.play(mode, f"{seed}:{mode}:{i}")
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{mode:>12}: peak {statistics.mean(peaks) / 1024:8.1f} KiB/game (max {max(peaks) / 1024:.1f} KiB), "
+          f"retained {retained / 1024:8.1f} KiB after {games} games")
+
+def main():
+    parser = argparse.ArgumentParser(description="Play complete games without a server.")
+    parser.add_argument("--games", type=int, default=20, help="Number of games per mode")
+    parser.add_argument("--players", type=int, default=12)
+    parser.add_argument("--channels", type=int, default=1, help="Number of games played at the same time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also measure memory allocations")
+    parser.add_argument("modes", nargs="*", help="Modes to play (default: every mode that allows this many players)")
+    options = parser.parse_args()
+
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        # users are hashed by their nick, so the order of sets of users depends on the hash seed
+        os.environ["PYTHONHASHSEED"] = "0"
+        os.execv(sys.executable, [sys.executable, "-m", "bench.simulate"] + sys.argv[1:])
+
+    modes = options.modes or playable_modes(options.players)
+    errors = ErrorLog()
+    logging.getLogger("exception").addHandler(errors)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        sim = setup(options.players)
+        sims = [sim] + [add_channel(sim, f"#bench{i}", options.players) for i in range(2, options.channels + 1)]
+        for mode in modes:
+            if options.channels > 1:
+                run_concurrent(sims, mode, options.games, options.seed, errors)
+            else:
+                run(sim, mode, options.games, options.seed, errors)
+        if options.tracemalloc:
+            for mode in modes:
+                run_tracemalloc(sim, mode, options.games, options.seed)
+        db.flush()
+        # leave the temporary directory so it can be removed
+        os.chdir(cwd)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+""" Benchmark the IRC transport against a loopback fake ircd.
+
+"inbound" measures how many lines per second the client can frame, parse and dispatch.
+"burst" measures how long the sending thread is held up when queueing a burst of messages
+(e.g. an endgame role reveal), and how long it takes until the last line reaches the server
+under the default flood control settings.
+"night start" queues a backlog of wolfchat relays followed by role PMs, and measures how long
+the role PMs take to be delivered and how many lines are needed in total, with and without
+priorities and coalescing (using a faster token bucket, to keep the run short).
+
+Usage: python -m bench.transport [--lines N] [--burst N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+from bench.ircd import FakeIRCd, run_client
+from oyoyo.client import IRCClient, TokenBucket
+from oyoyo.scheduler import Priority
+
+def make_client(port: int, handler, tokenbucket: TokenBucket, coalesce: bool = True) -> IRCClient:
+    return IRCClient({"privmsg": handler, "": lambda *args: None},
+                     host="127.0.0.1", port=port, nickname="bot", ident="bot",
+                     stream_handler=lambda output, level=None: None,
+                     tokenbucket=tokenbucket, coalesce=coalesce, max_targets=lambda command: 4)
+
+def run_inbound(count: int) -> float:
+    done = threading.Event()
+    received = 0
+
+    def on_privmsg(cli, prefix, target, message):
+        nonlocal received
+        received += 1
+        if received == count:
+            done.set()
+
+    with FakeIRCd() as ircd:
+        run_client(make_client(ircd.port, on_privmsg, TokenBucket(23, 1.73)))
+        ircd.wait_for_client()
+        lines = [":nick{0}!ident@host PRIVMSG #bench :message number {0}".format(i).encode() for i in range(count)]
+        start = time.perf_counter()
+        ircd.push(*lines, chunk=4096)
+        done.wait(120)
+        elapsed = time.perf_counter() - start
+        ircd.disconnect()
+    return elapsed
+
+def run_burst(count: int, tokenbucket: TokenBucket) -> tuple[float, float]:
+    with FakeIRCd() as ircd:
+        cli = make_client(ircd.port, lambda *args: None, tokenbucket, coalesce=False)
+        run_client(cli)
+        ircd.wait_for_client()
+        registration = len(ircd.wait_for_lines(3))
+        start = time.perf_counter()
+        for i in range(count):
+            cli.msg("#bench", "endgame line {0}".format(i))
+        queued = time.perf_counter() - start
+        ircd.wait_for_lines(registration + count, timeout=600)
+        delivered = ircd.received_at[-1] - start
+        ircd.disconnect()
+    return queued, delivered
+
+def run_night_start(prioritized: bool) -> tuple[float, int]:
+    wolves = ["wolf{0}".format(i) for i in range(4)]
+    players = ["player{0}".format(i) for i in range(16)]
+    with FakeIRCd() as ircd:
+        cli = make_client(ircd.port, lambda *args: None, TokenBucket(5, 0.02), coalesce=prioritized)
+        run_client(cli)
+        ircd.wait_for_client()
+        registration = len(ircd.wait_for_lines(3))
+        cli.tokenbucket._tokens = 0
+        relay = Priority.RELAY if prioritized else Priority.INTERACTIVE
+        for i in range(10):
+            for wolf in wolves:
+                cli.send("PRIVMSG {0} :<wolf{1}> chatting about who to kill, line {2}".format(wolf, i % 4, i), priority=relay)
+        start = time.perf_counter()
+        critical = Priority.CRITICAL if prioritized else Priority.INTERACTIVE
+        for player in players:
+            cli.send("PRIVMSG {0} :You are a \x02villager\x02.".format(player), priority=critical)
+        # the role PMs are the only lines which mention "You are a", and may have been sent to several players at once
+        deadline = time.perf_counter() + 60
+        while sum(line.count(b",") + 1 for line in ircd.received if b"You are a" in line) < len(players):
+            if time.perf_counter() > deadline:
+                raise TimeoutError("role PMs were not delivered")
+            time.sleep(0.001)
+        pms = [ircd.received_at[i] for i, line in enumerate(list(ircd.received)) if b"You are a" in line]
+        delivered = max(pms) - start
+        time.sleep(0.5)
+        total = len(ircd.received) - registration
+        ircd.disconnect()
+    return delivered, total
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=100000, help="Number of inbound lines")
+    parser.add_argument("--burst", type=int, default=30, help="Number of outbound lines in a burst")
+    options = parser.parse_args()
+
+    elapsed = run_inbound(options.lines)
+    print("inbound: {0} lines in {1:.3f}s ({2:.0f} lines/s)".format(options.lines, elapsed, options.lines / elapsed))
+
+    for name, bucket in (("default flood control", TokenBucket(23, 1.73)), ("no flood control", TokenBucket(10**6, 1e-6))):
+        queued, delivered = run_burst(options.burst, bucket)
+        print("burst of {0} ({1}): sender blocked {2:.2f} ms, last line delivered after {3:.3f}s".format(
+            options.burst, name, queued * 1e3, delivered))
+
+    for name, prioritized in (("fifo", False), ("prioritized", True)):
+        delivered, total = run_night_start(prioritized)
+        print("night start ({0}): role PMs delivered after {1:.3f}s, {2} lines sent".format(name, delivered, total))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+""" Benchmark the user registry by simulating a WHOX burst when joining a large channel.
+
+Each WHOX reply goes through hooks.extended_who_reply, which looks up (and usually creates) the user.
+With the registry indexes, the cost per reply should stay flat as the channel grows.
+
+Usage: python -m bench.users [--sizes 250,500,1000,2000]
+"""
+
+import argparse
+import time
+
+import src # initialize the bot (config, messages, roles)
+from src import channels, hooks, users
+from bench.common import setup_transport
+
+def reset():
+    for user in list(users.users()):
+        users._unregister(user)
+
+def burst(cli, channel: str, size: int) -> float:
+    reset()
+    chan = channels.add(channel, cli)
+    chan.users.clear()
+    chan.modes.clear()
+    start = time.perf_counter()
+    for i in range(size):
+        hooks.extended_who_reply.func(cli, "irc.server", "bot", "0", channel, "ident{0}".format(i),
+                                      "127.0.0.1", "host{0}.example".format(i), "irc.server",
+                                      "Nick{0}".format(i), "H", "0", "0", "account{0}".format(i), "Real Name")
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="250,500,1000,2000", help="Comma-separated channel sizes")
+    options = parser.parse_args()
+
+    cli = setup_transport()
+    for size in (int(x) for x in options.sizes.split(",")):
+        elapsed = burst(cli, "#bench{0}".format(size), size)
+        print("{0:6d} users: {1:8.3f}s ({2:6.1f} us/reply)".format(size, elapsed, elapsed * 1e6 / size))
+
+if __name__ == "__main__":
+    main()
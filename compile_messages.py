@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# Validate and precompile the message catalog (the language files in messages/ merged with messages.json).
+# The bot does this automatically on startup whenever the catalog changed; running this ahead of time
+# reports any ill-formed messages and lets the bot start without loading the message parser at all.
+
+import argparse
+import sys
+
+from src import config
+from src.messages import catalog
+from src.messages._messages import Messages
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--lang", help="Language to compile. Defaults to the language configured in botconfig.yml.")
+args = parser.parse_args()
+
+lang = args.lang or config.Main.get("gameplay.language")
+messages = Messages(override=lang, cached=False)
+templates, errors = catalog.build(messages.messages)
+for error in errors:
+    print("Invalid message {0}".format(error), file=sys.stderr)
+
+print("Compiled {0} messages for {1!r} into {2}".format(len(templates), lang, catalog.cache_path(lang)))
+sys.exit(1 if errors else 0)
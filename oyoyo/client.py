@@ -15,7 +15,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import socket
+import asyncio
 import ssl
 import sys
 import threading
@@ -26,6 +26,7 @@ import hashlib
 import hmac
 
 from oyoyo.parse import parse_raw_irc_command
+from oyoyo.scheduler import OutboundScheduler, Priority
 
 
 # Adapted from http://code.activestate.com/recipes/511490-implementation-of-the-token-bucket-algorithm/
@@ -54,6 +55,14 @@ class TokenBucket(object):
             return True
         return False
 
+    def delay(self, tokens):
+        """Returns the number of seconds until the bucket holds enough
+        tokens for consume(tokens) to succeed, or 0 if it already does."""
+        missing = tokens - self.tokens
+        if missing <= 0:
+            return 0
+        return missing * self.fill_rate
+
     @property
     def tokens(self):
         now = time.time()
@@ -85,9 +94,9 @@ class IRCClient:
         used will be nick, host and port. You can also specify an "on connect"
         callback. ( check the source for others )
 
-        Warning: By default this class will not block on socket operations, this
-        means if you use a plain while loop your app will consume 100% cpu.
-        To enable blocking pass blocking=True.
+        The connection is driven by asyncio (see connect()). Outgoing lines
+        are queued by send() and written out by a separate task, so sending
+        never blocks the caller, and may be done from any thread.
         """
 
         self.socket = None
@@ -101,7 +110,6 @@ class IRCClient:
         self.password = ""
         self.authname = ""
         self.connect_cb = None
-        self.blocking = True
         self.sasl_auth = False
         self.use_ssl = False
         self.cert_verify = False
@@ -110,14 +118,19 @@ class IRCClient:
         self.client_keyfile = None
         self.cipher_list = None
         self.server_pass = None
-        self.lock = threading.RLock()
         self.stream_handler = lambda output, level=None: print(output)
 
         self.tokenbucket = TokenBucket(23, 1.73)
+        self.max_targets = lambda command: 1
+        self.coalesce = True
 
         self.__dict__.update(kwargs)
         self.command_handler = cmd_handler
         self._end = 0
+        self._loop = None
+        self._loop_thread = None
+        self._wakeup = None
+        self._outbound = OutboundScheduler(self.max_message_length, self.max_targets, self.coalesce)
 
     def __enter__(self):
         return self
@@ -138,121 +151,204 @@ class IRCClient:
         In python 3, all args must be of type str or bytes, *BUT* if they are
           str they will be converted to bytes with the encoding specified by the
           'encoding' keyword argument (default 'utf8').
+
+        The message is queued rather than written immediately; the transport
+        sends it as soon as the token bucket allows. Queued messages are sent
+        in order of the 'priority' keyword argument (a Priority, by default
+        Priority.INTERACTIVE), and in the order they were queued otherwise.
+        See OutboundScheduler for how waiting messages may be coalesced.
         """
-        with self.lock:
-            # Convert all args to bytes if not already
-            encoding = kwargs.get('encoding') or 'utf_8'
-            bargs = []
-            for i,arg in enumerate(args):
-                if isinstance(arg, str):
-                    bargs.append(bytes(arg, encoding))
-                elif isinstance(arg, bytes):
-                    bargs.append(arg)
-                elif arg is None:
+        # Convert all args to bytes if not already
+        encoding = kwargs.get('encoding') or 'utf_8'
+        bargs = []
+        for i,arg in enumerate(args):
+            if isinstance(arg, str):
+                bargs.append(bytes(arg, encoding))
+            elif isinstance(arg, bytes):
+                bargs.append(arg)
+            elif arg is None:
+                continue
+            else:
+                raise Exception(('Refusing to send arg at index {1} of the args from '+
+                                 'provided: {0}').format(repr([(type(arg), arg)
+                                                               for arg in args]), i))
+
+        msg = bytes(" ", "utf_8").join(bargs)
+        logmsg = kwargs.get("log") or str(msg)[1:]
+        self.stream_handler('---> send {0}'.format(logmsg), level="debug")
+
+        self._outbound.push(msg, kwargs.get("priority", Priority.INTERACTIVE))
+        self._notify_writer()
+
+    def max_message_length(self, head):
+        """ Returns the maximum length in bytes of the trailing parameter of
+        a line starting with head (e.g. b"PRIVMSG #channel"), once the server
+        has prefixed it with our full address. """
+        prefix = ":{0}!{1}@{2} ".format(self.nickname, self.ident, self.hostmask)
+        return 512 - len(bytes(prefix, "utf_8")) - len(head) - len(" :\r\n")
+
+    def queue_stats(self):
+        """ Returns statistics about the send queue; see OutboundScheduler.stats(). """
+        return self._outbound.stats()
+
+    def _notify_writer(self):
+        loop = self._loop
+        if loop is None:
+            # not connected yet; the writer will pick up the queue once we are
+            return
+        if self._loop_thread == threading.get_ident():
+            self._wakeup.set()
+        else:
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # the event loop was closed while we were queueing the message
+                pass
+
+    def _ssl_context(self):
+        ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+
+        if self.cipher_list:
+            try:
+                ctx.set_ciphers(self.cipher_list)
+            except Exception:
+                self.stream_handler("No ciphers could be selected from the cipher list. TLS is not available.", level="warning")
+                self.stream_handler("Use `openssl ciphers' to see which ciphers are available on this system.", level="warning")
+                raise
+
+        # explicitly disable old protocols
+        ctx.options |= ssl.OP_NO_SSLv2
+        ctx.options |= ssl.OP_NO_SSLv3
+        ctx.options |= ssl.OP_NO_TLSv1
+
+        # explicitly disable compression (CRIME attack)
+        ctx.options |= ssl.OP_NO_COMPRESSION
+
+        # TLS session tickets harm forward secrecy
+        ctx.options |= ssl.OP_NO_TICKET
+
+        if self.cert_verify and not self.cert_fp:
+            ctx.verify_mode = ssl.CERT_REQUIRED
+
+            if not self.cert_fp:
+                ctx.check_hostname = True
+
+            ctx.load_default_certs()
+        elif not self.cert_verify and not self.cert_fp:
+            self.stream_handler("**NOT** validating the server's TLS certificate! Check SSL settings in botconfig.yml!", level="warning")
+
+        if self.client_certfile:
+            # if client_keyfile is not specified, the ssl module will look to the client_certfile for it.
+            try:
+                # specify blank password to ensure that encrypted certs will outright fail rather than prompting for password on stdin
+                # in a scenario where a user does !update or !restart, they will be unable to type in such a password and effectively kill the bot
+                # until someone can SSH in to restart it via CLI.
+                ctx.load_cert_chain(self.client_certfile, self.client_keyfile, password="")
+                self.stream_handler("Connecting with a TLS client certificate", level="info")
+            except Exception as error:
+                self.stream_handler("Unable to load client cert/key pair: {0}".format(error), level="error")
+                raise
+
+        return ctx
+
+    async def _open_connection(self):
+        ctx = self._ssl_context() if self.use_ssl else None
+        retries = 0
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    "{0}".format(self.host), self.port,
+                    ssl=ctx,
+                    server_hostname=self.host if ctx else None,
+                    local_addr=("{0}".format(self.bindhost), 0) if self.bindhost else None)
+                break
+            except ssl.SSLError as error:
+                self.stream_handler("Could not connect with TLS: {0}".format(error), level="error")
+                raise
+            except OSError as e:
+                retries += 1
+                self.stream_handler('Error: {0}'.format(e), level="warning")
+                if retries > 3:
+                    sys.exit(1)
+
+        if ctx:
+            sslobj = writer.get_extra_info("ssl_object")
+            if self.cert_fp:
+                valid_fps = set(fp.replace(":", "").lower() for fp in self.cert_fp)
+                peercert = sslobj.getpeercert(True)
+                h = hashlib.new("sha256")
+                h.update(peercert)
+                peercertfp = h.hexdigest()
+
+                if peercertfp not in valid_fps:
+                    writer.close()
+                    self.stream_handler("Certificate fingerprint {0} did not match any expected fingerprints".format(peercertfp), level="error")
+                    raise ssl.CertificateError("Certificate fingerprint {0} did not match any expected fingerprints".format(peercertfp))
+                self.stream_handler("Server certificate fingerprint matched {0}".format(peercertfp), level="info")
+
+            self.stream_handler("Connected with cipher {0}".format(sslobj.cipher()[0]), level="info")
+
+        return reader, writer
+
+    async def _write_loop(self, writer):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._outbound:
+                # we are the only consumer, so the queue cannot empty out from under us
+                delay = self.tokenbucket.delay(1)
+                if delay:
+                    await asyncio.sleep(delay)
                     continue
-                else:
-                    raise Exception(('Refusing to send arg at index {1} of the args from '+
-                                     'provided: {0}').format(repr([(type(arg), arg)
-                                                                   for arg in args]), i))
+                lines = []
+                while self._outbound and self.tokenbucket.consume(1):
+                    lines.append(self._outbound.pop())
+                writer.write(bytes().join(lines))
+                await writer.drain()
 
-            msg = bytes(" ", "utf_8").join(bargs)
-            logmsg = kwargs.get("log") or str(msg)[1:]
-            self.stream_handler('---> send {0}'.format(logmsg), level="debug")
+    def _dispatch(self, line):
+        prefix, command, args = parse_raw_irc_command(line)
 
-            while not self.tokenbucket.consume(1):
-                time.sleep(0.3)
-            self.socket.send(msg + bytes("\r\n", "utf_8"))
+        try:
+            enc = "utf8"
+            fargs = [arg.decode(enc) for arg in args if isinstance(arg,bytes)]
+        except UnicodeDecodeError:
+            enc = "latin1"
+            fargs = [arg.decode(enc) for arg in args if isinstance(arg,bytes)]
 
-    def connect(self):
+        try:
+            if prefix is not None:
+                prefix = prefix.decode(enc)
+            self.stream_handler("<--- receive {0} {1} ({2})".format(prefix, command, ", ".join(fargs)), level="debug")
+            if command in self.command_handler:
+                self.command_handler[command](self, prefix,*fargs)
+            elif "" in self.command_handler:
+                self.command_handler[""](self, prefix, command, *fargs)
+        except Exception as e:
+            sys.stderr.write(traceback.format_exc())
+            raise e  # ?
+
+    async def connect(self):
         """ initiates the connection to the server set in self.host:self.port
-        and returns a generator object.
+        and processes incoming lines until the connection is closed. Queued
+        outgoing lines are written by a separate task for as long as the
+        connection is open.
 
         >>> cli = IRCClient(my_handler, host="irc.libera.chat", port=6667)
-        >>> g = cli.connect()
-        >>> while 1:
-        ...     next(g)
+        >>> asyncio.run(cli.connect())
 
         """
+        writer = None
+        write_task = None
         try:
-            retries = 0
-            while True:
-                try:
-                    self.socket = socket.create_connection(
-                        ("{0}".format(self.host), self.port),
-                        source_address=("{0}".format(self.bindhost), 0))
-                    break
-                except socket.error as e:
-                    retries += 1
-                    self.stream_handler('Error: {0}'.format(e), level="warning")
-                    if retries > 3:
-                        sys.exit(1)
-
-            if self.use_ssl:
-                ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-
-                if self.cipher_list:
-                    try:
-                        ctx.set_ciphers(self.cipher_list)
-                    except Exception:
-                        self.stream_handler("No ciphers could be selected from the cipher list. TLS is not available.", level="warning")
-                        self.stream_handler("Use `openssl ciphers' to see which ciphers are available on this system.", level="warning")
-                        raise
-
-                # explicitly disable old protocols
-                ctx.options |= ssl.OP_NO_SSLv2
-                ctx.options |= ssl.OP_NO_SSLv3
-                ctx.options |= ssl.OP_NO_TLSv1
-
-                # explicitly disable compression (CRIME attack)
-                ctx.options |= ssl.OP_NO_COMPRESSION
-
-                # TLS session tickets harm forward secrecy
-                ctx.options |= ssl.OP_NO_TICKET
-
-                if self.cert_verify and not self.cert_fp:
-                    ctx.verify_mode = ssl.CERT_REQUIRED
-
-                    if not self.cert_fp:
-                        ctx.check_hostname = True
-
-                    ctx.load_default_certs()
-                elif not self.cert_verify and not self.cert_fp:
-                    self.stream_handler("**NOT** validating the server's TLS certificate! Check SSL settings in botconfig.yml!", level="warning")
-
-                if self.client_certfile:
-                    # if client_keyfile is not specified, the ssl module will look to the client_certfile for it.
-                    try:
-                        # specify blank password to ensure that encrypted certs will outright fail rather than prompting for password on stdin
-                        # in a scenario where a user does !update or !restart, they will be unable to type in such a password and effectively kill the bot
-                        # until someone can SSH in to restart it via CLI.
-                        ctx.load_cert_chain(self.client_certfile, self.client_keyfile, password="")
-                        self.stream_handler("Connecting with a TLS client certificate", level="info")
-                    except Exception as error:
-                        self.stream_handler("Unable to load client cert/key pair: {0}".format(error), level="error")
-                        raise
+            reader, writer = await self._open_connection()
+            self.socket = writer.get_extra_info("socket")
 
-                try:
-                    self.socket = ctx.wrap_socket(self.socket, server_hostname=self.host)
-                except Exception as error:
-                    self.stream_handler("Could not connect with TLS: {0}".format(error), level="error")
-                    raise
-
-                if self.cert_fp:
-                    valid_fps = set(fp.replace(":", "").lower() for fp in self.cert_fp)
-                    peercert = self.socket.getpeercert(True)
-                    h = hashlib.new("sha256")
-                    h.update(peercert)
-                    peercertfp = h.hexdigest()
-
-                    if peercertfp not in valid_fps:
-                        self.stream_handler("Certificate fingerprint {0} did not match any expected fingerprints".format(peercertfp), level="error")
-                        raise ssl.CertificateError("Certificate fingerprint {0} did not match any expected fingerprints".format(peercertfp))
-                    self.stream_handler("Server certificate fingerprint matched {0}".format(peercertfp), level="info")
-
-                self.stream_handler("Connected with cipher {0}".format(self.socket.cipher()[0]), level="info")
-
-            if not self.blocking:
-                self.socket.setblocking(0)
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._wakeup = asyncio.Event()
+            self._wakeup.set()
+            write_task = asyncio.ensure_future(self._write_loop(writer))
 
             self.send("CAP LS 302")
 
@@ -277,50 +373,24 @@ class IRCClient:
                     sys.stderr.write(traceback.format_exc())
                     raise e
 
-            buffer = bytes()
             while not self._end:
-                try:
-                    buffer += self.socket.recv(1024)
-                except socket.error as e:
-                    if False and not self.blocking and e.errno == 11:
-                        pass
-                    else:
-                        sys.stderr.write(traceback.format_exc())
-                        raise e
-                else:
-                    data = buffer.split(bytes("\n", "utf_8"))
-                    buffer = data.pop()
-
-                    for el in data:
-                        prefix, command, args = parse_raw_irc_command(el)
-
-                        try:
-                            enc = "utf8"
-                            fargs = [arg.decode(enc) for arg in args if isinstance(arg,bytes)]
-                        except UnicodeDecodeError:
-                            enc = "latin1"
-                            fargs = [arg.decode(enc) for arg in args if isinstance(arg,bytes)]
-
-                        try:
-                            largs = list(args)
-                            if prefix is not None:
-                                prefix = prefix.decode(enc)
-                            self.stream_handler("<--- receive {0} {1} ({2})".format(prefix, command, ", ".join(fargs)), level="debug")
-                            # for i,arg in enumerate(largs):
-                                # if arg is not None: largs[i] = arg.decode(enc)
-                            if command in self.command_handler:
-                                self.command_handler[command](self, prefix,*fargs)
-                            elif "" in self.command_handler:
-                                self.command_handler[""](self, prefix, command, *fargs)
-                        except Exception as e:
-                            sys.stderr.write(traceback.format_exc())
-                            raise e  # ?
-                yield True
+                line = await reader.readline()
+                if not line.endswith(bytes("\n", "utf_8")):
+                    # connection closed; anything left over is an incomplete line
+                    break
+                if line.strip():
+                    self._dispatch(line)
+                if write_task.done():
+                    # re-raise whatever made the writer exit
+                    write_task.result()
         finally:
-            if self.socket:
+            self._loop = None
+            if write_task:
+                write_task.cancel()
+            if writer:
                 self.stream_handler('closing socket')
-                self.socket.close()
-                yield False
+                writer.close()
+
     def msg(self, user, msg):
         for line in msg.split('\n'):
             maxchars = 494 - len(self.nickname+self.ident+self.hostmask+user)
@@ -381,10 +451,8 @@ class IRCClient:
     def user(self, ident, rname):
         self.send("USER", ident, "0", "*", ":{0}".format(rname or ident))
     def mainLoop(self):
-        conn = self.connect()
-        while True:
-            if not next(conn):
-                self.stream_handler("Calling sys.exit()...", level="warning")
-                sys.exit()
+        asyncio.run(self.connect())
+        self.stream_handler("Calling sys.exit()...", level="warning")
+        sys.exit()
 
 # vim: set sw=4 expandtab:
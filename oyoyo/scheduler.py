@@ -0,0 +1,239 @@
+# Copyright (c) 2011 Duncan Fordyce, Jimmy Cao
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import heapq
+import itertools
+import threading
+import time
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """ Priority classes for outgoing lines. Lower values are sent first. """
+    CRITICAL = 0 # role PMs, phase transitions, PONG replies
+    INTERACTIVE = 1 # replies to commands, and anything that isn't classified otherwise
+    RELAY = 2 # wolfchat, deadchat and spectator relays
+    BACKGROUND = 3 # idle warnings, WHO requests to refresh accounts
+
+# Joins messages to the same target that were coalesced into a single line
+COALESCE_SEPARATOR = bytes(" | ", "utf_8")
+
+_MESSAGE_COMMANDS = frozenset(bytes(x, "utf_8") for x in ("PRIVMSG", "NOTICE", "CPRIVMSG", "CNOTICE"))
+_CHANNEL_COMMANDS = frozenset(bytes(x, "utf_8") for x in ("CPRIVMSG", "CNOTICE"))
+
+
+class _Entry(object):
+    __slots__ = ("priority", "seq", "queued", "messages", "command", "targets", "channel", "texts", "line")
+
+    def __init__(self, priority, seq, queued):
+        self.priority = priority
+        self.seq = seq
+        self.queued = queued
+        self.messages = 1
+        self.command = None
+        self.targets = None
+        self.channel = None
+        self.texts = None
+        self.line = None
+
+    def head(self, targets=None):
+        parts = [self.command, bytes(",", "utf_8").join(targets or self.targets)]
+        if self.channel is not None:
+            parts.append(self.channel)
+        return bytes(" ", "utf_8").join(parts)
+
+    def render(self):
+        if self.line is not None:
+            return self.line
+        return self.head() + bytes(" :", "utf_8") + COALESCE_SEPARATOR.join(self.texts) + bytes("\r\n", "utf_8")
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundScheduler(object):
+    """ Queue of outgoing lines, ordered by priority and then by age.
+
+    While lines are waiting for the token bucket, PRIVMSG and NOTICE lines
+    are coalesced to use fewer lines: messages to the same target are joined
+    into one line (except for Priority.CRITICAL, whose lines are always kept
+    as they are), and identical messages to several targets are sent as one
+    line with multiple targets.
+
+    Messages to any one target are never reordered, even across priority
+    classes: priority only decides which target is served next. When a
+    message is queued behind lines of a lower priority to the same target,
+    those lines are raised to the priority of the new message.
+
+    max_length(head) should return the maximum length in bytes of the
+    trailing parameter of a line starting with head (e.g. b"PRIVMSG #chan"),
+    and max_targets(command) the number of targets the server allows for
+    the command (as a str, e.g. "PRIVMSG").
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, max_length, max_targets=None, coalesce=True):
+        self.max_length = max_length
+        self.max_targets = max_targets or (lambda command: 1)
+        self.coalesce = coalesce
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        # (command, target, channel) -> pending entries sent to that target, oldest first
+        self._by_target = {}
+        # (priority, command, channel, text) -> pending entry sending only that text
+        self._by_text = {}
+        self._stats = {p: {"queued": 0, "messages": 0, "lines": 0, "coalesced": 0, "sent": 0, "wait": 0.0, "max_wait": 0.0} for p in Priority}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, line, priority=Priority.INTERACTIVE):
+        """ Queue a line (without the trailing CRLF) to be sent. """
+        priority = Priority(priority)
+        with self._lock:
+            stats = self._stats[priority]
+            stats["messages"] += 1
+            entry = _Entry(priority, next(self._counter), time.monotonic())
+            if not self.coalesce or not self._parse(entry, line):
+                entry.line = line + bytes("\r\n", "utf_8")
+            elif self._merge(entry):
+                stats["coalesced"] += 1
+                return
+            else:
+                self._index(entry)
+                self._promote(entry)
+            stats["queued"] += 1
+            heapq.heappush(self._heap, entry)
+
+    def pop(self):
+        """ Remove the next line to send from the queue and return it,
+        including the trailing CRLF. Returns None if the queue is empty. """
+        with self._lock:
+            if not self._heap:
+                return None
+            entry = heapq.heappop(self._heap)
+            if entry.line is None:
+                self._unindex(entry)
+            wait = time.monotonic() - entry.queued
+            stats = self._stats[entry.priority]
+            stats["queued"] -= 1
+            stats["lines"] += 1
+            stats["sent"] += entry.messages
+            stats["wait"] += wait * entry.messages
+            stats["max_wait"] = max(stats["max_wait"], wait)
+            return entry.render()
+
+    def stats(self):
+        """ Returns a dict of {Priority: dict} with the following keys:
+
+        queued - number of lines currently waiting to be sent
+        messages - number of messages queued so far
+        sent - number of messages sent so far
+        lines - number of lines sent so far
+        coalesced - number of messages that were merged into another line
+        wait - average number of seconds a sent message has waited
+        max_wait - longest number of seconds a sent line has waited
+        """
+        with self._lock:
+            result = {}
+            for priority, stats in self._stats.items():
+                result[priority] = dict(stats)
+                result[priority]["wait"] = stats["wait"] / stats["sent"] if stats["sent"] else 0.0
+            return result
+
+    def _parse(self, entry, line):
+        head, sep, text = line.partition(bytes(" :", "utf_8"))
+        params = head.split(bytes(" ", "utf_8"))
+        command = params[0].upper()
+        if not sep or command not in _MESSAGE_COMMANDS:
+            return False
+        if len(params) != (3 if command in _CHANNEL_COMMANDS else 2):
+            return False
+        entry.command = command
+        entry.targets = params[1].split(bytes(",", "utf_8"))
+        entry.channel = params[2] if len(params) == 3 else None
+        entry.texts = [text]
+        return True
+
+    def _merge(self, entry):
+        text = entry.texts[0]
+        if len(entry.targets) == 1:
+            key = (entry.command, entry.targets[0], entry.channel)
+            pending = self._by_target.get(key)
+            last = pending[-1] if pending else None
+            # append the message to the last line queued for this target, if it is only sent to this target
+            if (last is not None and last.priority is entry.priority and len(last.targets) == 1 and entry.priority is not Priority.CRITICAL
+                    and not text.startswith(bytes("\x01", "utf_8")) and not last.texts[-1].startswith(bytes("\x01", "utf_8"))
+                    and len(COALESCE_SEPARATOR.join(last.texts + [text])) <= self.max_length(last.head())):
+                if len(last.texts) == 1:
+                    self._by_text.pop((last.priority, last.command, last.channel, last.texts[0]), None)
+                last.texts.append(text)
+                last.messages += 1
+                return True
+            # add the target to a line sending the same message to other targets, but only if we
+            # don't have anything else queued for the target which would be sent after that line
+            other = self._by_text.get((entry.priority, entry.command, entry.channel, text))
+            if (other is not None and (last is None or last.seq < other.seq)
+                    and len(other.targets) < self.max_targets(other.command.decode("utf_8"))
+                    and len(text) <= self.max_length(other.head(other.targets + entry.targets))):
+                other.targets.append(entry.targets[0])
+                other.messages += 1
+                self._by_target.setdefault(key, []).append(other)
+                self._promote(other)
+                return True
+        return False
+
+    def _promote(self, entry):
+        # raise the lines queued before entry to any of its targets to its priority, so that they
+        # are still sent first; this can in turn require promoting lines to their other targets
+        stack = [entry]
+        changed = False
+        while stack:
+            current = stack.pop()
+            for target in current.targets:
+                for earlier in self._by_target[(current.command, target, current.channel)]:
+                    if earlier.seq >= current.seq:
+                        break
+                    if earlier.priority > current.priority:
+                        key = (earlier.priority, earlier.command, earlier.channel, earlier.texts[0])
+                        if self._by_text.get(key) is earlier:
+                            del self._by_text[key]
+                        self._stats[earlier.priority]["queued"] -= 1
+                        self._stats[current.priority]["queued"] += 1
+                        earlier.priority = current.priority
+                        stack.append(earlier)
+                        changed = True
+        if changed:
+            heapq.heapify(self._heap)
+
+    def _index(self, entry):
+        for target in entry.targets:
+            self._by_target.setdefault((entry.command, target, entry.channel), []).append(entry)
+        self._by_text[(entry.priority, entry.command, entry.channel, entry.texts[0])] = entry
+
+    def _unindex(self, entry):
+        for target in entry.targets:
+            key = (entry.command, target, entry.channel)
+            pending = self._by_target[key]
+            pending.remove(entry)
+            if not pending:
+                del self._by_target[key]
+        key = (entry.priority, entry.command, entry.channel, entry.texts[0])
+        if self._by_text.get(key) is entry:
+            del self._by_text[key]
@@ -14,14 +14,14 @@ logger.init()
 
 # Files with dependencies only on things imported in previous lines, in order
 # The top line must only depend on things imported above in our "no dependencies" block
-from src import debug
+from src import debug, profiler, timers
 from src import events, transport
 from src import cats, messages
 from src import context, functions
 from src import db
 from src import users
 from src import channels, containers
-from src import dispatcher, gamestate
+from src import dispatcher, rolestats, gamestate
 from src import decorators
 from src import game_stats, handler, hooks, status, warnings, relay
 from src import reaper
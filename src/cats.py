@@ -24,6 +24,7 @@ from __future__ import annotations
 
 from collections import defaultdict
 import itertools
+import operator
 
 from src.messages._messages import Messages as _Messages
 from src.events import Event, EventListener
@@ -48,6 +49,22 @@ FROZEN = False
 
 ROLES = {}
 
+# Once frozen, every role is assigned a bit, and categories additionally store their roles as an integer
+# bitmask so that combining them is plain integer arithmetic
+_ROLE_BITS: dict[str, int] = {}
+_BIT_ROLES: list[str] = []
+
+# Combined categories, keyed by (operator, first operand, second operand); see Category.from_combination
+_COMBINATIONS: dict[tuple, Category] = {}
+
+_OPERATORS = {
+    "+": operator.or_,
+    "|": operator.or_,
+    "&": operator.and_,
+    "^": operator.xor,
+    "-": lambda first, second: first & ~second,
+}
+
 _internal_en = _Messages(override="en")
 
 def get(cat: str) -> Category:
@@ -89,6 +106,10 @@ def _register_roles(evt: Event):
             ROLE_CATS[cat].roles.add(role)
         All.roles.add(role)
 
+    for bit, role in enumerate(sorted(ROLES)):
+        _ROLE_BITS[role] = 1 << bit
+        _BIT_ROLES.append(role)
+
     for cat in ROLE_CATS.values():
         cat.freeze()
     FROZEN = True
@@ -105,6 +126,7 @@ class Category:
                 ROLE_CATS[alias] = self
         self.name = name
         self._roles = set()
+        self._mask = 0
 
     def __len__(self):
         if not FROZEN:
@@ -133,12 +155,13 @@ class Category:
 
     def freeze(self):
         self._roles = frozenset(self._roles)
+        self._mask = _to_mask(self._roles)
 
     def __eq__(self, other):
         if not FROZEN:
             raise RuntimeError("Fatal: Role categories are not ready")
         if isinstance(other, Category):
-            return self._roles == other._roles
+            return self._mask == other._mask
         if isinstance(other, (set, frozenset)):
             return self._roles == other
         if isinstance(other, str):
@@ -165,37 +188,65 @@ class Category:
         return values
 
     def __invert__(self):
-        new = self.from_combination(All, self, "", set.difference_update)
-        if self.name in ROLE_CATS:
-            name = "~{0}".format(self.name)
-        else:
-            name = "~({0})".format(self.name)
-        new.name = name
+        if not FROZEN:
+            raise RuntimeError("Fatal: Role categories are not ready")
+        key = ("~", self.name, self._mask)
+        new = _COMBINATIONS.get(key)
+        if new is None:
+            if self.name in ROLE_CATS:
+                name = "~{0}".format(self.name)
+            else:
+                name = "~({0})".format(self.name)
+            new = _COMBINATIONS[key] = self._from_mask(name, All._mask & ~self._mask)
         return new
 
     @classmethod
-    def from_combination(cls, first, second, op, func):
+    def _from_mask(cls, name, mask):
+        self = cls(name)
+        self._mask = mask
+        self._roles = frozenset(role for bit, role in enumerate(_BIT_ROLES) if mask >> bit & 1)
+        return self
+
+    @classmethod
+    def from_combination(cls, first, second, op):
+        """Combine two categories, or a category and a set of roles, with the given operator.
+
+        Results are cached, so the same instance is returned every time the same combination is made.
+        Combined categories must therefore never be modified.
+        """
         if not FROZEN:
             raise RuntimeError("Fatal: Role categories are not ready")
-        if isinstance(second, (Category, set, frozenset, _dict_keys)):
-            for cont in (first, second):
-                for role in cont:
-                    if role not in ROLES:
-                        raise ValueError("{0!r} is not a role".format(role))
-            name = "{0} {1} {2}".format(first, op, second)
-            self = cls(name)
-            self._roles.update(first)
-            func(self._roles, second)
-            self._roles = frozenset(self._roles)
+        if isinstance(first, (Category, set, frozenset, _dict_keys)) and isinstance(second, (Category, set, frozenset, _dict_keys)):
+            key = (op, _cache_key(first), _cache_key(second))
+            self = _COMBINATIONS.get(key)
+            if self is None:
+                name = "{0} {1} {2}".format(first, op, second)
+                self = _COMBINATIONS[key] = cls._from_mask(name, _OPERATORS[op](_to_mask(first), _to_mask(second)))
             return self
         return NotImplemented
 
-    __add__ = __radd__  = lambda self, other: self.from_combination(self, other, "+", set.update)
-    __or__  = __ror__   = lambda self, other: self.from_combination(self, other, "|", set.update)
-    __and__ = __rand__  = lambda self, other: self.from_combination(self, other, "&", set.intersection_update)
-    __xor__ = __rxor__  = lambda self, other: self.from_combination(self, other, "^", set.symmetric_difference_update)
-    __sub__             = lambda self, other: self.from_combination(self, other, "-", set.difference_update)
-    __rsub__            = lambda self, other: self.from_combination(other, self, "-", set.difference_update)
+    __add__ = __radd__  = lambda self, other: self.from_combination(self, other, "+")
+    __or__  = __ror__   = lambda self, other: self.from_combination(self, other, "|")
+    __and__ = __rand__  = lambda self, other: self.from_combination(self, other, "&")
+    __xor__ = __rxor__  = lambda self, other: self.from_combination(self, other, "^")
+    __sub__             = lambda self, other: self.from_combination(self, other, "-")
+    __rsub__            = lambda self, other: self.from_combination(other, self, "-")
+
+def _to_mask(roles) -> int:
+    if isinstance(roles, Category):
+        return roles._mask
+    mask = 0
+    for role in roles:
+        if role not in _ROLE_BITS:
+            raise ValueError("{0!r} is not a role".format(role))
+        mask |= _ROLE_BITS[role]
+    return mask
+
+def _cache_key(operand):
+    if isinstance(operand, Category):
+        # the name is part of the key, as it determines the name of the result
+        return operand.name, operand._mask
+    return frozenset(operand)
 
 # For proper auto-completion support in IDEs, please do not try to "save space" by turning this into a loop
 # and dynamically creating globals.
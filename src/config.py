@@ -4,6 +4,8 @@ import copy
 from pathlib import Path
 import os
 import sys
+import threading
+from types import MappingProxyType
 from typing import Optional, Any, Iterable
 from ruamel.yaml import YAML
 
@@ -22,6 +24,9 @@ Empty = EmptyType()
 class InvalidConfigValue(ValueError):
     pass
 
+# Values of these types are immutable and can be handed out without copying them
+_IMMUTABLE_TYPES = (str, int, float, type(None), EmptyType)
+
 def init():
     bp = Path(__file__).parent
     Main.load_metadata(bp / "defaultsettings.yml")
@@ -53,6 +58,27 @@ class Config:
         self._metadata_file: Optional[str | Path] = None
         self._settings: Any = Empty
         self._files: list[str | Path] = []
+        # Caches of resolved keys and read-only views, keyed by the dotted key.
+        # These are dropped whenever settings change; the generation guards against
+        # a concurrent lookup repopulating the cache with stale data. Lookups read the
+        # caches without locking, but storing into them and dropping them hold the lock,
+        # so that a lookup cannot store its result after the settings it read changed.
+        self._keys: dict[str, tuple[Any, dict[str, Any]]] = {}
+        self._views: dict[str, Any] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._keys.clear()
+            self._views.clear()
+
+    def _store(self, cache: dict[str, Any], key: str, value: Any, generation: int) -> None:
+        # only cache values which were computed from the current settings
+        with self._lock:
+            if generation == self._generation:
+                cache[key] = value
 
     def load_metadata(self, file: str | Path) -> None:
         """Load metadata into the current Config instance.
@@ -67,6 +93,7 @@ class Config:
             self._metadata = y.load(f)
         # load default settings
         self._settings = merge(self._metadata, Empty, Empty, "<root>")
+        self._invalidate()
 
     def load_config(self, file: str | Path) -> None:
         """Load configuration file into the current Config instance.
@@ -85,6 +112,7 @@ class Config:
         with open(file) as f:
             config = y.load(f)
             self._settings = merge(self._metadata, self._settings, config, "<root>")
+        self._invalidate()
 
     def reload(self, refresh_metadata=False):
         """Reload configuration files to pick up any changes.
@@ -109,8 +137,20 @@ class Config:
 
         self._metadata = new_config._metadata
         self._settings = new_config._settings
+        self._invalidate()
 
     def _resolve_key(self, key: str) -> tuple[Any, dict[str, Any]]:
+        try:
+            return self._keys[key]
+        except KeyError:
+            pass
+
+        generation = self._generation
+        resolved = self._walk_key(key)
+        self._store(self._keys, key, resolved, generation)
+        return resolved
+
+    def _walk_key(self, key: str) -> tuple[Any, dict[str, Any]]:
         assert self._metadata is not None
         parts = key.split(".")
         cur = self._settings
@@ -188,11 +228,46 @@ class Config:
                 return default
             raise
 
+        if isinstance(cur, _IMMUTABLE_TYPES):
+            return cur
+
         # return a copy so that the caller cannot mutate our actual settings
         # this lets them mutate the returned value to serve their own purposes without needing to worry
         # about causing issues with other call sites that need the setting
         return copy.deepcopy(cur)
 
+    def view(self, key: str, default=Empty):
+        """Get a read-only view of a configuration item.
+
+        This works like get(), but rather than returning a copy, dicts are returned as read-only
+        mappings and lists as tuples (recursively). Views are cached until the configuration changes,
+        making this cheaper than get() for complex values which the caller does not need to mutate.
+
+        :param key: Configuration key to load, in the same format as get()
+        :param default: If the configuration key is not found, this is the returned value.
+            If set to config.Empty (the default), a KeyError is raised if the key is not found.
+        :returns: A read-only view of the configuration key, or the default value if one was specified.
+        :raises KeyError: If default is not specified and the key is not found.
+        :raises AssertionError: If called before configuration is initialized.
+        """
+        try:
+            return self._views[key]
+        except KeyError:
+            pass
+
+        assert self._settings is not Empty
+        generation = self._generation
+        try:
+            cur, _ = self._resolve_key(key)
+        except KeyError:
+            if default is not Empty:
+                return default
+            raise
+
+        value = _freeze(cur)
+        self._store(self._views, key, value, generation)
+        return value
+
     def set(self, key: str, value, merge_strategy: Optional[str] = None) -> None:
         """Modify a single config key.
 
@@ -233,6 +308,8 @@ class Config:
                     cur[key_part] = new
                 cur = cur[key_part]
 
+        self._invalidate()
+
     @property
     def metadata(self):
         return self._metadata
@@ -240,6 +317,16 @@ class Config:
 
 Main = Config()
 
+def _freeze(value):
+    """Return a recursively read-only copy of a configuration value."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
 def merge(metadata: dict[str, Any], base, settings, *path: str,
           type_override: Optional[str] = None,
           strategy_override: Optional[str] = None,
@@ -2,15 +2,17 @@ from __future__ import annotations
 
 import copy
 from abc import ABC, abstractmethod
-from typing import Dict, Generic, Iterable, List, Set, TypeVar
+from typing import Callable, Dict, Generic, Iterable, List, Set, TypeVar
 
 from src.users import User
 
-__all__ = ["UserList", "UserSet", "UserDict", "DefaultUserDict"]
+__all__ = ["UserList", "UserSet", "UserDict", "DefaultUserDict", "TrackedUserList", "TrackedUserDict"]
 
 KT = TypeVar("KT")
 VT = TypeVar("VT")
 
+_missing = object()
+
 """ * Important *
 
 The containers present here should always follow these rules:
@@ -88,6 +90,9 @@ class Container(ABC):
 class UserList(Container, List[User]):
     def __init__(self, iterable=()):
         super().__init__()
+        # number of times each user (by identity) appears in the list, so that we know
+        # when to drop the back-reference without scanning the list
+        self._counts: dict[int, int] = {}
         try:
             for item in iterable:
                 self.append(item)
@@ -95,6 +100,20 @@ class UserList(Container, List[User]):
             self.clear()
             raise
 
+    def _track(self, item: User):
+        count = self._counts.get(id(item), 0)
+        if not count:
+            item.lists.add(self)
+        self._counts[id(item)] = count + 1
+
+    def _untrack(self, item: User):
+        count = self._counts[id(item)] - 1
+        if count:
+            self._counts[id(item)] = count
+        else:
+            del self._counts[id(item)]
+            item.lists.remove(self)
+
     def __add__(self, other):
         if not isinstance(other, list):
             return NotImplemented
@@ -113,26 +132,21 @@ class UserList(Container, List[User]):
 
         item = self[index]
         super().__setitem__(index, value)
-        if item not in self:
-            item.lists.remove(self)
-
-        if self not in value.lists:
-            value.lists.append(self)
+        self._track(value)
+        self._untrack(item)
 
     def __delitem__(self, index):
         item = self[index]
 
         super().__delitem__(index)
 
-        if item not in self: # there may have been multiple instances
-            item.lists.remove(self)
+        self._untrack(item)
 
     def append(self, item):
         if not isinstance(item, User):
             raise TypeError("UserList may only contain User instances")
 
-        if self not in item.lists:
-            item.lists.append(self)
+        self._track(item)
 
         super().append(item)
 
@@ -141,6 +155,7 @@ class UserList(Container, List[User]):
             if self in item.lists:
                 item.lists.remove(self)
 
+        self._counts.clear()
         super().clear()
 
     def extend(self, iterable):
@@ -155,22 +170,18 @@ class UserList(Container, List[User]):
 
         # If it didn't work, we don't get here
 
-        if self not in item.lists:
-            item.lists.append(self)
+        self._track(item)
 
     def pop(self, index=-1):
         item = super().pop(index)
 
-        if item not in self:
-            item.lists.remove(self)
+        self._untrack(item)
 
         return item
 
     def remove(self, item):
-        super().remove(item)
-
-        if item not in self:
-            item.lists.remove(self)
+        # remove the matching element rather than item itself, since they may not be the same instance
+        del self[self.index(item)]
 
 class UserSet(Container, Set[User]):
     def __init__(self, iterable=()):
@@ -224,7 +235,7 @@ class UserSet(Container, Set[User]):
             if not isinstance(item, User):
                 raise TypeError("UserSet may only contain User instances")
 
-            item.sets.append(self)
+            item.sets.add(self)
             super().add(item)
 
     def clear(self):
@@ -286,6 +297,9 @@ class UserSet(Container, Set[User]):
 class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
     def __init__(self, _it=(), **kwargs):
         super().__init__()
+        # number of times each user (by identity) appears as a value, so that we know
+        # when to drop the back-reference without scanning the values
+        self._value_counts: dict[int, int] = {}
         if hasattr(_it, "items"):
             _it = _it.items()
         try:
@@ -322,20 +336,31 @@ class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
             new[key] = copy.deepcopy(value, memo)
         return new
 
+    def _track_value(self, value):
+        if isinstance(value, User):
+            count = self._value_counts.get(id(value), 0)
+            if not count:
+                value.dict_values.add(self)
+            self._value_counts[id(value)] = count + 1
+
+    def _untrack_value(self, value):
+        if isinstance(value, User):
+            count = self._value_counts[id(value)] - 1
+            if count:
+                self._value_counts[id(value)] = count
+            else:
+                del self._value_counts[id(value)]
+                value.dict_values.remove(self)
+
     def __setitem__(self, item, value):
-        old = self.get(item)
+        old = self.get(item, _missing)
         super().__setitem__(item, value)
-        if isinstance(old, User):
-            if old not in self.values():
-                old.dict_values.remove(self)
+        self._track_value(value)
+        if old is not _missing:
+            self._untrack_value(old)
 
         if isinstance(item, User):
-            if self not in item.dict_keys:
-                item.dict_keys.append(self)
-
-        if isinstance(value, User):
-            if self not in value.dict_values:
-                value.dict_values.append(self)
+            item.dict_keys.add(self)
 
     def __delitem__(self, item):
         if isinstance(item, slice): # special-case: delete if it exists, otherwise don't
@@ -349,9 +374,7 @@ class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
         if isinstance(item, User):
             item.dict_keys.remove(self)
 
-        if isinstance(value, User):
-            if value not in self.values():
-                value.dict_values.remove(self)
+        self._untrack_value(value)
 
         if isinstance(value, (UserSet, UserList, UserDict)):
             value.clear()
@@ -361,12 +384,12 @@ class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
             if isinstance(key, User):
                 key.dict_keys.remove(self)
             if isinstance(value, User):
-                if self in value.dict_values:
-                    value.dict_values.remove(self)
+                value.dict_values.discard(self)
 
             if isinstance(value, (UserList, UserSet, UserDict)):
                 value.clear()
 
+        self._value_counts.clear()
         super().clear()
 
     @classmethod
@@ -374,22 +397,19 @@ class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
         return cls(dict.fromkeys(iterable, value))
 
     def pop(self, key, *default):
-        value = super().pop(key, *default)
+        value = super().pop(key, _missing)
+        if value is _missing:
+            return super().pop(key, *default)
         if isinstance(key, User):
-            if self in key.dict_keys:
-                key.dict_keys.remove(self)
-        if isinstance(value, User):
-            if value not in self.values():
-                value.dict_values.remove(self)
+            key.dict_keys.discard(self)
+        self._untrack_value(value)
         return value
 
     def popitem(self):
         key, value = super().popitem()
         if isinstance(key, User):
             key.dict_keys.remove(self)
-        if isinstance(value, User):
-            if value not in self.values():
-                value.dict_values.remove(self)
+        self._untrack_value(value)
         return key, value
 
     def setdefault(self, key, default=None):
@@ -411,3 +431,93 @@ class DefaultUserDict(UserDict[KT, VT], Generic[KT, VT]):
     def __missing__(self, key):
         self[key] = self.factory()
         return self[key]
+
+class TrackedUserList(UserList):
+    """UserList which calls a function after every change, to let the owner invalidate anything derived from it.
+
+    Copies are plain UserLists.
+    """
+
+    def __init__(self, _callback: Callable[[], None], iterable=()):
+        self.callback = _callback
+        super().__init__(iterable)
+
+    def __copy__(self):
+        return UserList(self)
+
+    def __deepcopy__(self, memo):
+        return UserList(copy.deepcopy(x, memo) for x in self)
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.callback()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.callback()
+
+    def append(self, item):
+        super().append(item)
+        self.callback()
+
+    def clear(self):
+        super().clear()
+        self.callback()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self.callback()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self.callback()
+        return item
+
+    def reverse(self):
+        super().reverse()
+        self.callback()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.callback()
+
+class TrackedUserDict(UserDict[KT, VT], Generic[KT, VT]):
+    """UserDict which calls a function after every change, to let the owner invalidate anything derived from it.
+
+    Copies are plain UserDicts.
+    """
+
+    def __init__(self, _callback: Callable[[], None], _it=(), **kwargs):
+        self.callback = _callback
+        super().__init__(_it, **kwargs)
+
+    def __copy__(self):
+        return UserDict(self)
+
+    def __deepcopy__(self, memo):
+        new = UserDict()
+        for key, value in self.items():
+            new[key] = copy.deepcopy(value, memo)
+        return new
+
+    def __setitem__(self, item, value):
+        super().__setitem__(item, value)
+        self.callback()
+
+    def __delitem__(self, item):
+        super().__delitem__(item)
+        self.callback()
+
+    def clear(self):
+        super().clear()
+        self.callback()
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self.callback()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self.callback()
+        return item
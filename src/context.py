@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import logging
 import sys
+import threading
 from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
 from typing import Any, Optional
 
 from oyoyo.client import IRCClient
+from oyoyo.scheduler import Priority
 from src import config
 from src.messages.message import Message
 
@@ -24,6 +27,27 @@ class _NotLoggedIn:
 
 NotLoggedIn = _NotLoggedIn()
 
+_priority = threading.local()
+
+@contextmanager
+def send_priority(priority: Priority):
+    """Send messages with the given priority within the block, unless a priority is passed explicitly.
+
+    This applies to the current thread only, and can be nested.
+    """
+    previous = getattr(_priority, "value", None)
+    _priority.value = priority
+    try:
+        yield
+    finally:
+        _priority.value = previous
+
+def _current_priority() -> Priority:
+    value = getattr(_priority, "value", None)
+    if value is None:
+        return Priority.INTERACTIVE
+    return value
+
 def _who(cli, target, data=b""):
     """Handle WHO requests."""
 
@@ -39,13 +63,13 @@ def _who(cli, target, data=b""):
         data = b""
 
     if Features.WHOX:
-        cli.send("WHO", target, b"%tcuihsnfdlar," + data)
+        cli.send("WHO", target, b"%tcuihsnfdlar," + data, priority=Priority.BACKGROUND)
     else:
-        cli.send("WHO", target)
+        cli.send("WHO", target, priority=Priority.BACKGROUND)
 
     return int.from_bytes(data, "little")
 
-def _send(data, first, sep, client, send_type, name, chan=None):
+def _send(data, first, sep, client, send_type, name, chan=None, priority=None):
     full_address = "{cli.nickname}!{cli.ident}@{cli.hostmask}".format(cli=client)
 
     # Maximum length of sent data is 512 bytes. However, we have to
@@ -92,10 +116,22 @@ def _send(data, first, sep, client, send_type, name, chan=None):
         messages.append(cur_sep)
         messages.append(line)
 
+    if priority is None:
+        priority = _current_priority()
+
     for line in "".join(messages).split("\n"):
         while line:
             extra, line = line[:length], line[length:]
-            client.send("{0} {1} {4}:{2}{3}".format(send_type, name, first, extra, chan))
+            client.send("{0} {1} {4}:{2}{3}".format(send_type, name, first, extra, chan), priority=priority)
+
+# Translation tables applied on top of str.lower() for each supported casemapping
+_CASEMAPPINGS: dict[str, dict[int, int]] = {
+    "rfc1459": str.maketrans("[]\\^", "{}|~"),
+    "strict-rfc1459": str.maketrans("[]\\", "{}|"),
+    "ascii": {},
+}
+# some servers and documentation use this spelling instead
+_CASEMAPPINGS["rfc1459-strict"] = _CASEMAPPINGS["strict-rfc1459"]
 
 def lower(nick: Optional[str | IRCContext], *, casemapping: Optional[str] = None):
     if nick is None or nick is NotLoggedIn:
@@ -105,19 +141,7 @@ def lower(nick: Optional[str | IRCContext], *, casemapping: Optional[str] = None
     if casemapping is None:
         casemapping = Features.CASEMAPPING
 
-    mapping: dict[str, Optional[str | int]] = {
-        "[": "{",
-        "]": "}",
-        "\\": "|",
-        "^": "~",
-    }
-
-    if casemapping == "strict-rfc1459":
-        mapping.pop("^")
-    elif casemapping == "ascii":
-        mapping.clear()
-
-    return nick.lower().translate(str.maketrans(mapping))
+    return nick.lower().translate(_CASEMAPPINGS.get(casemapping, _CASEMAPPINGS["rfc1459"]))
 
 def equals(nick1: Optional[str | IRCContext], nick2: Optional[str | IRCContext]):
     return nick1 is not None and nick2 is not None and lower(nick1) == lower(nick2)
@@ -194,7 +218,7 @@ class IRCContext:
         self._messages[message].append(self)
 
     @classmethod
-    def send_messages(cls, *, notice=False, privmsg=False):
+    def send_messages(cls, *, notice=False, privmsg=False, priority=None):
         messages = list(cls._messages.items())
         cls._messages.clear()
         for message, targets in messages:
@@ -211,7 +235,7 @@ class IRCContext:
                 max_targets = Features["TARGMAX"][send_type]
                 while targets:
                     using, targets = targets[:max_targets], targets[max_targets:]
-                    _send(message, "", " ", using[0].client, send_type, ",".join([t.nick for t in using]), send_chan)
+                    _send(message, "", " ", using[0].client, send_type, ",".join([t.nick for t in using]), send_chan, priority)
 
     @classmethod
     def get_context_type(cls, *, max_types=1):
@@ -266,7 +290,7 @@ class IRCContext:
                 return "CNOTICE", cprivmsg_eligible.name
         return send_type, None
 
-    def send(self, *data, first=None, sep=None, notice=False, privmsg=False, prefix=None):
+    def send(self, *data, first=None, sep=None, notice=False, privmsg=False, prefix=None, priority=None):
         new = []
         for line in data:
             # support deferred messages
@@ -299,7 +323,7 @@ class IRCContext:
             first = ""
         if sep is None:
             sep = " "
-        _send(new, first, sep, self.client, send_type, name, send_chan)
+        _send(new, first, sep, self.client, send_type, name, send_chan, priority)
 
     @property
     def prefix(self):
@@ -318,7 +342,9 @@ class IRCFeatures:
     @property
     def CASEMAPPING(self) -> str:
         value = self._features.get("CASEMAPPING", "rfc1459")
-        if value not in ("rfc1459", "rfc1459-strict", "ascii"):
+        if value == "rfc1459-strict":
+            value = "strict-rfc1459"
+        elif value not in ("rfc1459", "strict-rfc1459", "ascii"):
             value = "rfc1459"
         return value
 
@@ -627,6 +653,10 @@ class IRCTargMaxFeature:
     def __init__(self, features: IRCFeatures, value: Optional[str] = None):
         self._features = features
         self._commands: dict[str, int] = {}
+        if value:
+            for part in value.split(","):
+                command, _, limit = part.partition(":")
+                self._commands[command.lower()] = int(limit) if limit else sys.maxsize
 
     def __getitem__(self, item: str) -> int:
         item = item.lower()
@@ -3,14 +3,17 @@ from __future__ import annotations
 import sqlite3
 import os
 import json
+import queue
 import shutil
 import sys
 import time
 import threading
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from datetime import datetime
+from typing import Callable, Optional
 
-from src import users
+from src import config, profiler, users
+from src.debug import handle_error
 from src.utilities import singular
 from src.messages import messages, LocalRole
 from src.cats import role_order
@@ -20,13 +23,13 @@ __all__ = ["init_vars", "decrement_stasis", "set_stasis", "get_template", "get_t
            "set_pre_restart_state", "set_access", "get_pre_restart_state", "get_warning", "get_warning_points",
            "get_game_stats", "get_role_stats", "get_role_totals", "get_game_totals", "get_player_totals",
            "get_warning_sanctions", "get_player_stats", "add_warning", "add_warning_sanction", "acknowledge_warning",
-           "add_game", "list_all_warnings", "list_warnings", "del_warning", "has_unacknowledged_warnings",
-           "expire_tempbans", "expire_stasis", "PREFER_NOTICE", "STASISED", "PING_IF_PREFS", "PING_IF_NUMS",
-           "DEADCHAT_PREFS", "FLAGS", "DENY", "ALL_FLAGS"]
+           "add_game", "flush", "check_stats", "list_all_warnings", "list_warnings", "del_warning", "has_unacknowledged_warnings",
+           "get_unacknowledged_accounts", "expire_tempbans", "expire_stasis", "PREFER_NOTICE", "STASISED", "PING_IF_PREFS", "PING_IF_NUMS",
+           "DEADCHAT_PREFS", "FLAGS", "DENY", "WARNINGS", "ALL_FLAGS"]
 
 # increment this whenever making a schema change so that the schema upgrade functions run on start
 # they do not run by default for performance reasons
-SCHEMA_VERSION = 9
+SCHEMA_VERSION = 10
 
 # Constant of all the flags that the bot uses
 # This is not meant to be modified
@@ -57,9 +60,21 @@ PING_IF_NUMS: defaultdict[int, set[str]] = defaultdict(set)
 DEADCHAT_PREFS: set[str] = set()
 FLAGS: defaultdict[str, str] = defaultdict(str)
 DENY: defaultdict[str, set[str]] = defaultdict(set)
+# Warnings which haven't been deleted, as (warning id, points, expiry time, acknowledged).
+# Use get_warning_points() and has_unacknowledged_warnings() rather than reading this directly,
+# as they also take expiry into account.
+WARNINGS: defaultdict[str, list[tuple[int, int, Optional[str], bool]]] = defaultdict(list)
 
 _ts = threading.local()
 
+# Maximum number of accounts whose ids are cached by _get_ids
+ID_CACHE_SIZE = 1024
+
+# lowercased account -> (person id, player id, display name), least recently used first
+_id_cache: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+_id_cache_lock = threading.Lock()
+_id_cache_stats = {"hits": 0, "misses": 0}
+
 def init_vars():
     from src.context import lower
     conn = _conn()
@@ -126,6 +141,54 @@ def init_vars():
             lacc = lower(acc)
             DENY[lacc].add(command)
 
+    _load_warnings(c)
+
+def _load_warnings(c, peid=None):
+    # load the warnings of a single person, or of everyone if peid is None
+    from src.context import lower
+    sql = """SELECT
+               pl.account_display,
+               w.id,
+               w.amount,
+               w.expires,
+               w.acknowledged
+             FROM warning w
+             JOIN player pl
+               ON pl.person = w.target
+             WHERE
+               pl.active = 1
+               AND w.deleted = 0
+               AND (
+                 w.expires IS NULL
+                 OR w.expires > datetime('now')
+               )"""
+    if peid is None:
+        c.execute(sql)
+        rows = c.fetchall()
+        WARNINGS.clear()
+    else:
+        c.execute("SELECT account_display FROM player WHERE person = ? AND active = 1", (peid,))
+        for acc, in c.fetchall():
+            WARNINGS.pop(lower(acc), None)
+        c.execute(sql + " AND w.target = ?", (peid,))
+        rows = c.fetchall()
+
+    for acc, warning, amount, expires, acknowledged in rows:
+        WARNINGS[lower(acc)].append((warning, amount, expires, bool(acknowledged)))
+
+def _reload_warning(c, warning):
+    c.execute("SELECT target FROM warning WHERE id = ?", (warning,))
+    row = c.fetchone()
+    if row is not None:
+        _load_warnings(c, row[0])
+
+def _active_warnings(acc):
+    from src.context import lower
+    # warnings expire without the database changing, so filter out expired ones here
+    # expiry times are stored as UTC in the same format as datetime('now')
+    now = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    return [w for w in WARNINGS.get(lower(acc), ()) if w[2] is None or w[2] > now]
+
 def decrement_stasis(acc=None):
     peid, plid = _get_ids(acc)
     if acc is not None and peid is None:
@@ -273,30 +336,130 @@ def add_game(mode, size, started, finished, winner, players, options):
         individual_win: True/False
         dced: True/False
     }
-    """
 
-    # Normalize players dict
-    conn = _conn()
+    The game is written from the database writer thread; use flush() to wait until it is committed.
+    """
+    # Normalize players dict. This must happen on the calling thread: looking up an account
+    # can add it or reload the access tables (init_vars), which other code reads unlocked.
     for p in players:
-        c = conn.cursor()
         p["personid"], p["playerid"] = _get_ids(p["account"], add=True)
+    _writer.submit(_add_game, mode, size, started, finished, winner, players, options)
 
-    c = conn.cursor()
+def _add_game(c, mode, size, started, finished, winner, players, options):
     c.execute("""INSERT INTO game (gamemode, options, started, finished, gamesize, winner)
                  VALUES (?, ?, ?, ?, ?, ?)""", (mode, json.dumps(options), started, finished, size, winner))
     gameid = c.lastrowid
-    for p in players:
-        c.execute("""INSERT INTO game_player (game, player, team_win, indiv_win, dced)
-                     VALUES (?, ?, ?, ?, ?)""", (gameid, p["playerid"], p["team_win"], p["individual_win"], p["dced"]))
-        gpid = c.lastrowid
-        for role in p["all_roles"]:
-            c.execute("""INSERT INTO game_player_role (game_player, role, special)
-                         VALUES (?, ?, 0)""", (gpid, role))
-        for sq in p["special"]:
-            c.execute("""INSERT INTO game_player_role (game_player, role, special)
-                         VALUES (?, ?, 1)""", (gpid, sq))
+    c.executemany("""INSERT INTO game_player (game, player, team_win, indiv_win, dced)
+                     VALUES (?, ?, ?, ?, ?)""",
+                  [(gameid, p["playerid"], p["team_win"], p["individual_win"], p["dced"]) for p in players])
+    # rowids are assigned in insertion order, so these line up with players
+    c.execute("SELECT id FROM game_player WHERE game = ? ORDER BY id", (gameid,))
+    gpids = [row[0] for row in c.fetchall()]
+    roles = []
+    for gpid, p in zip(gpids, players):
+        roles.extend((gpid, role, 0) for role in p["all_roles"])
+        roles.extend((gpid, sq, 1) for sq in p["special"])
+    c.executemany("""INSERT INTO game_player_role (game_player, role, special)
+                     VALUES (?, ?, ?)""", roles)
+    _update_stats(c, gameid)
+
+# Queries computing the stats summary tables from the raw game rows; {0} selects which games are included.
+# Every summary table is a sum over games, so a new game is added to them by running its query for that
+# game alone and adding the results to the existing rows.
+_STATS_QUERIES = {
+    "stats_game": ("gamemode, gamesize, winner", "games",
+                   """SELECT g.gamemode, g.gamesize, g.winner, COUNT(1)
+                      FROM game g
+                      WHERE {0}
+                      GROUP BY g.gamemode, g.gamesize, g.winner"""),
+    "stats_role": ("role, gamemode", "team_wins, indiv_wins, overall_wins, games",
+                   """SELECT gpr.role, g.gamemode, SUM(gp.team_win), SUM(gp.indiv_win), SUM(gp.team_win OR gp.indiv_win), COUNT(1)
+                      FROM game g
+                      JOIN game_player gp
+                        ON gp.game = g.id
+                      JOIN game_player_role gpr
+                        ON gpr.game_player = gp.id
+                      WHERE {0}
+                      GROUP BY gpr.role, g.gamemode"""),
+    "stats_person_role": ("person, role", "team_wins, indiv_wins, overall_wins, games",
+                          """SELECT pl.person, gpr.role, SUM(gp.team_win), SUM(gp.indiv_win), SUM(gp.team_win OR gp.indiv_win), COUNT(1)
+                             FROM game g
+                             JOIN game_player gp
+                               ON gp.game = g.id
+                             JOIN player pl
+                               ON pl.id = gp.player
+                             JOIN game_player_role gpr
+                               ON gpr.game_player = gp.id
+                             WHERE {0}
+                             GROUP BY pl.person, gpr.role"""),
+    "stats_person": ("person", "wins, games",
+                     """SELECT pl.person, SUM(gp.team_win OR gp.indiv_win), COUNT(DISTINCT gp.game)
+                        FROM game g
+                        JOIN game_player gp
+                          ON gp.game = g.id
+                        JOIN player pl
+                          ON pl.id = gp.player
+                        WHERE {0}
+                        GROUP BY pl.person"""),
+}
 
-    conn.commit()
+def _update_stats(c, gameid):
+    for table, (keys, values, query) in _STATS_QUERIES.items():
+        columns = "{0}, {1}".format(keys, values)
+        if table == "stats_game":
+            # winner may be NULL, which can't be part of a conflict target
+            c.execute(query.format("g.id = ?"), (gameid,))
+            mode, size, winner, games = c.fetchone()
+            c.execute("""UPDATE stats_game
+                         SET games = games + ?
+                         WHERE gamemode = ? AND gamesize = ? AND winner IS ?""", (games, mode, size, winner))
+            if c.rowcount == 0:
+                c.execute("INSERT INTO stats_game ({0}) VALUES (?, ?, ?, ?)".format(columns), (mode, size, winner, games))
+            continue
+        updates = ", ".join("{0} = {0} + excluded.{0}".format(v.strip()) for v in values.split(","))
+        c.execute("""INSERT INTO {0} ({1})
+                     {2}
+                     ON CONFLICT ({3}) DO UPDATE SET {4}""".format(table, columns, query.format("g.id = ?"), keys, updates),
+                  (gameid,))
+
+def _rebuild_stats(c):
+    for table, (keys, values, query) in _STATS_QUERIES.items():
+        c.execute("DELETE FROM {0}".format(table))
+        c.execute("INSERT INTO {0} ({1}, {2}) {3}".format(table, keys, values, query.format("1")))
+
+def check_stats(repair=False):
+    """Recompute the stats summary tables from the raw game rows and compare them.
+
+    :param repair: If True, rebuild any tables which don't match
+    :return: Names of the tables which didn't match
+    """
+    flush()
+    conn = _conn()
+    c = conn.cursor()
+    mismatched = []
+    for table, (keys, values, query) in _STATS_QUERIES.items():
+        c.execute(query.format("1"))
+        expected = _stats_rows(c, keys)
+        c.execute("SELECT {0}, {1} FROM {2}".format(keys, values, table))
+        if _stats_rows(c, keys) != expected:
+            mismatched.append(table)
+    if repair and mismatched:
+        _rebuild_stats(c)
+        conn.commit()
+    return mismatched
+
+def _stats_rows(c, keys):
+    # text keys are compared case-insensitively, as they are in the summary tables
+    rows = defaultdict(list)
+    num_keys = len(keys.split(","))
+    for row in c:
+        key = tuple(k.lower() if isinstance(k, str) else k for k in row[:num_keys])
+        rows[key].append(row[num_keys:])
+    return {key: [sum(x) for x in zip(*value)] for key, value in rows.items()}
+
+def flush():
+    """Block until every write queued by add_game has been committed."""
+    _writer.flush()
 
 def get_player_stats(acc, role):
     peid, plid = _get_ids(acc)
@@ -304,22 +467,9 @@ def get_player_stats(acc, role):
         return messages["db_pstats_no_game"].format(acc)
     conn = _conn()
     c = conn.cursor()
-    c.execute("""SELECT
-                   gpr.role AS role,
-                   SUM(gp.team_win) AS team,
-                   SUM(gp.indiv_win) AS indiv,
-                   SUM(gp.team_win OR gp.indiv_win) AS overall,
-                   COUNT(1) AS total
-                 FROM person pe
-                 JOIN player pl
-                   ON pl.person = pe.id
-                 JOIN game_player gp
-                   ON gp.player = pl.id
-                 JOIN game_player_role gpr
-                   ON gpr.game_player = gp.id
-                   AND gpr.role = ?
-                 WHERE pe.id = ?
-                 GROUP BY role""", (role, peid))
+    c.execute("""SELECT role, team_wins, indiv_wins, overall_wins, games
+                 FROM stats_person_role
+                 WHERE role = ? AND person = ?""", (role, peid))
     row = c.fetchone()
     name = _get_display_name(peid)
     if row:
@@ -334,29 +484,12 @@ def get_player_totals(acc):
         return (messages["db_pstats_no_game"].format(acc), [])
     conn = _conn()
     c = conn.cursor()
-    c.execute("""SELECT
-                   gpr.role AS role,
-                   COUNT(1) AS total
-                 FROM person pe
-                 JOIN player pl
-                   ON pl.person = pe.id
-                 JOIN game_player gp
-                   ON gp.player = pl.id
-                 JOIN game_player_role gpr
-                   ON gpr.game_player = gp.id
-                 WHERE pe.id = ?
-                 GROUP BY role""", (peid,))
+    c.execute("SELECT role, games FROM stats_person_role WHERE person = ?", (peid,))
     tmp = {}
     totals = []
     for row in c:
         tmp[row[0]] = row[1]
-    c.execute("""SELECT SUM(gp.team_win OR gp.indiv_win)
-                 FROM game_player gp
-                 JOIN player pl
-                   ON pl.id = gp.player
-                 JOIN person pe
-                   ON pe.id = pl.person
-                 WHERE pe.id = ?""", (peid,))
+    c.execute("SELECT wins FROM stats_person WHERE person = ?", (peid,))
     won_games = c.fetchone()[0]
     order = list(role_order())
     name = _get_display_name(peid)
@@ -371,9 +504,9 @@ def get_game_stats(mode, size):
     c = conn.cursor()
 
     if mode == "*":
-        c.execute("SELECT COUNT(1) FROM game WHERE gamesize = ?", (size,))
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM stats_game WHERE gamesize = ?", (size,))
     else:
-        c.execute("SELECT COUNT(1) FROM game WHERE gamemode = ? AND gamesize = ?", (mode, size))
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM stats_game WHERE gamemode = ? AND gamesize = ?", (mode, size))
 
     total_games = c.fetchone()[0]
     if not total_games:
@@ -382,12 +515,12 @@ def get_game_stats(mode, size):
     if mode == "*":
         c.execute("""SELECT
                        winner AS team,
-                       COUNT(1) AS games,
+                       SUM(games) AS games,
                        CASE winner
                          WHEN 'villagers' THEN 0
                          WHEN 'wolves' THEN 1
                          ELSE 2 END AS ord
-                     FROM game
+                     FROM stats_game
                      WHERE
                        gamesize = ?
                        AND winner IS NOT NULL
@@ -396,12 +529,12 @@ def get_game_stats(mode, size):
     else:
         c.execute("""SELECT
                        winner AS team,
-                       COUNT(1) AS games,
+                       SUM(games) AS games,
                        CASE winner
                          WHEN 'villagers' THEN 0
                          WHEN 'wolves' THEN 1
                          ELSE 2 END AS ord
-                     FROM game
+                     FROM stats_game
                      WHERE
                        gamemode = ?
                        AND gamesize = ?
@@ -435,9 +568,9 @@ def get_game_totals(mode):
     c = conn.cursor()
 
     if mode == "*":
-        c.execute("SELECT COUNT(1) FROM game")
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM stats_game")
     else:
-        c.execute("SELECT COUNT(1) FROM game WHERE gamemode = ?", (mode,))
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM stats_game WHERE gamemode = ?", (mode,))
 
     total_games = c.fetchone()[0]
     if not total_games:
@@ -448,15 +581,15 @@ def get_game_totals(mode):
     if mode == "*":
         c.execute("""SELECT
                        gamesize,
-                       COUNT(1) AS games
-                     FROM game
+                       SUM(games) AS games
+                     FROM stats_game
                      GROUP BY gamesize
                      ORDER BY gamesize ASC""")
     else:
         c.execute("""SELECT
                        gamesize,
-                       COUNT(1) AS games
-                     FROM game
+                       SUM(games) AS games
+                     FROM stats_game
                      WHERE gamemode = ?
                      GROUP BY gamesize
                      ORDER BY gamesize ASC""", (mode,))
@@ -474,34 +607,19 @@ def get_role_stats(role, mode=None):
 
     if mode is None:
         c.execute("""SELECT
-                   gpr.role AS role,
-                   SUM(gp.team_win) AS team,
-                   SUM(gp.indiv_win) AS indiv,
-                   SUM(gp.team_win OR gp.indiv_win) AS overall,
-                   COUNT(1) AS total
-                 FROM game g
-                 JOIN game_player gp
-                   ON gp.game = g.id
-                 JOIN game_player_role gpr
-                   ON gpr.game_player = gp.id
+                   role,
+                   SUM(team_wins) AS team,
+                   SUM(indiv_wins) AS indiv,
+                   SUM(overall_wins) AS overall,
+                   SUM(games) AS total
+                 FROM stats_role
                  WHERE role = ?
                  GROUP BY role""", (role,))
     else:
-        c.execute("""SELECT
-                   gpr.role AS role,
-                   SUM(gp.team_win) AS team,
-                   SUM(gp.indiv_win) AS indiv,
-                   SUM(gp.team_win OR gp.indiv_win) AS overall,
-                   COUNT(1) AS total,
-                   g.gamemode AS gamemode
-                 FROM game g
-                 JOIN game_player gp
-                   ON gp.game = g.id
-                 JOIN game_player_role gpr
-                   ON gpr.game_player = gp.id
+        c.execute("""SELECT role, team_wins, indiv_wins, overall_wins, games, gamemode
+                 FROM stats_role
                  WHERE role = ?
-                   AND gamemode = ?
-                 GROUP BY role, gamemode""", (role, mode))
+                   AND gamemode = ?""", (role, mode))
 
     row = c.fetchone()
     if row:
@@ -520,9 +638,9 @@ def get_role_totals(mode=None):
     conn = _conn()
     c = conn.cursor()
     if mode is None:
-        c.execute("SELECT COUNT(1) FROM game")
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM stats_game")
     else:
-        c.execute("SELECT COUNT(1) FROM game WHERE gamemode = ?", (mode,))
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM stats_game WHERE gamemode = ?", (mode,))
     total_games = c.fetchone()[0]
     if not total_games:
         if mode is None:
@@ -531,22 +649,17 @@ def get_role_totals(mode=None):
 
     if mode is None:
         c.execute("""SELECT
-                   gpr.role AS role,
-                  COUNT(1) AS count
-                  FROM game_player_role gpr
+                   role,
+                   SUM(games) AS count
+                  FROM stats_role
                   GROUP BY role
                   ORDER BY count DESC""")
     else:
         c.execute("""SELECT
-                   gpr.role AS role,
-                  COUNT(1) AS count
-                  FROM game_player_role gpr
-                  JOIN game_player gp
-                    ON gp.id = gpr.game_player
-                  JOIN game g
-                    ON g.id = gp.game
-                  WHERE g.gamemode = ?
-                  GROUP BY role
+                   role,
+                   games AS count
+                  FROM stats_role
+                  WHERE gamemode = ?
                   ORDER BY count DESC""", (mode,))
 
     totals = []
@@ -563,40 +676,17 @@ def set_primary_player(acc):
     c = conn.cursor()
     c.execute("UPDATE person SET primary_player = ? WHERE id = ?", (plid, peid))
     conn.commit()
+    _invalidate_ids(peid)
 
 def get_warning_points(acc):
-    peid, plid = _get_ids(acc)
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("""SELECT COALESCE(SUM(amount), 0)
-                 FROM warning
-                 WHERE
-                   target = ?
-                   AND deleted = 0
-                   AND (
-                     expires IS NULL
-                     OR expires > datetime('now')
-                   )""", (peid,))
-    row = c.fetchone()
-    return row[0]
+    return sum(w[1] for w in _active_warnings(acc))
 
 def has_unacknowledged_warnings(acc):
-    peid, plid = _get_ids(acc)
-    if peid is None:
-        return False
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("""SELECT COALESCE(MIN(acknowledged), 1)
-                 FROM warning
-                 WHERE
-                   target = ?
-                   AND deleted = 0
-                   AND (
-                     expires IS NULL
-                     OR expires > datetime('now')
-                   )""", (peid,))
-    row = c.fetchone()
-    return not bool(row[0])
+    return any(not w[3] for w in _active_warnings(acc))
+
+def get_unacknowledged_accounts(accs):
+    """Return which of the given accounts have warnings they haven't acknowledged yet."""
+    return {acc for acc in accs if has_unacknowledged_warnings(acc)}
 
 def list_all_warnings(list_all=False, skip=0, show=0):
     conn = _conn()
@@ -814,7 +904,9 @@ def add_warning(tacc, sacc, amount, reason, notes, expires):
                  )""", (teid, seid, amount, expires, reason, notes))
 
     conn.commit()
-    return c.lastrowid
+    warning = c.lastrowid
+    _load_warnings(c, teid)
+    return warning
 
 def add_warning_sanction(warning, sanction, data):
     conn = _conn()
@@ -863,6 +955,7 @@ def del_warning(warning, acc):
                    AND deleted = 0""", (peid, warning))
 
     conn.commit()
+    _reload_warning(c, warning)
 
 def set_warning(warning, expires, reason, notes):
     conn = _conn()
@@ -872,46 +965,52 @@ def set_warning(warning, expires, reason, notes):
                  WHERE id = ?""", (reason, notes, expires, warning))
 
     conn.commit()
+    _reload_warning(c, warning)
 
 def acknowledge_warning(warning):
     conn = _conn()
     c = conn.cursor()
     c.execute("UPDATE warning SET acknowledged = 1 WHERE id = ?", (warning,))
     conn.commit()
+    _reload_warning(c, warning)
 
 def expire_tempbans():
     conn = _conn()
     idlist = set()
     acclist = set()
     c = conn.cursor()
-    c.execute("""SELECT
+    # total up active warning points once per person, rather than once per tracked ban
+    c.execute("""WITH points (person, amount) AS (
+                   SELECT target, SUM(amount)
+                   FROM warning
+                   WHERE
+                     deleted = 0
+                     AND (
+                       expires IS NULL
+                       OR expires > datetime('now')
+                     )
+                   GROUP BY target
+                 )
+                 SELECT
                    bt.player,
                    pl.account_display
                  FROM bantrack bt
                  JOIN player pl
                    ON pl.id = bt.player
+                 LEFT JOIN points
+                   ON points.person = pl.person
                  WHERE
                    (bt.expires IS NOT NULL AND bt.expires < datetime('now'))
                    OR (
                      bt.warning_amount IS NOT NULL
-                     AND bt.warning_amount >= (
-                       SELECT COALESCE(SUM(w.amount), 0)
-                       FROM warning w
-                       WHERE
-                         w.target = pl.person
-                         AND w.deleted = 0
-                         AND (
-                           w.expires IS NULL
-                           OR w.expires > datetime('now')
-                         )
-                     )
+                     AND bt.warning_amount >= COALESCE(points.amount, 0)
                    )""")
     for row in c:
         idlist.add(row[0])
         if row[1] is not None:
             acclist.add(row[1])
-    for plid in idlist:
-        c.execute("DELETE FROM bantrack WHERE player = ?", (plid,))
+    if idlist:
+        c.executemany("DELETE FROM bantrack WHERE player = ?", [(plid,) for plid in idlist])
     conn.commit()
     return acclist
 
@@ -1034,11 +1133,20 @@ def _upgrade(oldversion):
             # add data column to person
             c.execute("ALTER TABLE person ADD data TEXT")
             conn.commit()
+        if oldversion < 10:
+            print("Upgrade from version 9 to 10...", file=sys.stderr)
+            # add summary tables for the stats commands and fill them from existing games
+            with open(os.path.join(dn, "upgrade10.sql"), "rt") as f:
+                c.executescript(f.read())
+            _rebuild_stats(c)
+            conn.commit()
 
         print("Rebuilding indexes...", file=sys.stderr)
         c.execute("REINDEX")
         c.execute("PRAGMA user_version = " + str(SCHEMA_VERSION))
         conn.commit()
+        # upgrades may have merged accounts
+        _invalidate_ids()
         print("Upgrades complete!", file=sys.stderr)
 
     except sqlite3.Error:
@@ -1091,15 +1199,52 @@ def _install():
         c.execute("PRAGMA user_version = " + str(SCHEMA_VERSION))
         conn.commit()
 
-def _get_ids(acc, add=False, casemap="ascii"):
+def _get_ids(acc, add=False):
     from src.context import lower
-    conn = _conn()
-    c = conn.cursor()
     if acc == "*":
         acc = None
     if acc is None:
         return (None, None)
 
+    key = lower(acc, casemapping="ascii")
+    with _id_cache_lock:
+        entry = _id_cache.get(key)
+        # if the display name differs, fall through so that _find_ids normalizes it
+        if entry is not None and entry[2] == acc:
+            _id_cache.move_to_end(key)
+            _id_cache_stats["hits"] += 1
+            return entry[0], entry[1]
+        _id_cache_stats["misses"] += 1
+
+    peid, plid = _find_ids(acc, add=add)
+    if peid is not None:
+        with _id_cache_lock:
+            # the player's display name is now acc, either because it was normalized or just added
+            _id_cache[key] = (peid, plid, acc)
+            _id_cache.move_to_end(key)
+            if len(_id_cache) > ID_CACHE_SIZE:
+                _id_cache.popitem(last=False)
+    return (peid, plid)
+
+def _invalidate_ids(peid=None):
+    """Remove the cached ids of every account belonging to peid, or of every account if peid is None."""
+    with _id_cache_lock:
+        if peid is None:
+            _id_cache.clear()
+        else:
+            for key in [key for key, entry in _id_cache.items() if entry[0] == peid]:
+                del _id_cache[key]
+
+def _id_cache_info():
+    with _id_cache_lock:
+        return {"hits": _id_cache_stats["hits"], "misses": _id_cache_stats["misses"],
+                "size": len(_id_cache), "max_size": ID_CACHE_SIZE}
+
+def _find_ids(acc, add=False, casemap="ascii"):
+    from src.context import lower
+    conn = _conn()
+    c = conn.cursor()
+
     ascii_acc = lower(acc, casemapping="ascii")
     rfc1459_acc = lower(acc, casemapping="rfc1459")
     strict_acc = lower(acc, casemapping="strict-rfc1459")
@@ -1119,10 +1264,10 @@ def _get_ids(acc, add=False, casemap="ascii"):
         # Check in order of most restrictive to least restrictive
         # If all three casemappings fail to match, row will still be None
         if casemap == "ascii":
-            peid, plid = _get_ids(strict_acc, add=add, casemap="rfc1459_strict")
-            row = peid, plid, None
+            peid, plid = _find_ids(strict_acc, add=add, casemap="rfc1459_strict")
         elif casemap == "rfc1459_strict":
-            peid, plid = _get_ids(rfc1459_acc, add=add, casemap="rfc1459")
+            peid, plid = _find_ids(rfc1459_acc, add=add, casemap="rfc1459")
+        if peid is not None:
             row = peid, plid, None
 
     if row:
@@ -1138,7 +1283,7 @@ def _get_ids(acc, add=False, casemap="ascii"):
                          WHERE id=?""",
                       (acc, ascii_acc, rfc1459_acc, strict_acc, row[1]))
 
-            conn.commit()
+            _commit(conn)
             # fix up our vars
             init_vars()
     elif add:
@@ -1154,7 +1299,7 @@ def _get_ids(acc, add=False, casemap="ascii"):
         c.execute("INSERT INTO person (primary_player) VALUES (?)", (plid,))
         peid = c.lastrowid
         c.execute("UPDATE player SET person=? WHERE id=?", (peid, plid))
-        conn.commit()
+        _commit(conn)
     return (peid, plid)
 
 def _get_display_name(peid):
@@ -1174,17 +1319,9 @@ def _total_games(peid):
         return 0
     conn = _conn()
     c = conn.cursor()
-    c.execute("""SELECT COUNT(DISTINCT gp.game)
-                 FROM person pe
-                 JOIN player pl
-                   ON pl.person = pe.id
-                 JOIN game_player gp
-                   ON gp.player = pl.id
-                 WHERE
-                   pe.id = ?""", (peid,))
-    # aggregates without GROUP BY always have exactly one row,
-    # so no need to check for None here
-    return c.fetchone()[0]
+    c.execute("SELECT games FROM stats_person WHERE person = ?", (peid,))
+    row = c.fetchone()
+    return row[0] if row else 0
 
 def _set_thing(thing, val, acc, raw=False):
     conn = _conn()
@@ -1208,9 +1345,87 @@ def _conn():
         _ts.conn = sqlite3.connect("data.sqlite3")
         c = _ts.conn.cursor()
         c.execute("PRAGMA foreign_keys = ON")
+        c.execute("PRAGMA journal_mode = " + config.Main.get("database.journal_mode"))
+        c.execute("PRAGMA synchronous = " + config.Main.get("database.synchronous"))
         _ts.conn.commit()
         return _ts.conn
 
+def _commit(conn):
+    # writes made from the writer thread are committed once for the entire batch
+    if not getattr(_ts, "batching", False):
+        conn.commit()
+
+class _Writer:
+    """Write-behind queue for the database.
+
+    Writes are run from a dedicated thread with its own connection, so that callers (such as the
+    end of a game) do not wait on the disk. Queued writes are committed together in one transaction,
+    up to database.batch_size at a time. If a batch fails, its writes are retried one by one so that
+    a single bad write doesn't lose the others.
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue[tuple[Callable[..., None], tuple]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, func: Callable[..., None], *args):
+        """Queue func(cursor, *args) to be run from the writer thread."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db writer", daemon=True)
+                self._thread.start()
+        self._queue.put((func, args))
+
+    def flush(self):
+        """Block until every queued write has been committed."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            limit = config.Main.get("database.batch_size")
+            while len(batch) < limit:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(_conn(), batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, conn: sqlite3.Connection, batch: list[tuple[Callable[..., None], tuple]]):
+        _ts.batching = True
+        try:
+            c = conn.cursor()
+            for func, args in batch:
+                func(c, *args)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # players added by the failed batch no longer exist
+            _invalidate_ids()
+            _ts.batching = False
+            for func, args in batch:
+                _write_one(conn, func, args)
+        finally:
+            _ts.batching = False
+
+@handle_error
+def _write_one(conn: sqlite3.Connection, func: Callable[..., None], args: tuple):
+    try:
+        func(conn.cursor(), *args)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        _invalidate_ids()
+        raise
+
+_writer = _Writer()
+profiler.add_counters("db.ids", _id_cache_info)
+
 def _init():
     need_install = not os.path.isfile("data.sqlite3")
     conn = _conn()
@@ -0,0 +1,44 @@
+-- Summary tables for the stats commands, kept up to date as games are recorded so that the
+-- commands don't need to aggregate over every game ever played. These hold no information that
+-- isn't also in the game, game_player and game_player_role tables, and can be rebuilt from them.
+
+-- Number of games played for each gamemode, size and winning team
+CREATE TABLE stats_game (
+    gamemode TEXT NOT NULL COLLATE NOCASE,
+    gamesize INTEGER NOT NULL,
+    -- NULL if no winner
+    winner TEXT COLLATE NOCASE,
+    games INTEGER NOT NULL
+);
+
+CREATE INDEX stats_game_idx ON stats_game (gamemode, gamesize);
+CREATE INDEX stats_game_gamesize_idx ON stats_game (gamesize);
+
+-- Wins and games played for each role (or special quality) in each gamemode
+CREATE TABLE stats_role (
+    role TEXT NOT NULL COLLATE NOCASE,
+    gamemode TEXT NOT NULL COLLATE NOCASE,
+    team_wins INTEGER NOT NULL,
+    indiv_wins INTEGER NOT NULL,
+    overall_wins INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (role, gamemode)
+);
+
+-- Wins and games played for each role (or special quality) by each person
+CREATE TABLE stats_person_role (
+    person INTEGER NOT NULL REFERENCES person(id) DEFERRABLE INITIALLY DEFERRED,
+    role TEXT NOT NULL COLLATE NOCASE,
+    team_wins INTEGER NOT NULL,
+    indiv_wins INTEGER NOT NULL,
+    overall_wins INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (person, role)
+);
+
+-- Total wins and games played by each person
+CREATE TABLE stats_person (
+    person INTEGER NOT NULL PRIMARY KEY REFERENCES person(id) DEFERRABLE INITIALLY DEFERRED,
+    wins INTEGER NOT NULL,
+    games INTEGER NOT NULL
+);
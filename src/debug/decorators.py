@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import queue
 import re
 import threading
+import time
 import traceback
 import urllib.request
 import logging
+from collections import OrderedDict
 from typing import Optional
 from types import TracebackType, FrameType
 
@@ -19,11 +23,109 @@ class _LocalCls(threading.local):
 
 _local = _LocalCls()
 
-# This is a mapping of stringified tracebacks to (link, uuid) tuples
-# That way, we don't have to call in to the website every time we have
-# another error.
+# Maximum number of error logs waiting to be uploaded; further errors are only logged locally
+UPLOAD_QUEUE_SIZE = 20
+# Number of times an upload is attempted, and the delay before the first retry (doubled for each retry)
+UPLOAD_ATTEMPTS = 3
+UPLOAD_BACKOFF = 2.0
+UPLOAD_TIMEOUT = 10
+# Number of uploaded links remembered, so that repeats of the same error aren't uploaded again
+TRACEBACK_CACHE_SIZE = 256
+
+# This is a mapping of hashes of sanitized tracebacks to their links, most recently used last.
+# That way, we don't have to call in to the website every time we have another error.
+# It is shared by every thread handling errors and the uploader thread, so it is only used under the lock.
+_tracebacks: OrderedDict[str, str] = OrderedDict()
+_tracebacks_lock = threading.Lock()
+
+def _get_link(key: str) -> Optional[str]:
+    """Return the link of an uploaded traceback, if it is cached, marking it as recently used."""
+    with _tracebacks_lock:
+        link = _tracebacks.get(key)
+        if link is not None:
+            _tracebacks.move_to_end(key)
+        return link
+
+def _add_link(key: str, link: str):
+    with _tracebacks_lock:
+        _tracebacks[key] = link
+        _tracebacks.move_to_end(key)
+        while len(_tracebacks) > TRACEBACK_CACHE_SIZE:
+            _tracebacks.popitem(last=False)
+
+class _Uploader:
+    """Upload error logs from a background thread, so that a slow or unreachable endpoint can't block the bot."""
+
+    def __init__(self):
+        self._queue: queue.Queue[tuple[str, str, logging.Logger]] = queue.Queue(UPLOAD_QUEUE_SIZE)
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, key: str, contents: str, logger: logging.Logger) -> bool:
+        """Queue an error log for upload, unless the same error is already queued.
+
+        :return: False if the queue is full and the error log was dropped
+        """
+        with self._lock:
+            if key in self._pending:
+                return True
+            try:
+                self._queue.put_nowait((key, contents, logger))
+            except queue.Full:
+                return False
+            self._pending.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="error uploader", daemon=True)
+                self._thread.start()
+        return True
+
+    def join(self):
+        """Block until every queued error log has been processed."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            key, contents, logger = self._queue.get()
+            try:
+                self._upload(key, contents, logger)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    def _upload(self, key: str, contents: str, logger: logging.Logger):
+        from src import channels
+        from src.messages import messages
+        error = None
+        for attempt in range(UPLOAD_ATTEMPTS):
+            if attempt:
+                time.sleep(UPLOAD_BACKOFF * 2 ** (attempt - 1))
+            try:
+                link = _upload(contents)
+                break
+            except Exception:
+                error = traceback.format_exc()
+        else:
+            logger.error(str(messages["error_pastebin"]), extra={"paste_error": error})
+            return
+
+        _add_link(key, link)
+        logger.error(str(messages["error_log_link"].format(link)))
+        if channels.Main:
+            channels.Main.send(messages["error_log_link"].format(link))
+
+def _upload(contents: str) -> str:
+    req = urllib.request.Request(config.Main.get("telemetry.errors.endpoint"), json.dumps({
+            "c": contents,
+        }).encode("utf-8", "replace"))
+
+    req.add_header("Accept", "application/json")
+    req.add_header("Content-Type", "application/json; charset=utf-8")
+    with urllib.request.urlopen(req, timeout=UPLOAD_TIMEOUT) as resp:
+        return json.loads(resp.read().decode("utf-8"))["url"]
 
-_tracebacks: dict[str, tuple[str, str]] = {}
+_uploader = _Uploader()
 
 class chain_exceptions:
 
@@ -147,29 +249,15 @@ class print_traceback:
             channels.Main.send(messages["error_log"])
         message = [str(messages["error_log"])]
 
-        link = _tracebacks.get("\n".join(variables))
-        if link is None and not config.Main.get("debug.enabled"):
-            api_url = "https://ww.chat/submit"
-            data = None # prevent UnboundLocalError when error log fails to upload
-            with _local.handler:
-                req = urllib.request.Request(api_url, json.dumps({
-                        "c": "\n".join(variables),  # contents
-                    }).encode("utf-8", "replace"))
-
-                req.add_header("Accept", "application/json")
-                req.add_header("Content-Type", "application/json; charset=utf-8")
-                resp = urllib.request.urlopen(req)
-                data = json.loads(resp.read().decode("utf-8"))
-
-            if data is None:  # couldn't fetch the link
-                message.append(messages["error_pastebin"].format())
-                extra_data["paste_error"] = _local.handler.traceback
-            else:
-                link = _tracebacks["\n".join(variables)] = data["url"]
-                message.append(link)
-
-        elif link is not None:
+        contents = "\n".join(variables)
+        key = hashlib.sha256(contents.encode("utf-8", "replace")).hexdigest()
+        link = _get_link(key)
+        if link is not None:
             message.append(link)
+        elif not config.Main.get("debug.enabled"):
+            # the link is logged and sent to the channel once the upload finishes
+            if not _uploader.submit(key, contents, exc_log):
+                message.append(messages["error_pastebin"].format())
 
         exc_log.error(" ".join(message), exc_info=(exc_type, exc_value, exc_tb), extra=extra_data)
 
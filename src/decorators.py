@@ -1,13 +1,14 @@
 from __future__ import annotations
 import functools
 import logging
+import time
 from typing import Callable, Optional, Iterable
 from collections import defaultdict
 
 import src
-from src.functions import get_players
 from src.messages import messages
-from src import config, channels, db
+from src import config, channels, db, profiler, scope
+from src.channels import Channel
 from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.debug import handle_error
@@ -108,20 +109,34 @@ class command:
         if self.phases and (wrapper.game_state is None or wrapper.game_state.current_phase not in self.phases):
             return
 
-        wrapper.source.update_account_data(self.key, functools.partial(self._thunk, wrapper, message))
+        # the account lookup may complete while handling another line, so remember the channel
+        wrapper.source.update_account_data(self.key, functools.partial(self._thunk, scope.current(), wrapper, message))
 
     @handle_error
-    def _thunk(self, wrapper: MessageDispatcher, message: str, user: User):
+    def _thunk(self, channel: Optional[Channel], wrapper: MessageDispatcher, message: str, user: User):
         _ignore_locals_ = True
         wrapper.source = user
-        self._caller(wrapper, message)
+        with scope.enter(channel):
+            self._caller(wrapper, message)
 
     @handle_error
     def _caller(self, wrapper: MessageDispatcher, message: str):
+        _ignore_locals_ = True
+        if not profiler.ENABLED:
+            self._run(wrapper, message)
+            return
+
+        start = time.perf_counter_ns()
+        try:
+            self._run(wrapper, message)
+        finally:
+            profiler.record("command", self.name, "", time.perf_counter_ns() - start)
+
+    def _run(self, wrapper: MessageDispatcher, message: str):
         _ignore_locals_ = True
         var = wrapper.game_state # FIXME
         from src import reaper
-        if self.playing and (wrapper.source not in get_players(wrapper.game_state) or wrapper.source in reaper.DISCONNECTED):
+        if self.playing and (var is None or wrapper.source not in var.get_player_set() or wrapper.source in reaper.DISCONNECTED):
             return
 
         logger = logging.getLogger("command.{}".format(self.name))
@@ -166,7 +181,7 @@ class command:
             wrapper.pm(messages["not_owner"])
             return
 
-        temp = wrapper.source.lower()
+        temp = wrapper.source.lowered
 
         flags = db.FLAGS[temp.account]
 
@@ -210,7 +225,9 @@ class hook:
     @handle_error
     def caller(self, *args, **kwargs):
         _ignore_locals_ = True
-        return self.func(*args, **kwargs)
+        # args are the client, the prefix, and the parameters of the line
+        with scope.enter(scope.resolve_line(args[1:])):
+            return self.func(*args, **kwargs)
 
     @staticmethod
     def unhook(hookid):
@@ -1,13 +1,67 @@
 # event system
 from __future__ import annotations
 
+import bisect
+import time
 from collections import defaultdict
 from types import SimpleNamespace
 from typing import Callable, Optional, Any
 from src.debug import handle_error
+from src import profiler
 
 __all__ = ["find_listener", "event_listener", "Event", "EventListener"]
-EVENT_CALLBACKS: dict[str, list[EventListener]] = defaultdict(list)
+
+class _ListenerTable:
+    """All listeners installed for a single event.
+
+    Listeners are kept sorted by priority as they are installed, with listeners of equal priority
+    in installation order. Dispatching iterates over an immutable snapshot, which is only rebuilt
+    after the listeners have changed; installing or removing listeners while an event is being
+    dispatched therefore only affects later dispatches.
+    """
+
+    __slots__ = ("listeners", "priorities", "ids", "version", "_snapshot", "_snapshot_version")
+
+    def __init__(self):
+        self.listeners: list[EventListener] = []
+        # priority of every listener, in the same order, to find where new listeners go
+        self.priorities: list[float] = []
+        self.ids: dict[str, EventListener] = {}
+        self.version = 0
+        self._snapshot: tuple[EventListener, ...] = ()
+        self._snapshot_version = 0
+
+    def __contains__(self, listener: EventListener):
+        return listener.id in self.ids
+
+    def __iter__(self):
+        return iter(self.snapshot)
+
+    def __len__(self):
+        return len(self.listeners)
+
+    def add(self, listener: EventListener):
+        index = bisect.bisect_right(self.priorities, listener.priority)
+        self.listeners.insert(index, listener)
+        self.priorities.insert(index, listener.priority)
+        self.ids[listener.id] = listener
+        self.version += 1
+
+    def remove(self, listener: EventListener):
+        installed = self.ids.pop(listener.id)
+        index = self.listeners.index(installed)
+        del self.listeners[index]
+        del self.priorities[index]
+        self.version += 1
+
+    @property
+    def snapshot(self) -> tuple[EventListener, ...]:
+        if self._snapshot_version != self.version:
+            self._snapshot = tuple(self.listeners)
+            self._snapshot_version = self.version
+        return self._snapshot
+
+EVENT_CALLBACKS: dict[str, _ListenerTable] = defaultdict(_ListenerTable)
 
 class EventListener:
     def __init__(self, callback: Callable, *, listener_id: Optional[str] = None, priority: float = 5):
@@ -23,7 +77,7 @@ class EventListener:
     def install(self, event: str):
         if self in EVENT_CALLBACKS[event]:
             raise ValueError("Callback with id {} already registered for the {} event".format(self.id, event))
-        EVENT_CALLBACKS[event].append(self)
+        EVENT_CALLBACKS[event].add(self)
 
     def remove(self, event: str):
         if self in EVENT_CALLBACKS[event]:
@@ -49,9 +103,9 @@ class EventListener:
         raise ValueError("Cannot modify id attribute")
 
 def find_listener(event: str, listener_id: str) -> EventListener:
-    for evt in EVENT_CALLBACKS[event]:
-        if evt.id == listener_id:
-            return evt
+    table = EVENT_CALLBACKS.get(event)
+    if table is not None and listener_id in table.ids:
+        return table.ids[listener_id]
     raise Exception("Could not find listener with id {0}".format(listener_id))
 
 class event_listener:
@@ -94,11 +148,26 @@ class Event:
     def dispatch(self, *args, **kwargs):
         self.stop_processing = False
         self.prevent_default = False
-        listeners = list(EVENT_CALLBACKS[self.name])
-        listeners.sort(key=lambda x: x.priority)
-        for listener in listeners:
+        table = EVENT_CALLBACKS.get(self.name)
+        if table is None:
+            return True
+        if profiler.ENABLED:
+            return self._dispatch_profiled(table.snapshot, args, kwargs)
+        for listener in table.snapshot:
             listener(self, *args, **kwargs)
             if self.stop_processing:
                 break
 
         return not self.prevent_default
+
+    def _dispatch_profiled(self, listeners: tuple[EventListener, ...], args, kwargs):
+        for listener in listeners:
+            start = time.perf_counter_ns()
+            try:
+                listener(self, *args, **kwargs)
+            finally:
+                profiler.record("event", self.name, listener.id, time.perf_counter_ns() - start)
+            if self.stop_processing:
+                break
+
+        return not self.prevent_default
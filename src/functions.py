@@ -23,7 +23,6 @@ __all__ = [
     ]
 
 def get_players(var: Optional[GameState | PregameState], roles=None, *, mainroles=None) -> list[User]:
-    from src.status import is_dying
     if var is None:
         return []
     if isinstance(var, PregameState):
@@ -31,8 +30,9 @@ def get_players(var: Optional[GameState | PregameState], roles=None, *, mainrole
             return []
         return list(var.players)
 
-    if mainroles is None:
-        mainroles = var.main_roles
+    if mainroles is None or mainroles is var.main_roles:
+        # cached by the game state until the players or their roles change
+        return list(var.get_players(roles))
     if roles is None:
         roles = set(mainroles.values())
     pl = set()
@@ -40,14 +40,11 @@ def get_players(var: Optional[GameState | PregameState], roles=None, *, mainrole
         if role in roles:
             pl.add(user)
 
-    if mainroles is not var.main_roles:
-        # we weren't given an actual player list (possibly),
-        # so the elements of pl are not necessarily in var.players
-        return list(pl)
-    return [p for p in var.players if p in pl and not is_dying(var, p)]
+    # we weren't given an actual player list (possibly),
+    # so the elements of pl are not necessarily in var.players
+    return list(pl)
 
 def get_all_players(var: Optional[GameState | PregameState], roles=None, *, rolemap=None) -> set[User]:
-    from src.status import is_dying
     if var is None:
         return set()
     if isinstance(var, PregameState):
@@ -55,8 +52,9 @@ def get_all_players(var: Optional[GameState | PregameState], roles=None, *, role
             return set()
         return set(var.players)
 
-    if rolemap is None:
-        rolemap = var.roles
+    if rolemap is None or rolemap is var.roles:
+        # cached by the game state until the players or their roles change
+        return set(var.get_all_players(roles))
     if roles is None:
         roles = set(rolemap.keys())
     pl = set()
@@ -64,10 +62,7 @@ def get_all_players(var: Optional[GameState | PregameState], roles=None, *, role
         for user in rolemap[role]:
             pl.add(user)
 
-    if rolemap is not var.roles:
-        return pl
-
-    return {p for p in pl if not is_dying(var, p)}
+    return pl
 
 def get_participants(var: Optional[GameState | PregameState]) -> list[User]:
     """List all players who are still able to participate in the game."""
@@ -114,7 +109,7 @@ def get_target(wrapper: MessageDispatcher, message: str, *, allow_self: bool = F
                     suggestions.append(nick)
                 else:
                     for user in match:
-                        luser = user.lower()
+                        luser = user.lowered
                         if luser.nick == nick:
                             suggestions.append("{0}:{1}".format(luser.nick, luser.account))
             suggestions.sort()
@@ -153,8 +148,10 @@ def change_role(var: GameState,
     evt.dispatch(var, player, old_role)
     new_role = evt.data["role"]
 
-    var.roles[old_role].remove(player)
-    var.roles[new_role].add(player)
+    # look up both roles first, so that an unknown role leaves the player's roles untouched
+    old_players, new_players = var.roles[old_role], var.roles[new_role]
+    old_players.remove(player)
+    new_players.add(player)
     # only adjust main_roles/final_roles if we're changing the player's actual role
     if var.main_roles[player] == old_role:
         var.main_roles[player] = new_role
@@ -189,7 +186,7 @@ def get_main_role(var: GameState, user):
     return role
 
 def get_all_roles(var: GameState, user: User) -> set[str]:
-    return {role for role, users in var.roles.items() if user in users}
+    return set(var.get_all_roles(user))
 
 def get_reveal_role(var: GameState, user) -> str:
     evt = Event("get_reveal_role", {"role": get_main_role(var, user)})
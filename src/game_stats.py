@@ -184,3 +184,15 @@ def role_stats(wrapper: MessageDispatcher, message: str):
         return
 
     wrapper.pm(db.get_role_stats(roles.get().key, gamemode))
+
+@command("checkstats", flag="m", pm=True)
+def check_stats(wrapper: MessageDispatcher, message: str):
+    """Checks the stats tables against the recorded games, and optionally rebuilds them."""
+    repair = message.strip().lower() == "repair"
+    mismatched = db.check_stats(repair=repair)
+    if not mismatched:
+        wrapper.reply(messages["checkstats_ok"])
+    elif repair:
+        wrapper.reply(messages["checkstats_repaired"].format(mismatched))
+    else:
+        wrapper.reply(messages["checkstats_mismatch"].format(mismatched))
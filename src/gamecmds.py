@@ -3,7 +3,6 @@ from __future__ import annotations
 from collections import Counter
 from datetime import datetime, timedelta
 from typing import Optional
-import time
 import sys
 import re
 
@@ -13,7 +12,7 @@ from src.functions import get_players
 from src.messages import messages
 from src.events import Event, EventListener, event_listener
 from src.cats import Wolfteam, Neutral, role_order
-from src import config, users, channels, pregame, trans
+from src import config, users, channels, pregame, timers, scope
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 from src.users import User
@@ -24,6 +23,8 @@ LAST_ADMINS: Optional[datetime] = None
 LAST_GOAT: UserDict[User, datetime] = UserDict()
 
 ADMIN_PINGING: bool = False
+scope.register(LAST_GOAT)
+scope.register_globals(__name__, "LAST_STATS", "LAST_TIME", "LAST_ADMINS", "ADMIN_PINGING")
 
 @command("stats", pm=True, phases=("join", "day", "night"))
 def stats(wrapper: MessageDispatcher, message: str):
@@ -67,15 +68,7 @@ def stats(wrapper: MessageDispatcher, message: str):
     # Uses events in order to enable roles to modify logic
     # The events are fired off as part of transition_day and del_player, and are not calculated here
     if var.stats_type == "default":
-        # Collapse the role stats into a dict[str, tuple[int, int]]
-        role_stats: dict[str, tuple[int, int]] = {}
-        for stat_set in var.get_role_stats():
-            for r, a in stat_set:
-                if r not in role_stats:
-                    role_stats[r] = (a, a)
-                else:
-                    mn, mx = role_stats[r]
-                    role_stats[r] = (min(mn, a), max(mx, a))
+        role_stats = var.role_stats.ranges()
         # remove any 0/0 entries if they weren't starting roles, otherwise we may have bad grammar in !stats
         role_stats = {r: v for r, v in role_stats.items() if r in start_roles or v != (0, 0)}
         order = [r for r in role_order() if r in role_stats]
@@ -195,21 +188,20 @@ def timeleft(wrapper: MessageDispatcher, message: str):
         if msg is not None:
             wrapper.reply(msg)
 
-    if var.current_phase in trans.TIMERS or f"{var.current_phase}_limit" in trans.TIMERS:
+    remaining = timers.Main.remaining(f"{var.current_phase}_limit")
+    if remaining is None:
+        remaining = timers.Main.remaining(var.current_phase)
+    if remaining is not None:
         if var.current_phase == "day":
             what = "sunset" # FIXME: hardcoded english
-            name = "day_limit"
         elif var.current_phase == "night":
             what = "sunrise"
-            name = "night_limit"
         elif var.current_phase == "join":
             what = "the game is canceled if it's not started"
-            name = "join"
         else:
             what = "the end of the phase"
-            name = var.current_phase if var.current_phase in trans.TIMERS else f"{var.current_phase}_limit"
 
-        remaining = int((trans.TIMERS[name][1] + trans.TIMERS[name][2]) - time.time())
+        remaining = int(remaining)
         msg = "There is \u0002{0[0]:0>2}:{0[1]:0>2}\u0002 remaining until {1}.".format(divmod(remaining, 60), what)
     else:
         msg = messages["timers_disabled"].format(var.current_phase.capitalize())
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import threading
 import time
 import re
 from datetime import datetime, timedelta
@@ -14,13 +13,15 @@ from src.messages import messages
 from src.status import add_dying, kill_players
 from src.events import Event, EventListener, event_listener
 from src.debug import handle_error
-from src import db, users, channels, locks, pregame, config, context, reaper, relay
+from src import db, users, channels, locks, pregame, config, context, reaper, relay, timers, scope
 from src.dispatcher import MessageDispatcher
 from src.channels import Channel
 from src.users import User
 
 PINGED_ALREADY: set[str] = set()
 PINGING_PLAYERS: bool = False
+scope.register(PINGED_ALREADY)
+scope.register_globals(__name__, "PINGING_PLAYERS")
 
 @command("join", pm=True, allow_alt=False)
 def join(wrapper: MessageDispatcher, message: str):
@@ -74,6 +75,13 @@ def _join_player(wrapper: MessageDispatcher, who: Optional[User] = None, forced=
     var = wrapper.game_state
     pl = get_players(var)
 
+    # a player can only be in one game at a time, or their commands and PMs couldn't be routed
+    playing = scope.channel_of(wrapper.source)
+    if playing is not None and playing is not channels.Main:
+        key = "you_already_playing_in" if who is wrapper.source else "other_already_playing_in"
+        who.send(messages[key].format(playing), notice=True)
+        return False
+
     stasis = wrapper.source.stasis_count()
 
     if stasis > 0:
@@ -86,7 +94,7 @@ def _join_player(wrapper: MessageDispatcher, who: Optional[User] = None, forced=
             who.send(messages["other_stasis"].format(wrapper.source, stasis), notice=True)
             return False
 
-    temp = wrapper.source.lower()
+    temp = wrapper.source.lowered
 
     # don't check unacked warnings on fjoin
     if wrapper.source is who and db.has_unacknowledged_warnings(temp.account):
@@ -115,10 +123,7 @@ def _join_player(wrapper: MessageDispatcher, who: Optional[User] = None, forced=
 
         # Set join timer
         if config.Main.get("timers.enabled") and config.Main.get("timers.join.enabled"):
-            t = threading.Timer(config.Main.get("timers.join.limit"), kill_join, [var, wrapper])
-            trans.TIMERS["join"] = (t, time.time(), config.Main.get("timers.join.limit"))
-            t.daemon = True
-            t.start()
+            timers.Main.add(config.Main.get("timers.join.limit"), kill_join, var, wrapper, name="join", game_id=var.game_id)
 
     elif wrapper.source in pl:
         key = "you_already_playing" if who is wrapper.source else "other_already_playing"
@@ -161,13 +166,8 @@ def _join_player(wrapper: MessageDispatcher, who: Optional[User] = None, forced=
                     pregame.CAN_START_TIME = now + timedelta(seconds=config.Main.get("timers.wait.join"))
 
     with locks.join_timer:
-        if "join_pinger" in trans.TIMERS:
-            trans.TIMERS["join_pinger"][0].cancel()
-
-        t = threading.Timer(10, join_timer_handler, (var,))
-        trans.TIMERS["join_pinger"] = (t, time.time(), 10)
-        t.daemon = True
-        t.start()
+        # replaces the previous join pinger timer, if any
+        timers.Main.add(10, join_timer_handler, var, name="join_pinger", game_id=var.game_id)
 
     if not wrapper.source.is_fake or not config.Main.get("debug.enabled"):
         channels.Main.mode(*cmodes)
@@ -307,10 +307,8 @@ def join_timer_handler(var):
         # Add accounts/hosts to the list of possible players to ping
         for num in db.PING_IF_NUMS:
             if num <= len(pl):
-                for acc in db.PING_IF_NUMS[num]:
-                    if db.has_unacknowledged_warnings(acc):
-                        continue
-                    chk_acc.add(users.lower(acc))
+                chk_acc.update(users.lower(acc) for acc in db.PING_IF_NUMS[num])
+        chk_acc -= db.get_unacknowledged_accounts(chk_acc)
 
         # Don't ping alt connections of users that have already joined
         for player in pl:
@@ -329,9 +327,9 @@ def join_timer_handler(var):
                     chan is not channels.Main or user is users.Bot or user in pl):
                 return
 
-            temp = user.lower()
+            temp = user.lowered
             if temp.account in chk_acc:
-                to_ping.append(temp)
+                to_ping.append(user)
                 PINGED_ALREADY.add(temp.account)
                 return
 
@@ -340,8 +338,8 @@ def join_timer_handler(var):
                 global PINGING_PLAYERS
                 PINGING_PLAYERS = False
                 if to_ping:
-                    to_ping.sort(key=lambda x: x.nick)
-                    user_list = [(user.ref or user).nick for user in to_ping]
+                    to_ping.sort(key=lambda x: x.lowered.nick)
+                    user_list = [user.nick for user in to_ping]
 
                     msg_prefix = messages["ping_player"].format(len(pl))
                     channels.Main.send(*user_list, first=msg_prefix)
@@ -261,6 +261,17 @@ class GameMode:
                 self.CUSTOM_SETTINGS.add_override("abstain_enabled", "limit_abstain")
 
     def startup(self):
+        self.install_events()
+
+    def teardown(self):
+        self.remove_events()
+
+    def install_events(self):
+        """Install the listeners in EVENTS. This is also used to switch between games in several channels.
+
+        Modes which change anything else for the duration of their game, such as messages or commands,
+        should do so by extending this and remove_events.
+        """
         for event, listeners in self.EVENTS.items():
             if isinstance(listeners, EventListener):
                 listeners.install(event)
@@ -268,7 +279,8 @@ class GameMode:
                 for listener in listeners:
                     listener.install(event)
 
-    def teardown(self):
+    def remove_events(self):
+        """Remove the listeners in EVENTS, if they are installed."""
         for event, listeners in self.EVENTS.items():
             if isinstance(listeners, EventListener):
                 listeners.remove(event)
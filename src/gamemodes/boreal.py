@@ -93,22 +93,31 @@ class BorealMode(GameMode):
         self.phase = 1
         self.village_starve = 0
         self.hunger_levels.clear()
-        self.saved_messages = {
-            "wolf_shaman_notify": messages.messages["wolf_shaman_notify"],
-            "vengeful_turn": messages.messages["vengeful_turn"],
-            "lynch_reveal": messages.messages["lynch_reveal"]
-        }
-
-        messages.messages["wolf_shaman_notify"] = "" # don't tell WS they can kill
-        messages.messages["vengeful_turn"] = messages.messages["boreal_turn"]
-        messages.messages["lynch_reveal"] = messages.messages["boreal_exile"]
-        self.feed_command.register()
 
     def teardown(self):
         super().teardown()
         self.hunger_levels.clear()
+
+    def install_events(self):
+        super().install_events()
+        # the messages and the feed command only apply to this game, so they are switched along with the listeners
+        if not self.saved_messages:
+            self.saved_messages = {
+                "wolf_shaman_notify": messages.messages["wolf_shaman_notify"],
+                "vengeful_turn": messages.messages["vengeful_turn"],
+                "lynch_reveal": messages.messages["lynch_reveal"]
+            }
+
+            messages.messages["wolf_shaman_notify"] = "" # don't tell WS they can kill
+            messages.messages["vengeful_turn"] = messages.messages["boreal_turn"]
+            messages.messages["lynch_reveal"] = messages.messages["boreal_exile"]
+        self.feed_command.register()
+
+    def remove_events(self):
+        super().remove_events()
         for key, value in self.saved_messages.items():
             messages.messages[key] = value
+        self.saved_messages = {}
         self.feed_command.remove()
 
     def on_totem_assignment(self, evt: Event, var: GameState, player, role):
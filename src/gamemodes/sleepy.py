@@ -1,7 +1,5 @@
 import random
-import threading
 import functools
-from collections import Counter
 from src.gamemodes import game_mode, GameMode
 from src.messages import messages
 from src.containers import UserList, UserDict
@@ -10,7 +8,7 @@ from src.functions import get_players, change_role
 from src.gamestate import GameState
 from src.status import add_dying
 from src.events import EventListener, Event
-from src import channels, locks
+from src import channels, locks, timers
 
 @game_mode("sleepy", minp=10, maxp=24, likelihood=5)
 class SleepyMode(GameMode):
@@ -57,19 +55,23 @@ class SleepyMode(GameMode):
         self.start_direction = UserDict()
         self.on_path = UserDict()
 
-    def startup(self):
-        super().startup()
+    def install_events(self):
+        super().install_events()
+        # the commands only apply to this game, so they are switched along with the listeners
         self.north_cmd.register()
         self.east_cmd.register()
         self.south_cmd.register()
         self.west_cmd.register()
 
-    def teardown(self):
-        super().teardown()
+    def remove_events(self):
+        super().remove_events()
         self.north_cmd.remove()
         self.east_cmd.remove()
         self.south_cmd.remove()
         self.west_cmd.remove()
+
+    def teardown(self):
+        super().teardown()
         self.having_nightmare.clear()
         self.correct.clear()
         self.fake1.clear()
@@ -91,9 +93,7 @@ class SleepyMode(GameMode):
                 with locks.join_timer:
                     target = random.choice(pl)
                     pl.remove(target)
-                    t = threading.Timer(60, self.do_nightmare, (var, target, var.night_count))
-                    t.daemon = True
-                    t.start()
+                    timers.Main.add(60, self.do_nightmare, var, target, var.night_count, game_id=var.game_id)
 
     @handle_error
     def do_nightmare(self, var: GameState, target, night):
@@ -232,15 +232,7 @@ class SleepyMode(GameMode):
                     # messages: sleepy_doomsayer_turn, sleepy_succubus_turn, sleepy_demoniac_turn
                     change_role(var, t, old, new, message="sleepy_{0}_turn".format(new))
 
-                newstats = set()
-                for rs in var.get_role_stats():
-                    d = Counter(dict(rs))
-                    newstats.add(rs)
-                    if old in d and d[old] >= 1:
-                        d[old] -= 1
-                        d[new] += 1
-                        newstats.add(frozenset(d.items()))
-                var.set_role_stats(newstats)
+                var.set_role_stats(var.role_stats.convert_one(old, new))
 
     def on_revealroles(self, evt: Event, var: GameState):
         if self.having_nightmare:
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import copy
-from typing import Any, Optional, TYPE_CHECKING
+from typing import Any, Iterable, Optional, TYPE_CHECKING
 import time
 
-from src.containers import UserSet, UserDict, UserList
+from src.containers import UserSet, UserDict, UserList, TrackedUserDict, TrackedUserList
 from src.messages import messages
 from src.cats import All
+from src.rolestats import RoleStats
 from src import config
 from src.users import User
 from src import channels
@@ -14,7 +15,18 @@ from src import channels
 if TYPE_CHECKING:
     from src.gamemodes import GameMode
 
-__all__ = ["GameState", "PregameState", "set_gamemode"]
+__all__ = ["GameState", "PregameState", "set_gamemode", "players_changed"]
+
+# Incremented whenever the players, their roles, or the dying players change; see GameState.get_players
+_generation = 0
+
+def players_changed():
+    """Invalidate the player lists cached by GameState.
+
+    This is called automatically by the containers holding the players, their roles, and the dying players.
+    """
+    global _generation
+    _generation += 1
 
 def set_gamemode(var: PregameState, arg: str) -> bool:
     from src.gamemodes import GAME_MODES, InvalidModeException
@@ -35,9 +47,124 @@ def set_gamemode(var: PregameState, arg: str) -> bool:
     channels.Main.send(messages["game_mode_not_found"].format(modeargs[0]))
     return False
 
+class _RoleSet(UserSet):
+    """UserSet holding the players of a single role in GameState.roles.
+
+    Every change is mirrored into the players -> roles index of the owning _RoleDict.
+    Copies are plain UserSets which are not tracked by the index.
+    """
+
+    def __init__(self, role: str, index: UserDict[User, set[str]], iterable=()):
+        self._role = role
+        self._index = index
+        super().__init__(iterable)
+
+    def __copy__(self):
+        return UserSet(self)
+
+    def __deepcopy__(self, memo):
+        return UserSet(copy.deepcopy(x, memo) for x in self)
+
+    def difference(self, iterable):
+        return UserSet(set.difference(self, iterable))
+
+    def intersection(self, iterable):
+        return UserSet(set.intersection(self, iterable))
+
+    def symmetric_difference(self, iterable):
+        return UserSet(set.symmetric_difference(self, iterable))
+
+    def union(self, iterable):
+        return UserSet(set.union(self, iterable))
+
+    def _unindex(self, item: User):
+        roles = self._index[item]
+        roles.discard(self._role)
+        if not roles:
+            del self._index[item]
+
+    def add(self, item):
+        if item not in self:
+            super().add(item)
+            if item not in self._index:
+                self._index[item] = set()
+            self._index[item].add(self._role)
+            players_changed()
+
+    def clear(self):
+        for item in self:
+            self._unindex(item)
+        super().clear()
+        players_changed()
+
+    def discard(self, item):
+        if item in self:
+            self.remove(item)
+
+    def pop(self):
+        item = super().pop()
+        self._unindex(item)
+        players_changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._unindex(item)
+        players_changed()
+
+class _RoleDict(UserDict[str, UserSet]):
+    """Mapping of role to the players having that role, used for GameState.roles.
+
+    This additionally maintains the reverse mapping of each player to all of their roles.
+    Any set assigned to a role is copied into a tracked set, so the players must always
+    be modified through this mapping (e.g. var.roles["wolf"].add(player)).
+    Copies are plain UserDicts which are not tracked by the index.
+    """
+
+    def __init__(self, _it=(), **kwargs):
+        self.players: UserDict[User, set[str]] = UserDict()
+        super().__init__(_it, **kwargs)
+
+    def __copy__(self):
+        return UserDict(self)
+
+    def __deepcopy__(self, memo):
+        new = UserDict()
+        for key, value in self.items():
+            new[key] = copy.deepcopy(value, memo)
+        return new
+
+    def __setitem__(self, item, value):
+        old = self.get(item)
+        if old is value:
+            return
+        members = list(value)
+        if old is not None:
+            # the players of the old set may also be in the new one, so they must be unindexed first
+            old.clear()
+        super().__setitem__(item, _RoleSet(item, self.players, members))
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super().pop(key, *default)
+        value = UserSet(self[key])
+        del self[key] # also clears the tracked set
+        return value
+
+    def popitem(self):
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        # dicts are only reversible from Python 3.8 on
+        key = list(self)[-1]
+        return key, self.pop(key)
+
+    def clear(self):
+        super().clear()
+        self.players.clear()
+
 class PregameState:
     def __init__(self):
-        self.players = UserList()
+        self.players: UserList = TrackedUserList(players_changed)
         self.current_phase: str = "join"
         self.game_id: float = time.time()
         self.next_phase: Optional[str] = None
@@ -48,6 +175,14 @@ class PregameState:
     def in_game(self):
         return False
 
+    def get_players(self, roles: Optional[Iterable[str]] = None) -> tuple[User, ...]:
+        """Return the players who joined, in join order. Nobody has a role yet, so filtering by roles matches nobody."""
+        return tuple(self.players) if roles is None else ()
+
+    def get_player_set(self, roles: Optional[Iterable[str]] = None) -> frozenset[User]:
+        """Return the players from get_players as a frozenset, for fast membership tests."""
+        return frozenset(self.players) if roles is None else frozenset()
+
     def teardown(self):
         if self.current_mode is not None:
             self.current_mode.teardown()
@@ -61,16 +196,23 @@ class GameState:
         self.game_settings: dict[str, Any] = {}
         self.game_id: float = pregame_state.game_id
         self.players = pregame_state.players
-        self.roles: UserDict[str, UserSet] = UserDict()
+        self.roles: _RoleDict = _RoleDict()
         self._original_roles: UserDict[str, UserSet] = UserDict()
-        self.main_roles: UserDict[User, str] = UserDict()
+        self.main_roles: UserDict[User, str] = TrackedUserDict(players_changed)
         self._original_main_roles: UserDict[User, str] = UserDict()
         self.final_roles: UserDict[User, str] = UserDict()
-        self._rolestats: set[frozenset[tuple[str, int]]] = set()
+        self._rolestats: RoleStats = RoleStats()
         self.current_phase: str = pregame_state.current_phase
         self.next_phase: Optional[str] = None
         self.night_count: int = 0
         self.day_count: int = 0
+        # living players, cached for the generation in _cache_generation; see _player_cache
+        self._cache_generation: int = -1
+        self._living: tuple[User, ...] = ()
+        self._living_by_role: dict[str, list[User]] = {}
+        self._players_cache: dict[Any, tuple[User, ...]] = {}
+        self._player_set_cache: dict[Any, frozenset[User]] = {}
+        self._all_players_cache: dict[Any, frozenset[User]] = {}
 
     def begin_setup(self):
         if self.setup_completed:
@@ -96,7 +238,7 @@ class GameState:
         self.roles.clear()
         self._original_roles.clear()
         self._original_main_roles.clear()
-        self._rolestats.clear()
+        self._rolestats = RoleStats()
         self.current_mode.teardown()
         self._torndown = True
 
@@ -133,6 +275,92 @@ class GameState:
     def in_phase_transition(self):
         return self.next_phase is not None
 
+    def _player_cache(self):
+        """Rebuild the living players and the per-role index if anything changed since they were cached."""
+        generation = _generation
+        if self._cache_generation == generation:
+            return
+        from src.status.dying import DYING
+        living = []
+        by_role: dict[str, list[User]] = {}
+        for player in self.players:
+            role = self.main_roles.get(player)
+            if role is None or player in DYING:
+                continue
+            living.append(player)
+            by_role.setdefault(role, []).append(player)
+        self._living = tuple(living)
+        self._living_by_role = by_role
+        self._players_cache.clear()
+        self._player_set_cache.clear()
+        self._all_players_cache.clear()
+        # if something changed while we were rebuilding, the next call will rebuild again
+        self._cache_generation = generation
+
+    @staticmethod
+    def _roles_key(roles: Optional[Iterable[str]]):
+        try:
+            hash(roles)
+        except TypeError:
+            return frozenset(roles) # type: ignore[arg-type]
+        return roles
+
+    def get_players(self, roles: Optional[Iterable[str]] = None) -> tuple[User, ...]:
+        """Return the living players whose main role is in roles (or all living players), in join order.
+
+        Players marked as dying are excluded. The result is cached until the players, their roles,
+        or the dying players change; use functions.get_players for a list that may be modified.
+
+        :param roles: Main roles to include, or None for every role
+        """
+        self._player_cache()
+        if roles is None:
+            return self._living
+        key = self._roles_key(roles)
+        result = self._players_cache.get(key)
+        if result is None:
+            if isinstance(roles, str):
+                matched = self._living_by_role.get(roles, ())
+            else:
+                matched = set()
+                for role in key:
+                    matched.update(self._living_by_role.get(role, ()))
+            result = self._players_cache[key] = tuple(p for p in self._living if p in matched)
+        return result
+
+    def get_player_set(self, roles: Optional[Iterable[str]] = None) -> frozenset[User]:
+        """Return the players from get_players as a frozenset, for fast membership tests."""
+        key = self._roles_key(roles)
+        players = self.get_players(roles)
+        result = self._player_set_cache.get(key)
+        if result is None:
+            result = self._player_set_cache[key] = frozenset(players)
+        return result
+
+    def get_all_players(self, roles: Optional[Iterable[str]] = None) -> frozenset[User]:
+        """Return the players having any of the roles (main or secondary), or every player with a role.
+
+        Players marked as dying are excluded. The result is cached like get_players.
+
+        :param roles: Roles to include, or None for every role
+        """
+        self._player_cache()
+        key = self._roles_key(roles)
+        result = self._all_players_cache.get(key)
+        if result is None:
+            from src.status.dying import DYING
+            if roles is None:
+                roles = self.roles.keys()
+            pl = set()
+            for role in roles:
+                pl.update(self.roles[role])
+            result = self._all_players_cache[key] = frozenset(p for p in pl if p not in DYING)
+        return result
+
+    def get_all_roles(self, user: User) -> frozenset[str]:
+        """Return every role the user currently has."""
+        return frozenset(self.roles.players.get(user, ()))
+
     @property
     def original_roles(self):
         # we store the data in a UserDict so it gets dynamically updated
@@ -230,9 +458,14 @@ class GameState:
         except AttributeError:
             return config.Main.get("timers.night.warn")
 
+    @property
+    def role_stats(self) -> RoleStats:
+        return self._rolestats
+
     def get_role_stats(self) -> frozenset[frozenset[tuple[str, int]]]:
-        return frozenset(self._rolestats)
+        return self._rolestats.as_frozensets()
 
-    def set_role_stats(self, value) -> None:
-        self._rolestats.clear()
-        self._rolestats.update(value)
+    def set_role_stats(self, value: RoleStats | Iterable[Iterable[tuple[str, int]]]) -> None:
+        if not isinstance(value, RoleStats):
+            value = RoleStats(value)
+        self._rolestats = value
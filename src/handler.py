@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import base64
-import threading
 import subprocess
 import platform
 import time
@@ -11,7 +10,7 @@ import sys
 from typing import Optional
 
 from oyoyo.client import IRCClient
-from src import channels, config, context, decorators, users
+from src import channels, config, context, decorators, users, timers, profiler, scope
 from src.messages import messages
 from src.functions import get_participants, get_all_roles, match_role
 from src.dispatcher import MessageDispatcher
@@ -43,28 +42,29 @@ def on_privmsg(cli, rawnick, chan, msg, *, notice=False):
     if user is None or target is None:
         return
 
-    wrapper = MessageDispatcher(user, target)
+    with scope.enter(scope.resolve(target, user)):
+        wrapper = MessageDispatcher(user, target)
 
-    if wrapper.public and config.Main.get("transports[0].user.ignore.hidden") and not chan.startswith(tuple(Features["CHANTYPES"])):
-        return
+        if wrapper.public and config.Main.get("transports[0].user.ignore.hidden") and not chan.startswith(tuple(Features["CHANTYPES"])):
+            return
 
-    if (notice and ((wrapper.public and config.Main.get("transports[0].user.ignore.channel_notice")) or
-                    (wrapper.private and config.Main.get("transports[0].user.ignore.private_notice")))):
-        return  # not allowed in settings
+        if (notice and ((wrapper.public and config.Main.get("transports[0].user.ignore.channel_notice")) or
+                        (wrapper.private and config.Main.get("transports[0].user.ignore.private_notice")))):
+            return  # not allowed in settings
 
-    for fn in decorators.COMMANDS[""]:
-        fn.caller(wrapper, msg)
+        for fn in decorators.COMMANDS[""]:
+            fn.caller(wrapper, msg)
 
-    parts = msg.split(sep=" ", maxsplit=1)
-    key = parts[0].lower()
-    if len(parts) > 1:
-        message = parts[1].strip()
-    else:
-        message = ""
+        parts = msg.split(sep=" ", maxsplit=1)
+        key = parts[0].lower()
+        if len(parts) > 1:
+            message = parts[1].strip()
+        else:
+            message = ""
 
-    if wrapper.public and not key.startswith(config.Main.get("transports[0].user.command_prefix")):
-        return  # channel message but no prefix; ignore
-    parse_and_dispatch(wrapper, key, message)
+        if wrapper.public and not key.startswith(config.Main.get("transports[0].user.command_prefix")):
+            return  # channel message but no prefix; ignore
+        parse_and_dispatch(wrapper, key, message)
 
 def parse_and_dispatch(wrapper: MessageDispatcher,
                        key: str,
@@ -211,6 +211,51 @@ def latency(wrapper, message):
         wrapper.reply(messages["latency"].format(lat))
         hook.unhook(300)
 
+@command("fqueue", flag="D", pm=True)
+def fqueue(wrapper: MessageDispatcher, message: str):
+    """Show how many messages are waiting to be sent, and how long they had to wait."""
+    for priority, stats in wrapper.client.queue_stats().items():
+        wrapper.pm(messages["fqueue_stats"].format(priority.name.lower(), stats["queued"], stats["sent"],
+                                                   stats["lines"], stats["wait"], stats["max_wait"]))
+
+@command("fprofile", flag="D", pm=True)
+def fprofile(wrapper: MessageDispatcher, message: str):
+    """Toggle timing of event listeners and commands, or show the slowest ones."""
+    args = message.lower().split()
+    action = args[0] if args else ""
+    if action == "on":
+        profiler.enable()
+        wrapper.pm(messages["fprofile_enabled"])
+    elif action == "off":
+        profiler.disable()
+        wrapper.pm(messages["fprofile_disabled"])
+    elif action == "reset":
+        profiler.reset()
+        wrapper.pm(messages["fprofile_reset"])
+    elif action == "log":
+        profiler.log()
+        wrapper.pm(messages["fprofile_logged"])
+    elif action == "counters":
+        for name, values in profiler.counters().items():
+            values = ", ".join("{0} {1}".format(key, value) for key, value in values.items())
+            wrapper.pm(messages["fprofile_counter"].format(name, values))
+    elif action in ("", "events", "commands") or action.isdigit():
+        kind = {"events": "event", "commands": "command"}.get(action)
+        count = args[-1] if args else ""
+        count = int(count) if count.isdigit() else 10
+        timings = profiler.snapshot(kind)[:count]
+        if not timings:
+            wrapper.pm(messages["fprofile_empty"])
+        for entry in timings:
+            if entry["kind"] == "event":
+                name = "{0} ({1})".format(entry["name"], entry["listener"])
+            else:
+                name = "!{0}".format(entry["name"])
+            wrapper.pm(messages["fprofile_entry"].format(name, entry["calls"], entry["total_ms"],
+                                                         entry["p50_ms"], entry["p99_ms"], entry["max_ms"]))
+    else:
+        wrapper.pm(messages["fprofile_usage"])
+
 @command("", chan=False, pm=True)
 def ctcp_handling(wrapper: MessageDispatcher, message: str):
     """CTCP Handling"""
@@ -260,8 +305,11 @@ def connect_callback(cli: IRCClient):
         main_channel = config.Main.get("transports[0].channels.main")
         channels.Main = channels.add(main_channel["name"], cli, key=main_channel["key"], prefix=main_channel["prefix"])
         channels.Dummy = channels.add("*", cli)
+        scope.add_channel(channels.Main)
         for channel in config.Main.get("transports[0].channels.alternate"):
-            channels.add(channel["name"], cli, key=channel["key"], prefix=channel["prefix"])
+            chan = channels.add(channel["name"], cli, key=channel["key"], prefix=channel["prefix"])
+            if channel["game"]:
+                scope.add_channel(chan)
 
         users.Bot.change_nick(nick)
 
@@ -269,9 +317,7 @@ def connect_callback(cli: IRCClient):
             def ping_server_timer(cli: IRCClient):
                 ping_server(cli)
 
-                t = threading.Timer(config.Main.get("transports[0].server_ping"), ping_server_timer, args=(cli,))
-                t.daemon = True
-                t.start()
+                timers.Main.add(config.Main.get("transports[0].server_ping"), ping_server_timer, cli, name="server_ping")
 
             ping_server_timer(cli)
 
@@ -13,7 +13,7 @@ import sys
 from typing import Any
 
 from src.decorators import hook
-from src.context import Features, NotLoggedIn
+from src.context import Features, NotLoggedIn, Priority
 from src.events import Event, event_listener
 
 from src import config, context, channels, users
@@ -355,7 +355,7 @@ def on_ping(cli, prefix, server):
     """
 
     with cli:
-        cli.send("PONG", server)
+        cli.send("PONG", server, priority=Priority.CRITICAL)
 
 @hook("featurelist")
 def get_features(cli, server, nick, *features):
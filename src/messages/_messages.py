@@ -4,19 +4,21 @@ import json
 import os
 
 from src import config
+from src.messages import catalog
 from src.messages.message import Message
+from src.messages.compiler import clear_cache
 
 MESSAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "messages")
 ROOT_DIR = os.path.join(os.path.dirname(__file__), "..", "..")
 
 class Messages:
-    def __init__(self, *, override=None):
+    def __init__(self, *, override=None, cached=True):
         if override:
             self.lang = override
         else:
             self.lang = config.Main.get("gameplay.language")
         self.cache = {}
-        self._load_messages()
+        self._load_messages(cached)
 
     def get(self, key, index=None):
         if key not in self.messages:
@@ -125,8 +127,26 @@ class Messages:
         self.cache[cache_key] = totems
         return totems
 
-    def _load_messages(self):
-        with open(os.path.join(MESSAGES_DIR, self.lang + ".json"), encoding="utf-8") as f:
+    def _load_messages(self, cached=True):
+        # compiled templates are keyed on message values, but drop them anyway so that
+        # templates from stale overrides do not linger in the cache
+        clear_cache()
+        if cached:
+            messages = catalog.load(self.lang)
+            if messages is not None:
+                self.messages = messages
+                return
+
+        sources = self._merge_messages()
+        catalog.save(self.lang, sources, self.messages)
+
+    def _merge_messages(self) -> list[str]:
+        """Load the messages for our language, its fallbacks, and messages.json overrides.
+
+        :return: List of files the merged messages depend on
+        """
+        sources = [os.path.join(MESSAGES_DIR, self.lang + ".json")]
+        with open(sources[0], encoding="utf-8") as f:
             self.messages = json.load(f)
 
         fallback = self.messages["_metadata"]["fallback"]
@@ -135,20 +155,22 @@ class Messages:
             if fallback in seen:
                 raise TypeError("Fallback loop detected")
             seen.add(fallback)
-            with open(os.path.join(MESSAGES_DIR, fallback + ".json"), encoding="utf-8") as f:
+            sources.append(os.path.join(MESSAGES_DIR, fallback + ".json"))
+            with open(sources[-1], encoding="utf-8") as f:
                 fallback_msgs = json.load(f)
                 fallback = fallback_msgs["_metadata"]["fallback"]
                 for key, message in fallback_msgs.items():
                     if key not in self.messages:
                         self.messages[key] = message
 
-        if not os.path.isfile(os.path.join(ROOT_DIR, "messages.json")):
-            return
-        with open(os.path.join(ROOT_DIR, "messages.json"), encoding="utf-8") as f:
+        sources.append(os.path.join(ROOT_DIR, "messages.json"))
+        if not os.path.isfile(sources[-1]):
+            return sources
+        with open(sources[-1], encoding="utf-8") as f:
             custom_msgs = json.load(f)
 
         if not custom_msgs:
-            return
+            return sources
 
         for key, message in custom_msgs.items():
             if key in self.messages:
@@ -173,3 +195,5 @@ class Messages:
                     self.messages[key] = message
             else:
                 self.messages[key] = message
+
+        return sources
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Iterable, Optional
+
+from src.messages.compiler import compile_message, load_templates
+
+__all__ = ["CACHE_VERSION", "cache_path", "load", "build", "save"]
+
+# Bump this whenever the format of compiled templates (see src/messages/compiler.py) or of the cache file changes
+CACHE_VERSION = 1
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "..")
+
+# Ad-hoc templates used by LocalRole, LocalMode and LocalTotem, precompiled along with the catalog
+INTERNAL_TEMPLATES = ("{0!role:plural({1})}", "{0!mode}", "{0!totem}")
+
+def cache_path(lang: str) -> str:
+    return os.path.join(CACHE_DIR, "messages.{0}.cache.json".format(lang))
+
+def _hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _stat(path: str) -> dict[str, Any]:
+    """Describe a source file of the catalog, so that we can tell whether it changed later on."""
+    if not os.path.isfile(path):
+        return {"path": os.path.abspath(path), "mtime": None, "sha256": None}
+    return {"path": os.path.abspath(path), "mtime": os.stat(path).st_mtime_ns, "sha256": _hash(path)}
+
+def _unchanged(source: dict[str, Any]) -> bool:
+    path = source["path"]
+    if not os.path.isfile(path):
+        return source["mtime"] is None
+    if source["mtime"] == os.stat(path).st_mtime_ns:
+        return True
+    # file was touched, but might not have been modified
+    return source["sha256"] == _hash(path)
+
+def _iter_templates(messages: dict[str, Any]) -> Iterable[tuple[str, str]]:
+    for key, value in messages.items():
+        # keys starting with _ hold metadata and lookup tables rather than templates
+        if key.startswith("_"):
+            continue
+        if isinstance(value, str):
+            yield key, value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, str):
+                    yield key, item
+    for value in INTERNAL_TEMPLATES:
+        yield "*", value
+
+def build(messages: dict[str, Any]) -> tuple[list[tuple[str, str, Any]], list[str]]:
+    """Compile every template in a merged message catalog.
+
+    :param messages: Merged message catalog, as loaded by Messages
+    :return: A tuple of (templates, errors). templates is a list of (key, value, tree) triples
+        for every valid template, and errors is a list of error strings for invalid ones.
+    """
+    templates = []
+    errors = []
+    for key, value in _iter_templates(messages):
+        try:
+            template = compile_message(key, value)
+        except Exception as e:
+            errors.append("{0}: {1!s}".format(key, e))
+        else:
+            templates.append((key, value, template.tree))
+    return templates, errors
+
+def load(lang: str) -> Optional[dict[str, Any]]:
+    """Load the precompiled catalog for a language, if it exists and is up to date.
+
+    The compiled templates are registered with the compiler, so that rendering them does not need antlr4.
+
+    :param lang: Language to load
+    :return: The merged message catalog, or None if the cache is missing or stale
+    """
+    try:
+        with open(cache_path(lang), encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if cache.get("version") != CACHE_VERSION or cache.get("lang") != lang:
+        return None
+    try:
+        if not all(_unchanged(source) for source in cache["sources"]):
+            return None
+    except (OSError, KeyError):
+        return None
+
+    load_templates(cache["templates"])
+    _log_errors(cache["errors"])
+    return cache["messages"]
+
+def save(lang: str, sources: list[str], messages: dict[str, Any]) -> list[str]:
+    """Compile a merged catalog and write it to the cache file for the language.
+
+    :param lang: Language of the catalog
+    :param sources: Files that the catalog was built from. Files that do not exist are recorded as
+        well, so that creating them later on invalidates the cache.
+    :param messages: Merged message catalog
+    :return: A list of errors for templates that failed to compile
+    """
+    logging.getLogger("general").info("Compiling messages for language {0}".format(lang))
+    templates, errors = build(messages)
+    load_templates(templates)
+    _log_errors(errors)
+    cache = {
+        "version": CACHE_VERSION,
+        "lang": lang,
+        "sources": [_stat(path) for path in sources],
+        "errors": errors,
+        "messages": messages,
+        "templates": templates
+    }
+
+    path = cache_path(lang)
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logging.getLogger("general").warning("Unable to write message cache {0}: {1!s}".format(path, e))
+
+    return errors
+
+def _log_errors(errors: list[str]) -> None:
+    logger = logging.getLogger("general")
+    for error in errors:
+        logger.warning("Invalid message {0}".format(error))
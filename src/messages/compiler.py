@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import functools
+from typing import Any, Iterable, Optional, Union
+
+from src.messages.formatter import Formatter
+
+__all__ = ["Template", "compile_message", "load_templates", "clear_cache"]
+
+# Compiled templates are trees of plain tuples so that they can be cached (and serialized) cheaply.
+# A fragment list is a tuple of fragments, where each fragment is one of:
+# - str: literal text
+# - ("tag", name, param, content): param is a fragment list or None, content is a fragment list
+# - ("sub", field, convert, specs, flatten): field is a fragment list, convert is a str or None,
+#   specs is a tuple of (name, arg) pairs where name is a fragment list and arg is a fragment list or None,
+#   and flatten is whether lists should be flattened when formatting the field (only at the top level)
+Fragments = tuple
+Node = Union[str, tuple]
+
+# Maximum number of compiled templates kept in memory. This comfortably holds every string in
+# the messages file as well as the ad-hoc templates used by LocalRole and friends.
+CACHE_SIZE = 4096
+
+class Template:
+    """A message value that has been parsed once and can be rendered any number of times.
+
+    Rendering a template is equivalent to walking the message parse tree with
+    :class:`src.messages.listener.Listener`, but skips the lexer and parser entirely.
+    """
+    __slots__ = ("key", "value", "tree")
+
+    def __init__(self, key: str, value: str, tree: Fragments):
+        self.key = key
+        self.value = value
+        self.tree = tree
+
+    def __repr__(self):
+        return "Template({0!r}, {1!r})".format(self.key, self.value)
+
+    def render(self, formatter: Formatter, args, kwargs) -> str:
+        used_args: set = set()
+        tree = self.tree
+        if len(tree) == 1 and isinstance(tree[0], str):
+            # fast path for messages without any substitutions or tags
+            value = tree[0]
+        else:
+            value = _join(tree, formatter, args, kwargs, used_args, enforce_string=True)
+        formatter.check_unused_args(used_args, args, kwargs)
+        return value
+
+def _join(fragments: Fragments, formatter: Formatter, args, kwargs, used_args: set, *, enforce_string: bool = False):
+    bits = [f if isinstance(f, str) else _evaluate(f, formatter, args, kwargs, used_args) for f in fragments]
+    if not enforce_string and len(bits) == 1:
+        return bits[0]
+    return "".join(str(x) for x in bits)
+
+def _evaluate(node: tuple, formatter: Formatter, args, kwargs, used_args: set) -> Any:
+    if node[0] == "sub":
+        _, field, convert, specs, flatten = node
+        field_name = _join(field, formatter, args, kwargs, used_args)
+        spec: Optional[dict] = {}
+        for name, arg in specs:
+            spec_name = _join(name, formatter, args, kwargs, used_args, enforce_string=True)
+            spec[spec_name] = None if arg is None else _join(arg, formatter, args, kwargs, used_args)
+        if not spec:
+            spec = None
+        obj, key = formatter.get_field(field_name, args, kwargs)
+        used_args.add(key)
+        obj = formatter.convert_field(obj, convert)
+        return formatter.format_field(obj, spec, flatten_lists=flatten)
+
+    # tag
+    _, name, param, content = node
+    param_value = None if param is None else _join(param, formatter, args, kwargs, used_args)
+    content_value = _join(content, formatter, args, kwargs, used_args, enforce_string=True)
+    return getattr(formatter, "tag_" + name)(content_value, param_value)
+
+# Templates loaded from the precompiled message catalog, keyed by (key, value). These never expire.
+_precompiled: dict[tuple[str, str], Template] = {}
+
+def compile_message(key: str, value: str) -> Template:
+    """Compile a message value into a reusable template.
+
+    Templates from the precompiled message catalog are used if available; otherwise the value is
+    parsed (importing antlr4 on first use) and kept in a bounded LRU cache keyed by (key, value).
+    """
+    template = _precompiled.get((key, value))
+    if template is None:
+        template = _compile(key, value)
+    return template
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _compile(key: str, value: str) -> Template:
+    from src.messages.listener import parse
+    return Template(key, value, parse(key, value))
+
+def load_templates(templates: Iterable[tuple[str, str, Fragments]]) -> None:
+    """Register precompiled templates, as (key, value, tree) triples."""
+    for key, value, tree in templates:
+        _precompiled[(key, value)] = Template(key, value, tree)
+
+def clear_cache() -> None:
+    """Drop all templates compiled on demand. Precompiled templates are kept."""
+    _compile.cache_clear()
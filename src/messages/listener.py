@@ -1,9 +1,25 @@
-from antlr4 import TerminalNode
+from __future__ import annotations
+
+from antlr4 import InputStream, CommonTokenStream, ParseTreeWalker, TerminalNode
+from antlr4.error.ErrorListener import ErrorListener
 from typing import Optional
 
+from src.messages.formatter import Formatter
+from src.messages.lexer import Lexer
+from src.messages.parser import Parser
 from src.messages.message_parserListener import message_parserListener
 from src.messages.message_parser import message_parser
 
+class MessageErrorListener(ErrorListener):
+    """Raise exceptions whenever a lexer or parser error occurs.
+
+    By default, errors are printed to stderr (kinda useless), and parsing continues as if nothing happened.
+    Then it tries to call our tree listener with bad parse state, which causes things to blow up down the line.
+    The exception messages from that are less-than intuitive, when we really just want to know the message itself
+    is bad."""
+    def syntaxError(self, recognizer, offending_symbol, line, column, msg, e):
+        raise RuntimeError("Ill-formed message \"{0}\" (offset {1}): {2}".format(recognizer.message_key, column, msg))
+
 class Listener(message_parserListener):
     def __init__(self, message, args, kwargs):
         super().__init__()
@@ -139,3 +155,130 @@ class Listener(message_parserListener):
 
     def exitSpec_func_arg_frag(self, ctx: message_parser.Spec_func_arg_fragContext):
         ctx.value = self._coalesce(ctx.sub(), ctx.ARGLIST_VALUE())
+
+class Compiler(message_parserListener):
+    """Parse tree listener which builds a compiled template rather than a formatted value."""
+    def __init__(self, key: str):
+        super().__init__()
+        self.key = key
+        self.nest_level = 0
+        self.tree: Optional[tuple] = None
+
+    def _fragments(self, fragments, *, merge: bool = False) -> tuple:
+        result: list = []
+        for node in fragments:
+            if isinstance(node, TerminalNode):
+                text = node.getText()
+                if merge and result and isinstance(result[-1], str):
+                    result[-1] += text
+                else:
+                    result.append(text)
+            else:
+                result.append(node.value)
+        return tuple(result)
+
+    def exitMain(self, ctx: message_parser.MainContext):
+        self.tree = ctx.string().value
+
+    def exitString(self, ctx: message_parser.StringContext):
+        ctx.value = self._fragments(ctx.getChildren(), merge=True) or ("",)
+
+    def exitTag(self, ctx: message_parser.TagContext):
+        tag_name, param = ctx.open_tag().value
+        close_name = ctx.close_tag().value
+
+        if tag_name != close_name:
+            raise ValueError("Parse error: {}: Opening tag {} ({}) does not match closing tag {} ({})".format(
+                             self.key, tag_name, ctx.open_tag().OPEN_TAG().getSymbol().column,
+                             close_name, ctx.close_tag().CLOSE_TAG().getSymbol().column))
+
+        if not callable(getattr(Formatter, "tag_" + tag_name, None)):
+            raise ValueError("Parse error: {}: Unknown tag {} ({})".format(
+                             self.key, tag_name, ctx.open_tag().OPEN_TAG().getSymbol().column))
+
+        ctx.value = ("tag", tag_name, param, ctx.string().value)
+
+    def exitOpen_tag(self, ctx: message_parser.Open_tagContext):
+        param = ctx.tag_param()
+        ctx.value = (ctx.TAG_NAME().getText(), param.value if param is not None else None)
+
+    def exitTag_param(self, ctx: message_parser.Tag_paramContext):
+        ctx.value = self._fragments(ctx.tag_param_frag())
+
+    def exitTag_param_frag(self, ctx: message_parser.Tag_param_fragContext):
+        ctx.value = self._fragment(ctx.sub(), ctx.TAG_PARAM())
+
+    def exitClose_tag(self, ctx: message_parser.Close_tagContext):
+        ctx.value = ctx.TAG_NAME().getText()
+
+    def enterSub(self, ctx: message_parser.SubContext):
+        self.nest_level += 1
+
+    def exitSub(self, ctx: message_parser.SubContext):
+        self.nest_level -= 1
+        convert = ctx.sub_convert()
+        ctx.value = ("sub",
+                     ctx.sub_field().value,
+                     convert.value if convert is not None else None,
+                     tuple(x.value for x in ctx.sub_spec()),
+                     self.nest_level == 0)
+
+    def exitSub_field(self, ctx: message_parser.Sub_fieldContext):
+        ctx.value = self._fragments(ctx.sub_field_frag())
+
+    def exitSub_field_frag(self, ctx: message_parser.Sub_field_fragContext):
+        ctx.value = self._fragment(ctx.sub(), ctx.SUB_FIELD())
+
+    def exitSub_convert(self, ctx: message_parser.Sub_convertContext):
+        ctx.value = ctx.SUB_IDENTIFIER().getText()
+
+    def exitSub_spec(self, ctx: message_parser.Sub_specContext):
+        ctx.value = ctx.spec_value().value
+
+    def exitSpec_value(self, ctx: message_parser.Spec_valueContext):
+        func = ctx.spec_func()
+        ctx.value = func.value if func is not None else ctx.spec_literal().value
+
+    def exitSpec_literal(self, ctx: message_parser.Spec_literalContext):
+        ctx.value = (self._fragments(ctx.spec_literal_frag()), None)
+
+    def exitSpec_literal_frag(self, ctx: message_parser.Spec_literal_fragContext):
+        ctx.value = self._fragment(ctx.sub(), ctx.SPEC_VALUE())
+
+    def exitSpec_func(self, ctx: message_parser.Spec_funcContext):
+        ctx.value = ((ctx.SPEC_VALUE().getText(),), ctx.spec_func_arg().value)
+
+    def exitSpec_func_arg(self, ctx: message_parser.Spec_func_argContext):
+        ctx.value = self._fragments(ctx.spec_func_arg_frag())
+
+    def exitSpec_func_arg_frag(self, ctx: message_parser.Spec_func_arg_fragContext):
+        ctx.value = self._fragment(ctx.sub(), ctx.ARGLIST_VALUE())
+
+    def _fragment(self, sub, terminal):
+        if sub is not None:
+            return sub.value
+        return terminal.getText()
+
+def parse(key: str, value: str) -> tuple:
+    """Run the message through the ANTLR lexer and parser, returning the compiled fragment tree.
+
+    :param key: Message key, used in error messages
+    :param value: Message value to parse
+    :return: Compiled fragment tree, suitable for use in a Template
+    :raises RuntimeError: If the message is ill-formed
+    :raises ValueError: If the message contains mismatched or unknown tags
+    """
+    error_listener = MessageErrorListener()
+    input_stream = InputStream(value)
+    lexer = Lexer(key, input_stream)
+    lexer.addErrorListener(error_listener)
+    token_stream = CommonTokenStream(lexer)
+    parser = Parser(key, token_stream)
+    parser.addErrorListener(error_listener)
+    tree = parser.main()
+    compiler = Compiler(key)
+    walker = ParseTreeWalker()
+    walker.walk(compiler, tree)
+    if compiler.tree is None:
+        raise ValueError("Parse error: {}: Unexpected end of message".format(key))
+    return compiler.tree
@@ -3,8 +3,6 @@ from __future__ import annotations
 from collections import defaultdict, Counter
 from datetime import datetime, timedelta
 
-import threading
-import itertools
 import random
 import time
 import math
@@ -19,10 +17,12 @@ from src.warnings import decrement_stasis
 from src.messages import messages
 from src.events import Event, event_listener
 from src.cats import All
-from src import config, channels, locks, reaper, users
+from src import config, channels, locks, reaper, users, timers, scope
 from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.channels import Channel
+from src.context import Priority, send_priority
+from src.rolestats import RoleStats, reconfigure_stats
 
 WAIT_TOKENS = 0
 WAIT_LAST = 0
@@ -32,6 +32,8 @@ LAST_WAIT: UserDict[User, datetime] = UserDict()
 START_VOTES: UserSet = UserSet()
 CAN_START_TIME: datetime = datetime.now()
 FORCE_ROLES: DefaultUserDict[UserSet] = DefaultUserDict(UserSet)
+scope.register(LAST_START, LAST_WAIT, START_VOTES, FORCE_ROLES)
+scope.register_globals(__name__, "WAIT_TOKENS", "WAIT_LAST", "CAN_START_TIME")
 
 @command("wait", playing=True, phases=("join",))
 def wait(wrapper: MessageDispatcher, message: str):
@@ -105,7 +107,6 @@ def fstart(wrapper: MessageDispatcher, message: str):
 @command("retract", phases=("day", "join"))
 def retract(wrapper: MessageDispatcher, message: str):
     """Take back your vote during the day (for whom to lynch)."""
-    from src.trans import TIMERS
     var = wrapper.game_state
     if wrapper.source not in get_players(var) or wrapper.source in reaper.DISCONNECTED:
         return
@@ -119,12 +120,10 @@ def retract(wrapper: MessageDispatcher, message: str):
                 wrapper.send(messages["start_retract"].format(wrapper.source))
 
                 if not START_VOTES:
-                    TIMERS["start_votes"][0].cancel()
-                    del TIMERS["start_votes"]
+                    timers.Main.cancel("start_votes")
 
 @event_listener("del_player")
 def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str], death_triggers: bool):
-    from src.trans import TIMERS
     if var.current_phase == "join":
         for role in FORCE_ROLES:
             FORCE_ROLES[role].discard(player)
@@ -132,12 +131,11 @@ def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str],
             START_VOTES.discard(player)
 
             # Cancel the start vote timer if there are no votes left
-            if not START_VOTES and "start_votes" in TIMERS:
-                TIMERS["start_votes"][0].cancel()
-                del TIMERS["start_votes"]
+            if not START_VOTES:
+                timers.Main.cancel("start_votes")
 
 def start(wrapper: MessageDispatcher, *, forced: bool = False):
-    from src.trans import stop_game, ADMIN_STOPPED, TIMERS
+    from src.trans import stop_game, ADMIN_STOPPED
 
     pregame_state: PregameState = wrapper.game_state
 
@@ -154,7 +152,7 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
         return
 
     villagers = get_players(pregame_state)
-    vils = set(get_players(pregame_state))
+    vils = list(villagers)
 
     if wrapper.source not in villagers and not forced:
         return
@@ -189,10 +187,8 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
 
                 # If this was the first vote
                 if len(START_VOTES) == 1:
-                    t = threading.Timer(60, expire_start_votes, (pregame_state, wrapper.target))
-                    TIMERS["start_votes"] = (t, time.time(), 60)
-                    t.daemon = True
-                    t.start()
+                    timers.Main.add(60, expire_start_votes, pregame_state, wrapper.target,
+                                    name="start_votes", game_id=pregame_state.game_id)
                 return
 
     if pregame_state.current_mode is None:
@@ -271,39 +267,25 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
         addroles = event.data["addroles"]
 
     # convert roleset aliases into the appropriate roles
-    possible_rolesets = [Counter()]
+    fixed_roles = Counter()
+    chosen_role_sets = []
     roleset_roles = defaultdict(int)
     ingame_state.current_mode.ACTIVE_ROLE_SETS = {}
     for role, amt in list(addroles.items()):
         # not a roleset? add a fixed amount of them
         if role not in ingame_state.current_mode.ROLE_SETS:
-            for pr in possible_rolesets:
-                pr[role] += amt
+            fixed_roles[role] += amt
             continue
         # if a roleset, ensure we don't try to expose the roleset name in !stats or future attribution
         # but do keep track of the sets in use so we can have !stats reflect proper information
         ingame_state.current_mode.ACTIVE_ROLE_SETS[role] = amt
         del addroles[role]
-        # init !stats with all 0s so that it can number things properly; the keys need to exist in the Counter
-        # across every possible roleset so that !stats works right
         rs = Counter(ingame_state.current_mode.ROLE_SETS[role])
-        for r in rs:
-            for pr in possible_rolesets:
-                pr[r] += 0
         toadd = random.sample(list(rs.elements()), amt)
         for r in toadd:
             addroles[r] += 1
             roleset_roles[r] += 1
-        add_rolesets = []
-        temp_rolesets = []
-        for c in itertools.combinations(rs.elements(), amt):
-            add_rolesets.append(Counter(c))
-        for pr in possible_rolesets:
-            for ar in add_rolesets:
-                temp = Counter(pr)
-                temp.update(ar)
-                temp_rolesets.append(temp)
-        possible_rolesets = temp_rolesets
+        chosen_role_sets.append((rs, amt))
 
     if ADMIN_STOPPED:
         for decor in (COMMANDS["join"] + COMMANDS["start"]):
@@ -355,20 +337,11 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
     for x in vils:
         ingame_state.main_roles[x] = ingame_state.default_role
     if vils:
-        for pr in possible_rolesets:
-            pr[ingame_state.default_role] += len(vils)
-
-    # Collapse possible_rolesets into global role stats
-    # which is a frozenset[frozenset[tuple[str, int]]]
-    possible_rolesets_set = set()
-    event = Event("reconfigure_stats", {"new": []})
-    for pr in possible_rolesets:
-        event.data["new"] = [pr]
-        event.dispatch(ingame_state, pr, "start")
-        for v in event.data["new"]:
-            if min(v.values()) >= 0:
-                possible_rolesets_set.add(frozenset(v.items()))
-    ingame_state.set_role_stats(possible_rolesets_set)
+        fixed_roles[ingame_state.default_role] += len(vils)
+
+    # Every distinct roleset that the role sets could have resulted in is a possibility for !stats
+    stats = RoleStats.from_role_sets(fixed_roles, chosen_role_sets)
+    ingame_state.set_role_stats(reconfigure_stats(ingame_state, stats, "start"))
 
     # Now for the secondary roles
     for role, dfn in ingame_state.current_mode.SECONDARY_ROLES.items():
@@ -429,10 +402,7 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
             raise KeyError("Invalid action for role_attribution_end")
 
     with locks.join_timer: # cancel timers
-        for name in ("join", "join_pinger", "start_votes"):
-            if name in TIMERS:
-                TIMERS[name][0].cancel()
-                del TIMERS[name]
+        timers.Main.cancel("join", "join_pinger", "start_votes")
 
     for role, players in ingame_state.roles.items():
         for player in players:
@@ -475,7 +445,8 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
     else:
         # send role messages
         evt = Event("send_role", {})
-        evt.dispatch(ingame_state)
+        with send_priority(Priority.CRITICAL):
+            evt.dispatch(ingame_state)
         from src.trans import transition_day
         transition_day(ingame_state)
 
@@ -486,10 +457,7 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
 
     if config.Main.get("reaper.enabled"):
         # DEATH TO IDLERS!
-        from src.reaper import reaper
-        reapertimer = threading.Thread(None, reaper, args=(ingame_state, ingame_state.game_id))
-        reapertimer.daemon = True
-        reapertimer.start()
+        reaper.start(ingame_state)
 
 def _command_disabled(wrapper: MessageDispatcher, message: str):
     wrapper.send(messages["command_disabled_admin"])
@@ -537,4 +505,4 @@ def on_reset(evt: Event, var: GameState):
     FORCE_ROLES.clear()
     WAIT_TOKENS = 0
     WAIT_LAST = 0
-    CAN_START_TIME = 0
+    CAN_START_TIME = datetime.now()
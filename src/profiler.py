@@ -0,0 +1,140 @@
+""" Opt-in timing of event listeners and commands.
+
+While enabled, Event.dispatch records how long every listener takes for every event, and
+commands record how long they take to run. Both are keyed by name, and keep a call count,
+the cumulative time, and a bounded random sample of durations to estimate percentiles.
+
+When disabled (the default), the only cost is checking ENABLED once per dispatch or command.
+
+Other modules may also register counters (such as cache hits and misses) with add_counters().
+These are always kept up to date by their owners, and are included in dump() and log().
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+from typing import Any, Callable, Optional
+
+__all__ = ["enable", "disable", "reset", "record", "snapshot", "add_counters", "counters", "dump", "log"]
+
+ENABLED = False
+
+# Maximum number of durations kept per entry for percentile estimates
+SAMPLE_SIZE = 1000
+
+_lock = threading.Lock()
+_STATS: dict[tuple[str, str, str], _Entry] = {}
+_COUNTERS: dict[str, Callable[[], dict[str, int]]] = {}
+
+class _Entry:
+    __slots__ = ("count", "total_ns", "max_ns", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.samples: list[int] = []
+
+    def add(self, elapsed_ns: int):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(elapsed_ns)
+        else:
+            # reservoir sampling, so every call is equally likely to be part of the sample
+            i = random.randrange(self.count)
+            if i < SAMPLE_SIZE:
+                self.samples[i] = elapsed_ns
+
+    def percentile(self, pct: float) -> int:
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+def enable():
+    """Start recording timings. Previously recorded timings are kept."""
+    global ENABLED
+    ENABLED = True
+
+def disable():
+    """Stop recording timings. Previously recorded timings are kept."""
+    global ENABLED
+    ENABLED = False
+
+def reset():
+    """Discard all recorded timings."""
+    with _lock:
+        _STATS.clear()
+
+def record(kind: str, name: str, key: str, elapsed_ns: int):
+    """Record a single timing.
+
+    :param kind: What is being timed, either "event" or "command"
+    :param name: Event or command name
+    :param key: Listener id for events, or the empty string for commands
+    :param elapsed_ns: Elapsed time in nanoseconds, as measured with time.perf_counter_ns()
+    """
+    with _lock:
+        entry = _STATS.get((kind, name, key))
+        if entry is None:
+            entry = _STATS[(kind, name, key)] = _Entry()
+        entry.add(elapsed_ns)
+
+def snapshot(kind: Optional[str] = None) -> list[dict[str, Any]]:
+    """Return the recorded timings, sorted by cumulative time (highest first).
+
+    :param kind: If given, only return timings of this kind ("event" or "command")
+    :return: A list of JSON-serializable dicts, with times in milliseconds
+    """
+    result = []
+    with _lock:
+        for (entry_kind, name, key), entry in _STATS.items():
+            if kind is not None and entry_kind != kind:
+                continue
+            result.append({
+                "kind": entry_kind,
+                "name": name,
+                "listener": key or None,
+                "calls": entry.count,
+                "total_ms": entry.total_ns / 1e6,
+                "mean_ms": entry.total_ns / entry.count / 1e6,
+                "p50_ms": entry.percentile(50) / 1e6,
+                "p99_ms": entry.percentile(99) / 1e6,
+                "max_ms": entry.max_ns / 1e6,
+            })
+    result.sort(key=lambda x: x["total_ms"], reverse=True)
+    return result
+
+def add_counters(name: str, func: Callable[[], dict[str, int]]):
+    """Register a source of counters.
+
+    :param name: Name the counters are reported under
+    :param func: Function returning the current value of each counter
+    """
+    _COUNTERS[name] = func
+
+def counters() -> dict[str, dict[str, int]]:
+    """Return the current value of every registered counter, keyed by source name."""
+    return {name: func() for name, func in _COUNTERS.items()}
+
+def dump(path: Optional[str] = None) -> str:
+    """Serialize the recorded timings as JSON.
+
+    :param path: If given, the JSON is also written to this file
+    :return: The JSON document
+    """
+    data = json.dumps({"enabled": ENABLED, "timings": snapshot(), "counters": counters()}, indent=2)
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+    return data
+
+def log():
+    """Emit the recorded timings as a log record. Structured log formats include them under "data"."""
+    data = {"enabled": ENABLED, "timings": snapshot(), "counters": counters()}
+    logger = logging.getLogger("debug.profiler")
+    logger.info("Profiler results", extra={"data": data})
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import time
-from datetime import datetime, timedelta
-from typing import Optional
+import heapq
+import itertools
+from datetime import datetime
+from typing import Any, Optional
 
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
-from src.containers import UserDict, UserSet
+from src.containers import UserDict, UserList, UserSet
 from src.gamestate import GameState
 from src.functions import get_players, get_reveal_role
 from src.warnings import add_warning
@@ -15,135 +16,210 @@ from src.status import add_dying, kill_players
 from src.events import Event, event_listener
 from src.debug import handle_error
 from src.users import User
-from src import config, locks, users, channels
+from src.context import Priority
+from src import config, locks, users, channels, timers, scope
 
-LAST_SAID_TIME = UserDict()
+LAST_SAID_TIME: UserDict[User, float] = UserDict()
 DISCONNECTED: UserDict[User, tuple[datetime, str]] = UserDict()
 IDLE_WARNED = UserSet()
 IDLE_WARNED_PM = UserSet()
 DCED_LOSERS = UserSet()
 NIGHT_IDLED = UserSet()
 
+class _Deadline:
+    """A point in time at which the reaper needs to look at a player again.
+
+    The player is kept in a UserList so that the deadline follows them across User.swap().
+    """
+
+    __slots__ = ("player", "kind", "when", "since")
+
+    def __init__(self, player: User, kind: str, since: Optional[datetime] = None):
+        self.player = UserList([player])
+        self.kind = kind
+        self.when = 0.0
+        self.since = since
+
+# Every player has one idle deadline, for their next idle warning or idle death, and disconnected
+# players additionally have one for the end of their grace period. The deadlines are kept in a
+# min-heap, and a single "reaper" timer is scheduled for the earliest of them. Speaking in channel
+# only updates LAST_SAID_TIME; a deadline found to be early is pushed back when it comes due.
+_HEAP: list[tuple[float, int, _Deadline]] = []
+_IDLE: UserDict[User, _Deadline] = UserDict()
+_COUNTER = itertools.count()
+_STATE: dict[str, Any] = {"var": None, "game_start": 0.0, "paused": None}
+scope.register(LAST_SAID_TIME, DISCONNECTED, IDLE_WARNED, IDLE_WARNED_PM, DCED_LOSERS, NIGHT_IDLED, _IDLE, _HEAP,
+               _STATE)
+
+# disconnection kind -> (death message, warning message)
+_DISCONNECT_MESSAGES = {
+    "quit": ("quit_death", "quit_warning"),
+    "part": ("part_death", "part_warning"),
+    "account": ("account_death", "acc_warning"),
+}
+
+def start(var: GameState):
+    """Start reaping idle and disconnected players in the given game."""
+    with locks.reaper:
+        _clear()
+        now = timers.Main.clock()
+        _STATE["var"] = var
+        _STATE["game_start"] = now
+        if var.current_phase == "night" and not config.Main.get("gameplay.nightchat"):
+            _STATE["paused"] = now
+        if config.Main.get("reaper.idle.enabled"):
+            for user in get_players(var):
+                if user.is_fake:
+                    continue
+                LAST_SAID_TIME.setdefault(user, now)
+                entry = _IDLE[user] = _Deadline(user, "idle")
+                _push_idle(entry, reschedule=False)
+        _reschedule()
+
+def mark_disconnected(var: GameState, user: User, what: str):
+    """Give a player who quit, parted or changed accounts until their grace period ends to return."""
+    with locks.reaper:
+        DISCONNECTED[user] = (datetime.now(), what)
+        if _STATE["var"] is not var or what not in _DISCONNECT_MESSAGES:
+            return
+        if config.Main.get(f"reaper.{what}.enabled"):
+            entry = _Deadline(user, what, DISCONNECTED[user][0])
+            _push(entry, timers.Main.clock() + config.Main.get(f"reaper.{what}.grace"))
+
+def _idle_deadline(user: User) -> Optional[tuple[float, str]]:
+    last = LAST_SAID_TIME.get(user, _STATE["game_start"])
+    warn_channel = config.Main.get("reaper.idle.warn.channel")
+    warn_private = config.Main.get("reaper.idle.warn.private")
+    grace = config.Main.get("reaper.idle.grace")
+    if warn_channel and user not in IDLE_WARNED:
+        return last + warn_channel, "warn"
+    if warn_private and user not in IDLE_WARNED_PM:
+        return last + warn_private, "warn_pm"
+    if grace:
+        return last + grace, "kill"
+    return None
+
+def _push(entry: _Deadline, when: float, *, reschedule: bool = True):
+    entry.when = when
+    heapq.heappush(_HEAP, (when, next(_COUNTER), entry))
+    if reschedule:
+        timer = timers.Main.get("reaper")
+        if timer is None or timer.deadline > when:
+            _reschedule()
+
+def _push_idle(entry: _Deadline, *, reschedule: bool = True):
+    deadline = _idle_deadline(entry.player[0])
+    if deadline is not None:
+        _push(entry, deadline[0], reschedule=reschedule)
+
+def _reschedule():
+    # heap entries are superseded rather than removed, so skip over any stale ones
+    while _HEAP and (not _HEAP[0][2].player or _HEAP[0][0] != _HEAP[0][2].when):
+        heapq.heappop(_HEAP)
+    var = _STATE["var"]
+    if not _HEAP or var is None:
+        timers.Main.cancel("reaper")
+        return
+    delay = max(_HEAP[0][0] - timers.Main.clock(), 0)
+    timers.Main.add(delay, _reap, var, var.game_id, name="reaper", game_id=var.game_id)
+
+def _pop_due(now: float) -> tuple[list[User], list[User], list[User], list[tuple[User, str]]]:
+    to_warn: list[User] = []
+    to_warn_pm: list[User] = []
+    to_kill: list[User] = []
+    dced: list[tuple[User, str]] = []
+    while _HEAP and _HEAP[0][0] <= now:
+        when, _, entry = heapq.heappop(_HEAP)
+        if not entry.player or when != entry.when:
+            continue
+        user = entry.player[0]
+        if entry.kind != "idle":
+            entry.player.clear()
+            if user in DISCONNECTED and DISCONNECTED[user] == (entry.since, entry.kind):
+                dced.append((user, entry.kind))
+            continue
+        if _STATE["paused"] is not None:
+            continue # pushed again when the day begins
+        deadline = _idle_deadline(user)
+        if deadline is None:
+            continue
+        if deadline[0] > now:
+            # they spoke since this deadline was set
+            _push(entry, deadline[0], reschedule=False)
+            continue
+        stage = deadline[1]
+        if stage == "warn":
+            to_warn.append(user)
+            IDLE_WARNED.add(user)
+            LAST_SAID_TIME[user] = now - config.Main.get("reaper.idle.warn.channel") # Give them a chance
+        elif stage == "warn_pm":
+            to_warn_pm.append(user)
+            IDLE_WARNED_PM.add(user)
+            LAST_SAID_TIME[user] = now - config.Main.get("reaper.idle.warn.private")
+        else:
+            to_kill.append(user)
+            continue
+        _push_idle(entry, reschedule=False)
+    return to_warn, to_warn_pm, to_kill, dced
+
 @handle_error
-def reaper(var: GameState, gameid: int):
-    # check to see if idlers need to be killed.
-    game_start_time = datetime.now()
-    last_day_id = var.day_count
-    num_night_iters = 0
-    short = False
-
-    while var.in_game and gameid == var.game_id:
-        skip = False
-        time.sleep(1 if short else 10)
-        short = False
-        with locks.reaper:
-            # Terminate reaper when game ends
-            if not var.in_game:
-                return
-            if var.in_phase_transition:
-                # in a phase transition, so don't run the reaper here or else things may break
-                # flag to re-run sooner than usual though
-                short = True
+def _reap(var: GameState, gameid: float):
+    with locks.reaper:
+        # Terminate reaper when game ends
+        if not var.in_game or gameid != var.game_id or _STATE["var"] is not var:
+            return
+        if var.in_phase_transition:
+            # in a phase transition, so don't run the reaper here or else things may break
+            timers.Main.add(1, _reap, var, gameid, name="reaper", game_id=gameid)
+            return
+
+        to_warn, to_warn_pm, to_kill, dced = _pop_due(timers.Main.clock())
+
+        reveal = "_no_reveal"
+        if var.role_reveal in ("on", "team"):
+            reveal = ""
+
+        for user in to_kill:
+            # keys used: idle_death, idle_death_no_reveal
+            channels.Main.send(messages[f"idle_death{reveal}"].format(user, get_reveal_role(var, user)))
+            DCED_LOSERS.add(user)
+            NIGHT_IDLED.discard(user) # don't double-dip if they idled out night as well
+            add_warning(user, config.Main.get("reaper.idle.points"), users.Bot, messages["idle_warning"], expires=config.Main.get("reaper.idle.expiration"))
+            add_dying(var, user, "bot", "idle", death_triggers=False)
+        pl = get_players(var)
+        x = [a for a in to_warn if a in pl]
+        if x:
+            channels.Main.send(messages["channel_idle_warning"].format(x), priority=Priority.BACKGROUND)
+        msg_targets = [p for p in to_warn_pm if p in pl]
+        for p in msg_targets:
+            p.queue_message(messages["player_idle_warning"].format(channels.Main))
+        if msg_targets:
+            User.send_messages(priority=Priority.BACKGROUND)
+
+        for dcedplayer, what in dced:
+            if not config.Main.get(f"reaper.{what}.enabled"):
                 continue
-            elif not config.Main.get("gameplay.nightchat"):
-                if var.current_phase == "night":
-                    # don't count nighttime towards idling
-                    # this doesn't do an exact count, but is good enough
-                    num_night_iters += 1
-                    skip = True
-                elif var.current_phase == "day" and var.day_count != last_day_id:
-                    last_day_id = var.day_count
-                    num_night_iters += 1
-                    for user in LAST_SAID_TIME:
-                        LAST_SAID_TIME[user] += timedelta(seconds=10 * num_night_iters)
-                    num_night_iters = 0
-
-            reveal = "_no_reveal"
-            if var.role_reveal in ("on", "team"):
-                reveal = ""
-
-            if not skip and config.Main.get("reaper.idle.enabled"):  # only if enabled
-                to_warn:    set[User] = set()
-                to_warn_pm: set[User] = set()
-                to_kill:    set[User] = set()
-                for user in get_players(var):
-                    if user.is_fake:
-                        continue
-                    lst = LAST_SAID_TIME.get(user, game_start_time)
-                    tdiff = datetime.now() - lst
-                    if (config.Main.get("reaper.idle.warn.channel") and
-                            tdiff > timedelta(seconds=config.Main.get("reaper.idle.warn.channel")) and
-                            user not in IDLE_WARNED):
-                        to_warn.add(user)
-                        IDLE_WARNED.add(user)
-                        LAST_SAID_TIME[user] = (datetime.now() - timedelta(seconds=config.Main.get("reaper.idle.warn.channel")))  # Give them a chance
-                    elif (config.Main.get("reaper.idle.warn.private") and
-                            tdiff > timedelta(seconds=config.Main.get("reaper.idle.warn.private")) and
-                            user not in IDLE_WARNED_PM):
-                        to_warn_pm.add(user)
-                        IDLE_WARNED_PM.add(user)
-                        LAST_SAID_TIME[user] = (datetime.now() - timedelta(seconds=config.Main.get("reaper.idle.warn.private")))
-                    elif (config.Main.get("reaper.idle.grace") and
-                            tdiff > timedelta(seconds=config.Main.get("reaper.idle.grace")) and
-                            (not config.Main.get("reaper.idle.warn.channel") or user in IDLE_WARNED) and
-                            (not config.Main.get("reaper.idle.warn.private") or user in IDLE_WARNED_PM)):
-                        to_kill.add(user)
-                    elif tdiff < timedelta(seconds=config.Main.get("reaper.idle.warn.channel")) and (user in IDLE_WARNED or user in IDLE_WARNED_PM):
-                        IDLE_WARNED.discard(user)  # player saved themselves from death
-                        IDLE_WARNED_PM.discard(user)
-                for user in to_kill:
-                    # keys used: idle_death, idle_death_no_reveal
-                    channels.Main.send(messages[f"idle_death{reveal}"].format(user, get_reveal_role(var, user)))
-                    if var.in_game:
-                        DCED_LOSERS.add(user)
-                    if config.Main.get("reaper.idle.enabled"):
-                        NIGHT_IDLED.discard(user) # don't double-dip if they idled out night as well
-                        add_warning(user, config.Main.get("reaper.idle.points"), users.Bot, messages["idle_warning"], expires=config.Main.get("reaper.idle.expiration"))
-                    add_dying(var, user, "bot", "idle", death_triggers=False)
-                pl = get_players(var)
-                x = [a for a in to_warn if a in pl]
-                if x:
-                    channels.Main.send(messages["channel_idle_warning"].format(x))
-                msg_targets = [p for p in to_warn_pm if p in pl]
-                for p in msg_targets:
-                    p.queue_message(messages["player_idle_warning"].format(channels.Main))
-                if msg_targets:
-                    User.send_messages()
-            for dcedplayer, (timeofdc, what) in list(DISCONNECTED.items()):
-                revealrole = get_reveal_role(var, dcedplayer)
-                if (what == "quit" and config.Main.get("reaper.quit.enabled") and
-                   (datetime.now() - timeofdc) > timedelta(seconds=config.Main.get("reaper.quit.grace"))):
-                    # keys used: quit_death, quit_death_no_reveal
-                    channels.Main.send(messages[f"quit_death{reveal}"].format(dcedplayer, revealrole))
-                    if var.current_phase != "join":
-                        NIGHT_IDLED.discard(dcedplayer) # don't double-dip if they idled out night as well
-                        add_warning(dcedplayer, config.Main.get("reaper.quit.points"), users.Bot, messages["quit_warning"], expires=config.Main.get("reaper.quit.expiration"))
-                    if var.in_game:
-                        DCED_LOSERS.add(dcedplayer)
-                    add_dying(var, dcedplayer, "bot", "quit", death_triggers=False)
-
-                elif (what == "part" and config.Main.get("reaper.part.enabled") and
-                        (datetime.now() - timeofdc) > timedelta(seconds=config.Main.get("reaper.part.grace"))):
-                    # keys used: part_death, part_death_no_reveal
-                    channels.Main.send(messages[f"part_death{reveal}"].format(dcedplayer, revealrole))
-                    if var.current_phase != "join":
-                        NIGHT_IDLED.discard(dcedplayer) # don't double-dip if they idled out night as well
-                        add_warning(dcedplayer, config.Main.get("reaper.part.points"), users.Bot, messages["part_warning"], expires=config.Main.get("reaper.part.expiration"))
-                    if var.in_game:
-                        DCED_LOSERS.add(dcedplayer)
-                    add_dying(var, dcedplayer, "bot", "part", death_triggers=False)
-
-                elif (what == "account" and config.Main.get("reaper.account.enabled") and
-                        (datetime.now() - timeofdc) > timedelta(seconds=config.Main.get("reaper.account.grace"))):
-                    # keys used: account_death, account_death_no_reveal
-                    channels.Main.send(messages[f"account_death{reveal}"].format(dcedplayer, revealrole))
-                    if var.current_phase != "join":
-                        NIGHT_IDLED.discard(dcedplayer) # don't double-dip if they idled out night as well
-                        add_warning(dcedplayer, config.Main.get("reaper.account.points"), users.Bot, messages["acc_warning"], expires=config.Main.get("reaper.account.expiration"))
-                    if var.in_game:
-                        DCED_LOSERS.add(dcedplayer)
-                    add_dying(var, dcedplayer, "bot", "account", death_triggers=False)
-            kill_players(var)
+            death_message, warning_message = _DISCONNECT_MESSAGES[what]
+            # keys used: quit_death, quit_death_no_reveal, part_death, part_death_no_reveal,
+            # account_death, account_death_no_reveal
+            channels.Main.send(messages[f"{death_message}{reveal}"].format(dcedplayer, get_reveal_role(var, dcedplayer)))
+            if var.current_phase != "join":
+                NIGHT_IDLED.discard(dcedplayer) # don't double-dip if they idled out night as well
+                add_warning(dcedplayer, config.Main.get(f"reaper.{what}.points"), users.Bot, messages[warning_message], expires=config.Main.get(f"reaper.{what}.expiration"))
+            DCED_LOSERS.add(dcedplayer)
+            add_dying(var, dcedplayer, "bot", what, death_triggers=False)
+        kill_players(var)
+        _reschedule()
+
+def _clear():
+    for _, _, entry in _HEAP:
+        entry.player.clear()
+    for entry in _IDLE.values():
+        entry.player.clear()
+    _HEAP.clear()
+    _IDLE.clear()
+    _STATE.update(var=None, game_start=0.0, paused=None)
+    timers.Main.cancel("reaper")
 
 @command("")  # update last said
 def update_last_said(wrapper: MessageDispatcher, message: str):
@@ -154,9 +230,17 @@ def update_last_said(wrapper: MessageDispatcher, message: str):
         return
 
     if wrapper.game_state.in_game:
-        LAST_SAID_TIME[wrapper.source] = datetime.now()
+        LAST_SAID_TIME[wrapper.source] = timers.Main.clock()
+        if wrapper.source in IDLE_WARNED or wrapper.source in IDLE_WARNED_PM:
+            # player saved themselves from death
+            with locks.reaper:
+                IDLE_WARNED.discard(wrapper.source)
+                IDLE_WARNED_PM.discard(wrapper.source)
+                entry = _IDLE.get(wrapper.source)
+                if entry is not None:
+                    _push_idle(entry)
 
-    if wrapper.private and wrapper.source in get_players(wrapper.game_state) and wrapper.source in IDLE_WARNED_PM:
+    if wrapper.private and wrapper.source in IDLE_WARNED_PM and wrapper.source in get_players(wrapper.game_state):
         wrapper.pm(messages["privmsg_idle_warning"].format(channels.Main))
 
 @handle_error
@@ -175,7 +259,7 @@ def return_to_village(var: GameState, target: User, *, show_message: bool, new_u
             if new_user is None:
                 new_user = target
 
-            LAST_SAID_TIME[target] = datetime.now()
+            LAST_SAID_TIME[target] = timers.Main.clock()
             DCED_LOSERS.discard(target)
 
             if new_user is not target:
@@ -203,6 +287,31 @@ def return_to_village(var: GameState, target: User, *, show_message: bool, new_u
 def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str], death_triggers: bool):
     if var.in_game: # remove the player from variables if they're in there
         DISCONNECTED.pop(player, None)
+        with locks.reaper:
+            entry = _IDLE.pop(player, None)
+            if entry is not None:
+                entry.player.clear()
+
+@event_listener("begin_night")
+def on_begin_night(evt: Event, var: GameState):
+    # don't count nighttime towards idling
+    if _STATE["var"] is var and not config.Main.get("gameplay.nightchat"):
+        with locks.reaper:
+            _STATE["paused"] = timers.Main.clock()
+
+@event_listener("begin_day")
+def on_begin_day(evt: Event, var: GameState):
+    with locks.reaper:
+        if _STATE["var"] is not var or _STATE["paused"] is None:
+            return
+        shift = timers.Main.clock() - _STATE["paused"]
+        _STATE["paused"] = None
+        _STATE["game_start"] += shift
+        for user in LAST_SAID_TIME:
+            LAST_SAID_TIME[user] += shift
+        for entry in _IDLE.values():
+            _push_idle(entry, reschedule=False)
+        _reschedule()
 
 @event_listener("reset")
 def on_reset(evt: Event, var: GameState):
@@ -213,6 +322,8 @@ def on_reset(evt: Event, var: GameState):
                 continue
             add_warning(player, config.Main.get("reaper.night_idle.points"), users.Bot, messages["night_idle_warning"], expires=config.Main.get("reaper.night_idle.expiration"))
 
+    with locks.reaper:
+        _clear()
     LAST_SAID_TIME.clear()
     DISCONNECTED.clear()
     IDLE_WARNED.clear()
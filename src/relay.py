@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import sys
+from typing import Iterable
 
 from src.events import event_listener
 from src.decorators import command
@@ -10,13 +11,28 @@ from src.messages import messages
 from src.events import Event
 from src.users import User
 from src.cats import role_order, Wolf, Wolfchat
-from src import config, channels, db
+from src import config, channels, db, scope
 from src.dispatcher import MessageDispatcher
+from src.context import Priority
 from src.gamestate import GameState
 
 DEADCHAT_PLAYERS: UserSet = UserSet()
 DEADCHAT_SPECTATE: UserSet = UserSet()
 WOLFCHAT_SPECTATE: UserSet = UserSet()
+scope.register(DEADCHAT_PLAYERS, DEADCHAT_SPECTATE, WOLFCHAT_SPECTATE)
+
+def _fan_out(source: User, key: str, message: str, recipients: Iterable[User], spectators: Iterable[User], spectate_key: str):
+    """Queue a relayed message for every recipient, formatting it once per variant."""
+    text = None
+    for user in recipients:
+        if text is None:
+            text = messages[key].format(source, message)
+        user.queue_message(text)
+    text = None
+    for user in spectators:
+        if text is None:
+            text = messages[spectate_key].format(source, message)
+        user.queue_message(text)
 
 @command("", chan=False, pm=True)
 def relay_wolfchat(wrapper: MessageDispatcher, message: str):
@@ -52,12 +68,9 @@ def relay_wolfchat(wrapper: MessageDispatcher, message: str):
         if message.startswith("\u0001ACTION"):
             key = "relay_action"
             message = message[8:-1]
-        for player in badguys:
-            player.queue_message(messages[key].format(wrapper.source, message))
-        for player in WOLFCHAT_SPECTATE:
-            player.queue_message(messages[key + "_wolfchat"].format(wrapper.source, message))
+        _fan_out(wrapper.source, key, message, badguys, WOLFCHAT_SPECTATE, key + "_wolfchat")
 
-        User.send_messages()
+        User.send_messages(priority=Priority.RELAY)
 
 @command("", chan=False, pm=True)
 def relay_deadchat(wrapper: MessageDispatcher, message: str):
@@ -71,12 +84,9 @@ def relay_deadchat(wrapper: MessageDispatcher, message: str):
         if message.startswith("\u0001ACTION"):
             key = "relay_action"
             message = message[8:-1]
-        for user in DEADCHAT_PLAYERS - {wrapper.source}:
-            user.queue_message(messages[key].format(wrapper.source, message))
-        for user in DEADCHAT_SPECTATE:
-            user.queue_message(messages[key + "_deadchat"].format(wrapper.source, message))
+        _fan_out(wrapper.source, key, message, DEADCHAT_PLAYERS - {wrapper.source}, DEADCHAT_SPECTATE, key + "_deadchat")
 
-        User.send_messages()
+        User.send_messages(priority=Priority.RELAY)
 
 def try_restricted_cmd(wrapper: MessageDispatcher, key: str) -> bool:
     # if allowed in normal games, restrict it so that it can only be used by dead players and
@@ -137,7 +147,7 @@ def spectate_chat(wrapper: MessageDispatcher, message: str, *, is_fspectate: boo
                 for player in players:
                     player.queue_message(messages[key].format(what, wrapper.source))
                 if players:
-                    User.send_messages()
+                    User.send_messages(priority=Priority.RELAY)
         elif config.Main.get("gameplay.deadchat"):
             if wrapper.source in DEADCHAT_PLAYERS:
                 wrapper.pm(messages["spectate_in_deadchat"])
@@ -232,7 +242,7 @@ def join_deadchat(var: GameState, *all_users: User):
     DEADCHAT_PLAYERS.update(to_join)
     DEADCHAT_SPECTATE.difference_update(to_join)
 
-    User.send_messages() # send all messages at once
+    User.send_messages(priority=Priority.RELAY) # send all messages at once
 
 def leave_deadchat(var: GameState, user: User, *, force=None):
     if not config.Main.get("gameplay.deadchat") or not var.in_game or user not in DEADCHAT_PLAYERS:
@@ -252,7 +262,7 @@ def leave_deadchat(var: GameState, user: User, *, force=None):
         for user in DEADCHAT_SPECTATE:
             user.queue_message("[deadchat] " + msg)
 
-        User.send_messages()
+        User.send_messages(priority=Priority.RELAY)
 
 @command("deadchat", pm=True)
 def deadchat_pref(wrapper: MessageDispatcher, message: str):
@@ -260,7 +270,7 @@ def deadchat_pref(wrapper: MessageDispatcher, message: str):
     if not config.Main.get("gameplay.deadchat"):
         return
 
-    temp = wrapper.source.lower()
+    temp = wrapper.source.lowered
 
     if not wrapper.source.account:
         wrapper.pm(messages["not_logged_in"])
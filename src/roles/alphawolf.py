@@ -14,12 +14,15 @@ from src.status import try_misdirection, try_exchange, add_lycanthropy, add_lyca
 from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
+from src import scope
 
 register_wolf("alpha wolf")
 
 ENABLED = False
 ALPHAS = UserSet()
 BITTEN: UserDict[User, User] = UserDict()
+scope.register(ALPHAS, BITTEN)
+scope.register_globals(__name__, "ENABLED")
 
 @command("bite", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("alpha wolf",))
 def observe(wrapper: MessageDispatcher, message: str):
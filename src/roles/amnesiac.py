@@ -3,7 +3,7 @@ from __future__ import annotations
 import random
 from typing import Optional
 
-from src import users, config
+from src import users, config, scope
 from src.cats import role_order, Win_Stealer
 from src.containers import UserDict
 from src.events import Event, event_listener
@@ -16,6 +16,8 @@ __all__ = ["get_blacklist", "get_stats_flag"]
 
 ROLES: UserDict[users.User, str] = UserDict()
 STATS_FLAG = False # if True, we begin accounting for amnesiac in update_stats
+scope.register(ROLES)
+scope.register_globals(__name__, "STATS_FLAG")
 
 def get_blacklist(var: GameState):
     return var.current_mode.SECONDARY_ROLES.keys() | Win_Stealer | {"villager", "cultist", "amnesiac"}
@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import config
+from src import config, scope
 from src import users
 from src.cats import Wolf
 from src.containers import UserSet, UserDict
@@ -20,6 +20,7 @@ from src.users import User
 GUARDED: UserDict[users.User, users.User] = UserDict()
 LASTGUARDED: UserDict[users.User, users.User] = UserDict()
 PASSED = UserSet()
+scope.register(GUARDED, LASTGUARDED, PASSED)
 
 @command("guard", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("guardian angel",))
 def guard(wrapper: MessageDispatcher, message: str):
@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import channels, users
+from src import channels, users, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
@@ -17,6 +17,7 @@ from src.users import User
 
 TARGETED: UserDict[users.User, users.User] = UserDict()
 PREV_ACTED = UserSet()
+scope.register(TARGETED, PREV_ACTED)
 
 @command("target", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("assassin",))
 def target(wrapper: MessageDispatcher, message: str):
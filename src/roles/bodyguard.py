@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import config
+from src import config, scope
 from src.cats import Wolf
 from src.containers import UserSet, UserDict
 from src.decorators import command
@@ -19,6 +19,7 @@ from src.gamestate import GameState
 GUARDED: UserDict[User, User] = UserDict()
 PASSED = UserSet()
 DYING = UserSet()
+scope.register(GUARDED, PASSED, DYING)
 
 @command("guard", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("bodyguard",))
 def guard(wrapper: MessageDispatcher, message: str):
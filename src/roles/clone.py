@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import users, config
+from src import users, config, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
@@ -19,6 +19,8 @@ CLONED: UserDict[users.User, users.User] = UserDict()
 CAN_ACT = UserSet()
 ACTED = UserSet()
 CLONE_ENABLED = False # becomes True if at least one person died and there are clones
+scope.register(CLONED, CAN_ACT, ACTED)
+scope.register_globals(__name__, "CLONE_ENABLED")
 
 @command("clone", chan=False, pm=True, playing=True, phases=("night",), roles=("clone",))
 def clone(wrapper: MessageDispatcher, message: str):
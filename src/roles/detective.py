@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import config
+from src import config, scope
 from src.cats import Safe, Wolfteam
 from src.containers import UserSet
 from src.decorators import command
@@ -18,6 +18,7 @@ from src.gamestate import GameState
 from src.users import User
 
 INVESTIGATED = UserSet()
+scope.register(INVESTIGATED)
 
 @command("id", chan=False, pm=True, playing=True, silenced=True, phases=("day",), roles=("detective",))
 def investigate(wrapper: MessageDispatcher, message: str):
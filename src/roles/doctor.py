@@ -5,7 +5,7 @@ import random
 import re
 from typing import Optional
 
-from src import config, users
+from src import config, users, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
@@ -18,6 +18,7 @@ from src.users import User
 
 IMMUNIZED = UserSet()
 DOCTORS: UserDict[users.User, int] = UserDict()
+scope.register(IMMUNIZED, DOCTORS)
 
 @command("immunize", chan=False, pm=True, playing=True, silenced=True, phases=("day",), roles=("doctor",))
 def immunize(wrapper: MessageDispatcher, message: str):
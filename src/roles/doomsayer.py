@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import status
+from src import status, scope
 from src.cats import All
 from src.containers import UserSet, UserDict
 from src.decorators import command
@@ -24,6 +24,7 @@ LASTSEEN: UserDict[User, User] = UserDict()
 KILLS: UserDict[User, User] = UserDict()
 SICK: UserDict[User, User] = UserDict()
 LYCANS: UserDict[User, User] = UserDict()
+scope.register(SEEN, LASTSEEN, KILLS, SICK, LYCANS)
 
 _mappings = ("death", KILLS), ("lycan", LYCANS), ("sick", SICK)
 
@@ -5,7 +5,7 @@ import random
 import re
 from typing import Optional
 
-from src import users, channels
+from src import users, channels, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
@@ -18,6 +18,7 @@ from src.users import User
 
 KILLS: UserDict[users.User, users.User] = UserDict()
 TARGETS: UserDict[users.User, UserSet] = UserDict()
+scope.register(KILLS, TARGETS)
 
 @command("kill", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("dullahan",))
 def dullahan_kill(wrapper: MessageDispatcher, message: str):
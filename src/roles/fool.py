@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Optional
 
-from src import channels, users
+from src import channels, users, scope
 from src.events import Event, event_listener
 from src.functions import get_all_players
 from src.gamestate import GameState
@@ -11,6 +11,7 @@ from src.trans import chk_win
 from src.users import User
 
 VOTED: Optional[users.User] = None
+scope.register_globals(__name__, "VOTED")
 
 @event_listener("lynch")
 def on_lynch(evt: Event, var: GameState, votee, voters):
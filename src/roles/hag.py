@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import re
 
-from src import users
+from src import users, scope
 from src.containers import UserDict
 from src.decorators import command
 from src.events import Event, event_listener
@@ -20,6 +20,7 @@ register_wolf("hag")
 
 HEXED: UserDict[users.User, users.User] = UserDict()
 LASTHEXED: UserDict[users.User, users.User] = UserDict()
+scope.register(HEXED, LASTHEXED)
 
 @command("hex", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("hag",))
 def hex_cmd(wrapper: MessageDispatcher, message: str):
@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.cats import Wolf
 from src.containers import UserSet, UserDict
 from src.decorators import command
@@ -19,6 +19,7 @@ from src.users import User
 VISITED: UserDict[users.User, users.User] = UserDict()
 PASSED = UserSet()
 FORCE_PASSED = UserSet()
+scope.register(VISITED, PASSED, FORCE_PASSED)
 
 @command("visit", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("harlot",))
 def hvisit(wrapper: MessageDispatcher, message: str):
@@ -5,7 +5,7 @@ import random
 import re
 from typing import Any
 
-from src import config
+from src import config, scope
 from src.cats import Wolf, Killer
 from src.containers import UserDict
 from src.decorators import command
@@ -25,6 +25,7 @@ def setup_variables(rolename: str, *, hit: float, headshot: float, explode: floa
     _rolestate[rolename] = {
         "GUNNERS": GUNNERS
     }
+    scope.register(GUNNERS)
 
     @command("shoot", playing=True, silenced=True, phases=("day",), roles=(rolename,))
     def shoot(wrapper: MessageDispatcher, message: str):
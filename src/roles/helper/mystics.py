@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Iterable
 
-from src import cats
+from src import cats, scope
 from src.containers import UserDict
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players
@@ -16,6 +16,7 @@ from src.users import User
 
 def register_mystic(rolename: str, *, send_role: bool, types: Iterable[str]):
     LAST_COUNT: UserDict[User, list[tuple[str, int]]] = UserDict()
+    scope.register(LAST_COUNT)
 
     role = rolename.replace(" ", "_")
 
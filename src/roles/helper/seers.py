@@ -3,6 +3,7 @@ from __future__ import annotations
 import random
 from typing import Optional
 
+from src import scope
 from src.containers import UserSet
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players
@@ -12,6 +13,7 @@ from src.users import User
 
 def setup_variables(rolename):
     SEEN = UserSet()
+    scope.register(SEEN)
 
     @event_listener("del_player", listener_id="<{}>.on_del_player".format(rolename))
     def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str], death_triggers: bool):
@@ -6,7 +6,7 @@ import random
 import re
 from typing import Any, Optional
 
-from src import channels, users, status
+from src import channels, users, status, scope
 from src.cats import All
 from src.containers import UserList, UserSet, UserDict, DefaultUserDict
 from src.events import Event, event_listener
@@ -84,6 +84,8 @@ DECEIT = UserSet()
 # reset/exchange/nickchange
 havetotem: list[users.User] = []
 brokentotem: set[users.User] = set()
+scope.register(DEATH, PROTECTION, REVEALING, NARCOLEPSY, SILENCE, DESPERATION, IMPATIENCE, PACIFISM, INFLUENCE,
+               EXCHANGE, LYCANTHROPY, LUCK, PESTILENCE, RETRIBUTION, MISDIRECTION, DECEIT, brokentotem, havetotem)
 
 # holds mapping of shaman roles to their state vars, for debugging
 # and unit testing purposes
@@ -111,6 +113,7 @@ def setup_variables(rolename, *, knows_totem):
         "SHAMANS": SHAMANS,
         "RETARGET": RETARGET
     }
+    scope.register(TOTEMS, LASTGIVEN, SHAMANS, RETARGET)
 
     @event_listener("reset", listener_id="shamans.<{}>.on_reset".format(rolename))
     def on_reset(evt: Event, var: GameState):
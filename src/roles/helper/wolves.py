@@ -5,7 +5,7 @@ import re
 from collections import defaultdict
 from typing import Optional, Iterable
 
-from src import users, config, relay
+from src import users, config, relay, scope
 from src.cats import Wolf, Wolfchat, Wolfteam, Killer, Hidden, All
 from src.containers import UserList, UserDict
 from src.decorators import command
@@ -18,6 +18,7 @@ from src.gamestate import GameState
 from src.users import User
 
 KILLS: UserDict[users.User, UserList] = UserDict()
+scope.register(KILLS)
 
 def register_wolf(rolename):
     @event_listener("send_role", listener_id="wolves.<{}>.on_send_role".format(rolename))
@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.events import Event, event_listener
@@ -18,6 +18,7 @@ from src.users import User
 KILLS: UserDict[users.User, users.User] = UserDict()
 HUNTERS = UserSet()
 PASSED = UserSet()
+scope.register(KILLS, HUNTERS, PASSED)
 
 @command("kill", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("hunter",))
 def hunter_kill(wrapper: MessageDispatcher, message: str):
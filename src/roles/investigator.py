@@ -14,8 +14,10 @@ from src.gamestate import GameState
 from src.messages import messages
 from src.status import try_misdirection, try_exchange
 from src.users import User
+from src import scope
 
 INVESTIGATED = UserSet()
+scope.register(INVESTIGATED)
 
 @command("id", chan=False, pm=True, playing=True, silenced=True, phases=("day",), roles=("investigator",))
 def investigate(wrapper: MessageDispatcher, message: str):
@@ -8,8 +8,10 @@ from src.functions import get_all_players
 from src.messages import messages
 from src.gamestate import GameState
 from src.users import User
+from src import scope
 
 JESTERS = UserSet()
+scope.register(JESTERS)
 
 @event_listener("lynch")
 def on_lynch(evt: Event, var: GameState, votee, voters):
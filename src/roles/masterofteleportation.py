@@ -11,8 +11,10 @@ from src.functions import get_target, get_players, get_all_players
 from src.gamestate import GameState
 from src.messages import messages
 from src.users import User
+from src import scope
 
 ACTED = UserSet()
+scope.register(ACTED)
 
 @command("choose", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("master of teleportation",))
 def choose(wrapper: MessageDispatcher, message: str):
@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import channels
+from src import channels, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.events import Event, event_listener
@@ -18,6 +18,7 @@ from src.users import User
 MATCHMAKERS = UserSet()
 ACTED = UserSet()
 LOVERS = UserDict()
+scope.register(MATCHMAKERS, ACTED, LOVERS)
 
 def _set_lovers(target1, target2):
     if target1 in LOVERS:
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from src import channels
+from src import channels, scope
 from src.containers import UserSet
 from src.events import Event, event_listener
 from src.functions import get_all_players
@@ -10,6 +10,7 @@ from src.status import add_lynch_immunity
 from src.users import User
 
 REVEALED_MAYORS = UserSet()
+scope.register(REVEALED_MAYORS)
 
 @event_listener("transition_day_begin")
 def on_transition_day_begin(evt: Event, var: GameState):
@@ -10,9 +10,11 @@ from src.functions import get_all_players
 from src.gamestate import GameState
 from src.messages import messages
 from src.users import User
+from src import scope
 
 RECEIVED_INFO = UserSet()
 KNOWS_MINIONS = UserSet()
+scope.register(RECEIVED_INFO, KNOWS_MINIONS)
 
 def wolf_list(var: GameState):
     wolves = [wolf.nick for wolf in get_all_players(var, Wolf)]
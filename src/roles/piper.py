@@ -5,7 +5,7 @@ import random
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
@@ -19,6 +19,7 @@ from src.users import User
 TOBECHARMED: UserDict[users.User, UserSet] = UserDict()
 CHARMED = UserSet()
 PASSED = UserSet()
+scope.register(TOBECHARMED, CHARMED, PASSED)
 
 @command("charm", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("piper",))
 def charm(wrapper: MessageDispatcher, message: str):
@@ -3,7 +3,7 @@ from __future__ import annotations
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.containers import UserSet
 from src.decorators import command
 from src.events import Event, event_listener
@@ -15,6 +15,7 @@ from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 
 PRIESTS = UserSet()
+scope.register(PRIESTS)
 
 @command("bless", chan=False, pm=True, playing=True, silenced=True, phases=("day",), roles=("priest",))
 def bless(wrapper: MessageDispatcher, message: str):
@@ -10,8 +10,10 @@ from src.functions import get_players, get_all_players, match_role
 from src.messages import messages
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
+from src import scope
 
 PRAYED = UserSet()
+scope.register(PRAYED)
 
 @command("pray", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("prophet",))
 def pray(wrapper: MessageDispatcher, message: str):
@@ -14,10 +14,12 @@ from src.status import try_misdirection, try_exchange
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 from src.users import User
+from src import scope
 
 register_wolf("sorcerer")
 
 OBSERVED = UserSet()
+scope.register(OBSERVED)
 
 @command("observe", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("sorcerer",))
 def observe(wrapper: MessageDispatcher, message: str):
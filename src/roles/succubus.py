@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
@@ -20,6 +20,8 @@ VISITED: UserDict[users.User, users.User] = UserDict()
 PASSED = UserSet()
 FORCE_PASSED = UserSet()
 ALL_SUCC_IDLE = True
+scope.register(ENTRANCED, VISITED, PASSED, FORCE_PASSED)
+scope.register_globals(__name__, "ALL_SUCC_IDLE")
 
 @command("visit", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("succubus",))
 def hvisit(wrapper: MessageDispatcher, message: str):
@@ -1,10 +1,8 @@
 from __future__ import annotations
 
-import threading
-import time
 from typing import Optional
 
-from src import channels
+from src import channels, timers, scope
 from src.events import event_listener, Event
 from src.gamestate import GameState
 from src.messages import messages
@@ -25,6 +23,7 @@ TIME_ATTRIBUTES = (
 )
 
 TRIGGERED = False
+scope.register_globals(__name__, "TRIGGERED")
 
 @event_listener("del_player")
 def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str], death_triggers: bool):
@@ -38,7 +37,7 @@ def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str],
     values = dict(TIME_ATTRIBUTES)
     channels.Main.send(messages["time_lord_dead"].format(values["day_time_limit"], values["night_time_limit"]))
 
-    from src.trans import hurry_up, night_warn, night_timeout, DAY_ID, NIGHT_ID, TIMERS
+    from src.trans import hurry_up, night_warn, night_timeout, DAY_ID, NIGHT_ID
     if var.current_phase == "day":
         time_limit = var.day_time_limit
         limit_cb = hurry_up
@@ -58,24 +57,14 @@ def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str],
     else:
         return
 
-    if f"{var.current_phase}_limit" in TIMERS:
-        time_left = int((TIMERS[f"{var.current_phase}_limit"][1] + TIMERS[f"{var.current_phase}_limit"][2]) - time.time())
-
-        if time_left > time_limit > 0:
-            t = threading.Timer(time_limit, limit_cb, limit_args)
-            TIMERS[f"{var.current_phase}_limit"] = (t, time.time(), time_limit)
-            t.daemon = True
-            t.start()
+    time_left = timers.Main.remaining(f"{var.current_phase}_limit")
+    if time_left is not None:
+        if int(time_left) > time_limit > 0:
+            timers.Main.add(time_limit, limit_cb, *limit_args, name=f"{var.current_phase}_limit", game_id=var.game_id)
 
             # Don't duplicate warnings, i.e. only set the warning timer if a warning was not already given
-            if timer_name in TIMERS and time_warn > 0:
-                timer = TIMERS[timer_name][0]
-                if timer.isAlive():
-                    timer.cancel()
-                    t = threading.Timer(time_warn, warn_cb, warn_args)
-                    TIMERS[timer_name] = (t, time.time(), time_warn)
-                    t.daemon = True
-                    t.start()
+            if timer_name in timers.Main and time_warn > 0:
+                timers.Main.add(time_warn, warn_cb, *warn_args, name=timer_name, game_id=var.game_id)
 
 @event_listener("night_idled")
 def on_night_idled(evt: Event, var: GameState, player: User):
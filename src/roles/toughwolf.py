@@ -1,6 +1,6 @@
 from typing import Optional
 
-from src import channels
+from src import channels, scope
 from src.messages import messages
 from src.containers import UserSet
 from src.gamestate import GameState
@@ -11,6 +11,7 @@ from src.events import Event, event_listener
 from src.roles.helper.wolves import register_wolf
 
 ACTIVATED = UserSet()
+scope.register(ACTIVATED)
 
 register_wolf("tough wolf")
 
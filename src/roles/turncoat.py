@@ -3,7 +3,7 @@ from __future__ import annotations
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.containers import UserSet, UserDict
 from src.decorators import command
 from src.events import Event, event_listener
@@ -15,6 +15,7 @@ from src.users import User
 
 TURNCOATS: UserDict[users.User, tuple[str, int]] = UserDict()
 PASSED = UserSet()
+scope.register(TURNCOATS, PASSED)
 
 @command("side", chan=False, pm=True, playing=True, phases=("night",), roles=("turncoat",))
 def change_sides(wrapper: MessageDispatcher, message: str, sendmsg=True): # is sendmsg useful at all?
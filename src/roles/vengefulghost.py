@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.cats import All, Wolfteam
 from src.containers import UserDict
 from src.decorators import command
@@ -21,6 +21,7 @@ GHOSTS: UserDict[users.User, str] = UserDict()
 
 # temporary holding variable, only non-empty during transition_day
 drivenoff: UserDict[users.User, str] = UserDict()
+scope.register(KILLS, GHOSTS, drivenoff)
 
 @command("kill", chan=False, pm=True, playing=False, silenced=True, phases=("night",), users=GHOSTS)
 def vg_kill(wrapper: MessageDispatcher, message: str):
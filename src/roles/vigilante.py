@@ -4,7 +4,7 @@ import random
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.cats import Wolf, Win_Stealer
 from src.containers import UserSet, UserDict
 from src.decorators import command
@@ -18,6 +18,7 @@ from src.users import User
 
 KILLS: UserDict[users.User, users.User] = UserDict()
 PASSED = UserSet()
+scope.register(KILLS, PASSED)
 
 @command("kill", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("vigilante",))
 def vigilante_kill(wrapper: MessageDispatcher, message: str):
@@ -14,11 +14,13 @@ from src.status import try_misdirection, try_exchange
 from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
+from src import scope
 
 register_wolf("warlock")
 
 CURSED: UserDict[User, User] = UserDict()
 PASSED: UserSet = UserSet()
+scope.register(CURSED, PASSED)
 
 @command("curse", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("warlock",))
 def curse(wrapper: MessageDispatcher, message: str):
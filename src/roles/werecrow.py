@@ -3,7 +3,7 @@ from __future__ import annotations
 import re
 from typing import Optional
 
-from src import users
+from src import users, scope
 from src.cats import Nocturnal
 from src.containers import UserDict
 from src.decorators import command
@@ -20,6 +20,7 @@ from src.users import User
 register_wolf("werecrow")
 
 OBSERVED: UserDict[users.User, users.User] = UserDict()
+scope.register(OBSERVED)
 
 @command("observe", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("werecrow",))
 def observe(wrapper: MessageDispatcher, message: str):
@@ -14,6 +14,7 @@ from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 from src.trans import NIGHT_IDLE_EXEMPT
+from src import scope
 
 IDOLS: UserDict[User, User] = UserDict()
 CAN_ACT = UserSet()
@@ -21,6 +22,7 @@ ACTED = UserSet()
 
 # this is populated only during stop_game to track which wild children turned for the endgame readout
 _turned: set[User] = set()
+scope.register(IDOLS, CAN_ACT, ACTED, _turned)
 
 @command("choose", chan=False, pm=True, playing=True, phases=("night",), roles=("wild child",))
 def choose_idol(wrapper: MessageDispatcher, message: str):
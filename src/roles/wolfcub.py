@@ -3,7 +3,7 @@ from __future__ import annotations
 from collections import Counter
 from typing import Optional
 
-from src import users, trans
+from src import users, trans, scope
 from src.cats import Wolf, Killer
 from src.events import Event, event_listener
 from src.functions import get_players
@@ -14,6 +14,7 @@ from src.users import User
 
 register_wolf("wolf cub")
 ANGRY_WOLVES = False
+scope.register_globals(__name__, "ANGRY_WOLVES")
 
 @event_listener("wolf_numkills")
 def on_wolf_numkills(evt: Event, var: GameState, wolf: User):
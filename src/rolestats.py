@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import itertools
+from collections import Counter
+from typing import Callable, Iterable, Iterator, Mapping, Optional, TYPE_CHECKING
+
+from src.events import Event
+
+if TYPE_CHECKING:
+    from src.gamestate import GameState
+
+__all__ = ["RoleStats", "reconfigure_stats"]
+
+class RoleStats:
+    """Every roleset (mapping of role to count) which is still possible given what players know.
+
+    This backs the "default" !stats type. Rolesets are stored as tuples of counts over a shared
+    role index, and identical rolesets are merged, so the size is bounded by the number of distinct
+    possibilities rather than by how many ways there are to arrive at them.
+    Instances are immutable; every update returns a new instance.
+    """
+
+    __slots__ = ("_roles", "_index", "_sets", "_ranges")
+
+    def __init__(self, rolesets: Iterable[Mapping[str, int] | Iterable[tuple[str, int]]] = (), roles: Iterable[str] = ()):
+        """Create role stats from the given rolesets.
+
+        :param rolesets: Possible rolesets, either as mappings or as iterables of (role, count) pairs.
+            Rolesets with negative counts are impossible, and are discarded.
+        :param roles: Roles to track even if they don't appear in any roleset
+        """
+        index: dict[str, int] = {}
+        for role in roles:
+            index.setdefault(role, len(index))
+        items = []
+        for rs in rolesets:
+            rs = dict(rs)
+            if rs and min(rs.values()) < 0:
+                continue
+            items.append(rs)
+            for role in rs:
+                index.setdefault(role, len(index))
+        self._roles: tuple[str, ...] = tuple(index)
+        self._index = index
+        self._sets: frozenset[tuple[int, ...]] = frozenset(tuple(rs.get(role, 0) for role in self._roles) for rs in items)
+        self._ranges: Optional[dict[str, tuple[int, int]]] = None
+
+    @classmethod
+    def _from_counts(cls, roles: tuple[str, ...], index: dict[str, int], sets: Iterable[tuple[int, ...]]) -> RoleStats:
+        obj = cls.__new__(cls)
+        obj._roles = roles
+        obj._index = index
+        obj._sets = frozenset(sets)
+        obj._ranges = None
+        return obj
+
+    @classmethod
+    def from_role_sets(cls, fixed: Mapping[str, int], role_sets: Iterable[tuple[Mapping[str, int], int]]) -> RoleStats:
+        """Create role stats for a game starting with a fixed set of roles, plus some roles chosen from role sets.
+
+        :param fixed: Roles and their counts which are always present
+        :param role_sets: Pairs of (role set, amount), where amount roles are chosen from the role set
+            (a mapping of role to how many of that role can be chosen)
+        :return: Role stats containing every distinct roleset that could have been chosen
+        """
+        role_sets = [(dict(rs), amount) for rs, amount in role_sets]
+        index: dict[str, int] = {}
+        for role in itertools.chain(fixed, *(rs for rs, _ in role_sets)):
+            index.setdefault(role, len(index))
+        roles = tuple(index)
+
+        sets = {tuple(fixed.get(role, 0) for role in roles)}
+        for rs, amount in role_sets:
+            positions = tuple(index[role] for role in rs)
+            new_sets = set()
+            for chosen in _choose(list(rs.values()), amount):
+                for counts in sets:
+                    new = list(counts)
+                    for i, num in zip(positions, chosen):
+                        new[i] += num
+                    new_sets.add(tuple(new))
+            sets = new_sets
+        return cls._from_counts(roles, index, sets)
+
+    def __iter__(self) -> Iterator[Counter[str]]:
+        """Iterate over every possible roleset. The Counters are copies and may be freely modified."""
+        for counts in self._sets:
+            yield Counter(dict(zip(self._roles, counts)))
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    def __bool__(self) -> bool:
+        return bool(self._sets)
+
+    def __eq__(self, other):
+        if not isinstance(other, RoleStats):
+            return NotImplemented
+        return self.as_frozensets() == other.as_frozensets()
+
+    def __repr__(self) -> str:
+        return "RoleStats({0!r})".format([dict(rs) for rs in self])
+
+    @property
+    def roles(self) -> tuple[str, ...]:
+        """All roles which are being tracked."""
+        return self._roles
+
+    def ranges(self) -> dict[str, tuple[int, int]]:
+        """Return the minimum and maximum possible count of every role.
+
+        This is computed once per instance; later calls are a dictionary copy.
+        """
+        if self._ranges is None:
+            if self._sets:
+                columns = zip(*self._sets)
+                self._ranges = {role: (min(column), max(column)) for role, column in zip(self._roles, columns)}
+            else:
+                self._ranges = {}
+        return dict(self._ranges)
+
+    def as_frozensets(self) -> frozenset[frozenset[tuple[str, int]]]:
+        """Return the rolesets in the format formerly used by GameState.get_role_stats()."""
+        return frozenset(frozenset(zip(self._roles, counts)) for counts in self._sets)
+
+    def transform(self, func: Callable[[Counter[str]], Iterable[Mapping[str, int]]]) -> RoleStats:
+        """Replace every roleset by the rolesets that func returns for it.
+
+        :param func: Called with a copy of every roleset, and returns the rolesets it turns into.
+            Returning an empty iterable discards the roleset.
+        :return: New role stats
+        """
+        new = []
+        for rs in self:
+            new.extend(func(rs))
+        return RoleStats(new, self._roles)
+
+    def remove_one(self, possible: Iterable[str]) -> RoleStats:
+        """Remove a player who had one of the possible roles.
+
+        Every roleset is replaced by one roleset for each possible role it contains, with that role's
+        count decreased by one. Rolesets which contain none of the possible roles are discarded.
+        """
+        indices = [self._index[role] for role in set(possible) if role in self._index]
+        sets = set()
+        for counts in self._sets:
+            for i in indices:
+                if counts[i] > 0:
+                    sets.add(counts[:i] + (counts[i] - 1,) + counts[i+1:])
+        return self._from_counts(self._roles, self._index, sets)
+
+    def convert_one(self, old: str, new: str) -> RoleStats:
+        """Account for a player who may have turned from the old role into the new role.
+
+        Every roleset is kept, and for rolesets containing the old role, a copy with one of the
+        old role changed to the new role is added.
+        """
+        roles, index = self._roles, self._index
+        sets = set(self._sets)
+        if new not in index:
+            roles = roles + (new,)
+            index = dict(index)
+            index[new] = len(index)
+            sets = {counts + (0,) for counts in sets}
+        if old in index:
+            i, j = index[old], index[new]
+            for counts in list(sets):
+                if counts[i] > 0:
+                    changed = list(counts)
+                    changed[i] -= 1
+                    changed[j] += 1
+                    sets.add(tuple(changed))
+        return self._from_counts(roles, index, sets)
+
+def reconfigure_stats(var: GameState, stats: RoleStats, reason: str) -> RoleStats:
+    """Give roles and modes an opportunity to adjust the role stats.
+
+    This dispatches the reconfigure_stats event once for every possible roleset. Listeners may modify
+    the roleset in place, or change the list in evt.data["new"] to replace it with other rolesets.
+
+    :param var: Game state
+    :param stats: Current role stats
+    :param reason: Why the stats are being reconfigured, e.g. "start", "del_player" or "howl"
+    :return: Updated role stats
+    """
+    event = Event("reconfigure_stats", {"new": []})
+
+    def dispatch(roleset: Counter[str]) -> list[Counter[str]]:
+        event.data["new"] = [roleset]
+        event.dispatch(var, roleset, reason)
+        return event.data["new"]
+
+    return stats.transform(dispatch)
+
+def _choose(limits: list[int], amount: int, start: int = 0) -> Iterator[tuple[int, ...]]:
+    """Yield every distinct way to choose amount items, taking at most limits[i] items of kind i."""
+    if start == len(limits):
+        if amount == 0:
+            yield ()
+        return
+    remaining = sum(limits[start+1:])
+    for num in range(max(0, amount - remaining), min(limits[start], amount) + 1):
+        for rest in _choose(limits, amount - num, start + 1):
+            yield (num,) + rest
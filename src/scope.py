@@ -0,0 +1,238 @@
+""" Run a separate game in each game channel.
+
+The game engine keeps most of its state in module globals: role modules hold their targets and
+actions in User containers, and the core modules track votes, timers, idling and dead chat the same
+way. Modules register that state here, and every game channel gets its own copy of it. Only one
+channel is active at a time. Before a line or a timer belonging to another channel is handled, the
+registered state of the active channel is saved and emptied, the saved state of the other channel is
+put back, and channels.Main is pointed at that channel. Code using the module globals and channels.Main
+thus always works on the game it is running for, without having to know about other channels.
+
+The contents of User containers are saved into User containers of their own, so that players who
+change their nick or account while their channel is inactive (User.swap) are still updated in them.
+Channels are switched lazily, so nothing is saved or restored while a single channel is in use.
+Switching holds a lock for as long as the channel is entered, so the timer thread and the connection
+thread never run games at the same time.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import copy
+import sys
+import threading
+from typing import Any, Iterable, Iterator, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.channels import Channel
+    from src.gamemodes import GameMode
+    from src.users import User
+
+__all__ = ["register", "register_globals", "add_channel", "game_channels", "is_game_channel",
+           "current", "enter", "resolve", "resolve_line", "channel_of"]
+
+_lock = threading.RLock()
+_depth = 0
+_current: Optional[Channel] = None
+_channels: list[Channel] = []
+
+# Registered containers with their initial contents, and module globals with their initial value
+_containers: list[tuple[Any, Any]] = []
+_globals: list[tuple[Any, str, Any]] = []
+# Saved state of every inactive channel, keyed by id(channel)
+_saved: dict[int, tuple[list, list]] = {}
+# Game channel of every player, keyed by id(user), and what it was computed from
+_index: dict[int, Channel] = {}
+_index_key: tuple = ()
+
+def register(*objects):
+    """Give every game channel its own contents for these containers.
+
+    User containers start out empty in every channel. Plain dicts, lists and sets start out with
+    the contents they have when they are registered.
+    """
+    from src.containers import Container
+    for obj in objects:
+        _containers.append((obj, None if isinstance(obj, Container) else copy.copy(obj)))
+
+def register_globals(module: str, *names: str):
+    """Give every game channel its own value for these module globals, which are rebound rather than mutated.
+
+    :param module: Name of the module, usually __name__
+    :param names: Names of the globals. They start out in every channel with the value they have now.
+    """
+    mod = sys.modules[module]
+    for name in names:
+        _globals.append((mod, name, getattr(mod, name)))
+
+def add_channel(channel: Channel):
+    """Allow games to be played in this channel. The first channel added is the default one."""
+    global _current
+    with _lock:
+        if any(channel is ch for ch in _channels):
+            return
+        _channels.append(channel)
+        if _current is None:
+            # the registered state is already fresh, so it belongs to this channel
+            _current = channel
+
+def game_channels() -> list[Channel]:
+    """Return the channels where games can be played, starting with the main channel."""
+    return list(_channels)
+
+def is_game_channel(channel) -> bool:
+    return any(channel is ch for ch in _channels)
+
+def current() -> Optional[Channel]:
+    """Return the channel whose game state is currently in the module globals."""
+    return _current
+
+def channel_of(user: User) -> Optional[Channel]:
+    """Return the game channel where the user joined the game, if any."""
+    global _index_key
+    from src import gamestate
+    # the generation changes whenever players join or leave a game
+    key = (gamestate._generation,) + tuple(id(channel.game_state) for channel in _channels)
+    if key != _index_key:
+        _index.clear()
+        for channel in _channels:
+            if channel.game_state is not None:
+                _index.update(dict.fromkeys(map(id, channel.game_state.players), channel))
+        _index_key = key
+    return _index.get(id(user))
+
+def resolve(channel: Optional[Channel] = None, user: Optional[User] = None) -> Optional[Channel]:
+    """Return the game channel that something happening in channel, or done by user, belongs to.
+
+    This is channel if it is a game channel, otherwise the channel where user is playing.
+    Anything else belongs to the main channel. Returns None if there are no game channels.
+    """
+    if not _channels:
+        return None
+    if channel is not None and is_game_channel(channel):
+        return channel
+    if user is not None:
+        found = channel_of(user)
+        if found is not None:
+            return found
+    return _channels[0]
+
+def resolve_line(params: Iterable) -> Optional[Channel]:
+    """Return the game channel that a line from the server belongs to.
+
+    :param params: The prefix of the line, followed by its parameters
+    """
+    if not _channels:
+        return None
+    from src import channels, users
+    params = list(params)
+    for param in params:
+        if isinstance(param, str) and channels.exists(param):
+            chan = channels.get(param)
+            if is_game_channel(chan):
+                return chan
+    user = None
+    if params and isinstance(params[0], str) and params[0]:
+        user = users.get(params[0], allow_none=True)
+    return resolve(user=user)
+
+@contextlib.contextmanager
+def enter(channel: Optional[Channel]) -> Iterator[None]:
+    """Make channel the active channel for the duration of the block.
+
+    Once the block is left, the channel stays active, unless this was nested in another block
+    for a different channel. If channel is None, the active channel is left as it is.
+    """
+    global _depth
+    with _lock:
+        previous = _current
+        if channel is not None and channel is not _current:
+            _switch(channel)
+        _depth += 1
+        try:
+            yield
+        finally:
+            _depth -= 1
+            if _depth and previous is not None and previous is not _current:
+                _switch(previous)
+
+def _switch(channel: Channel):
+    global _current
+    from src import channels
+    old = _current
+    if old is not None:
+        _set_mode_events(old, False)
+        # most containers are empty, and User containers have nothing to reset
+        _saved[id(old)] = ([_take(obj, initial) if obj or initial is not None else None for obj, initial in _containers],
+                           [_take_global(mod, name, initial) for mod, name, initial in _globals])
+    saved = _saved.pop(id(channel), None)
+    if saved is not None:
+        for (obj, initial), contents in zip(_containers, saved[0]):
+            if contents is not None:
+                _put(obj, contents)
+        for (mod, name, initial), value in zip(_globals, saved[1]):
+            setattr(mod, name, value)
+    _current = channels.Main = channel
+    if old is not None:
+        _set_mode_events(channel, True)
+
+def _set_mode_events(channel: Channel, installed: bool):
+    # listeners of the game mode apply to its own game only
+    var = channel.game_state
+    mode: Optional[GameMode] = var.current_mode if var is not None else None
+    if mode is None:
+        return
+    if installed:
+        mode.install_events()
+    else:
+        mode.remove_events()
+
+def _take(obj, initial):
+    """Empty obj (or reset it to its initial contents), and return what it contained.
+
+    The contents of User containers are moved into a detached container of the same kind.
+    """
+    from src.containers import UserDict, UserList, UserSet
+    if isinstance(obj, UserDict):
+        # pop() doesn't clear nested containers, so they can be put back as they are
+        saved = UserDict()
+        for key in list(obj):
+            saved[key] = obj.pop(key)
+        return saved
+    if isinstance(obj, UserSet):
+        saved = UserSet()
+        while obj:
+            saved.add(obj.pop())
+        return saved
+    if isinstance(obj, UserList):
+        saved = UserList(obj)
+        while obj:
+            obj.pop()
+        return saved
+    saved = copy.copy(obj)
+    _put(obj, copy.copy(initial))
+    return saved
+
+def _put(obj, contents):
+    """Put contents back into obj. The detached containers made by _take are left empty."""
+    from src.containers import UserDict, UserList, UserSet
+    if isinstance(obj, UserDict):
+        for key in list(contents):
+            obj[key] = contents.pop(key)
+    elif isinstance(obj, UserSet):
+        while contents:
+            obj.add(contents.pop())
+    elif isinstance(obj, UserList):
+        obj.extend(contents)
+        while contents:
+            contents.pop()
+    elif isinstance(obj, list):
+        obj[:] = contents
+    else:
+        obj.clear()
+        obj.update(contents)
+
+def _take_global(mod, name: str, initial):
+    value = getattr(mod, name)
+    setattr(mod, name, initial)
+    return value
@@ -6,10 +6,12 @@ from src.functions import get_players
 from src.messages import messages
 from src.gamestate import GameState
 from src.users import User
+from src import scope
 
 __all__ = ["add_absent", "try_absent", "get_absent"]
 
 ABSENT: UserDict[User, str] = UserDict()
+scope.register(ABSENT)
 
 def add_absent(var: GameState, target: User, reason: str):
     if target not in get_players(var):
@@ -5,11 +5,14 @@ from src.gamestate import GameState
 from src.functions import get_players
 from src.events import Event, event_listener
 from src.users import User
+from src import scope
 
 __all__ = ["add_disease", "remove_disease", "wolves_diseased"]
 
 DISEASED = UserSet()
 DISEASED_WOLVES = False
+scope.register(DISEASED)
+scope.register_globals(__name__, "DISEASED_WOLVES")
 
 def add_disease(var: GameState, target: User):
     """Effect the target with disease. Fire the add_disease event."""
@@ -1,23 +1,24 @@
 from __future__ import annotations
 
 import time
-from collections import Counter
 from typing import Optional, Tuple
 
-from src.containers import UserDict, UserSet
+from src.containers import UserDict, UserSet, TrackedUserDict
 from src.functions import get_main_role, get_all_roles, get_reveal_role
 from src.messages import messages
-from src.gamestate import GameState, PregameState
+from src.gamestate import GameState, PregameState, players_changed
+from src.rolestats import reconfigure_stats
 from src.events import Event, event_listener
 from src.users import User
-from src import locks, channels
+from src import locks, channels, scope
 
 __all__ = ["add_dying", "is_dying", "is_dead", "kill_players", "DEAD"]
 
 DyingEntry = Tuple[str, str, bool]
 
-DYING: UserDict[User, DyingEntry] = UserDict()
+DYING: UserDict[User, DyingEntry] = TrackedUserDict(players_changed)
 DEAD: UserSet = UserSet()
+scope.register(DYING, DEAD)
 
 def add_dying(var: GameState, player: User, killer_role: str, reason: str, *, death_triggers: bool = True) -> bool:
     """
@@ -121,16 +122,7 @@ def kill_players(var: Optional[GameState | PregameState], *, end_game: bool = Tr
             return False
 
         # give roles/modes an opportunity to adjust !stats now that all deaths have resolved
-        evt = Event("reconfigure_stats", {"new": []})
-        newstats = set()
-        for rs in var.get_role_stats():
-            d = Counter(dict(rs))
-            evt.data["new"] = [d]
-            evt.dispatch(var, d, "del_player")
-            for v in evt.data["new"]:
-                if min(v.values()) >= 0:
-                    newstats.add(frozenset(v.items()))
-        var.set_role_stats(newstats)
+        var.set_role_stats(reconfigure_stats(var, var.role_stats, "del_player"))
 
         # notify listeners that all deaths have resolved
         # FIXME: end_game is a temporary hack until we move state transitions into the event loop
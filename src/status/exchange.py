@@ -6,10 +6,12 @@ from src.messages import messages
 from src.events import Event, event_listener
 from src.gamestate import GameState
 from src.users import User
+from src import scope
 
 __all__ = ["add_exchange", "try_exchange"]
 
 EXCHANGE = UserSet()
+scope.register(EXCHANGE)
 
 def add_exchange(var: GameState, user: User):
     if user not in get_players(var):
@@ -8,6 +8,7 @@ from src.messages import messages
 from src.events import Event, event_listener
 from src.gamestate import GameState
 from src.users import User
+from src import scope
 
 __all__ = ["add_force_vote", "add_force_abstain", "can_vote", "can_abstain", "get_forced_votes", "get_all_forced_votes", "get_forced_abstains"]
 
@@ -20,6 +21,7 @@ __all__ = ["add_force_vote", "add_force_abstain", "can_vote", "can_abstain", "ge
 
 FORCED_COUNTS: UserDict[User, int] = UserDict()
 FORCED_TARGETS: UserDict[User, UserSet] = UserDict()
+scope.register(FORCED_COUNTS, FORCED_TARGETS)
 
 def _add_count(var: GameState, votee: User, amount: int) -> None:
     FORCED_COUNTS[votee] = FORCED_COUNTS.get(votee, 0) + amount
@@ -9,11 +9,13 @@ from src.events import Event, event_listener
 from src.cats import Wolf, Category
 from src.gamestate import GameState
 from src.users import User
+from src import scope
 
 __all__ = ["add_lycanthropy", "remove_lycanthropy", "add_lycanthropy_scope"]
 
 LYCANTHROPES: UserDict[User, str] = UserDict()
 SCOPE = set()
+scope.register(LYCANTHROPES, SCOPE)
 
 def add_lycanthropy(var: GameState, target: User, prefix="lycan"):
     """Effect the target with lycanthropy. Fire the add_lycanthropy event."""
@@ -6,10 +6,12 @@ from src.messages import messages
 from src.events import Event, event_listener
 from src.gamestate import GameState
 from src.users import User
+from src import scope
 
 __all__ = ["add_lynch_immunity", "try_lynch_immunity"]
 
 IMMUNITY: DefaultUserDict[User, set[str]] = DefaultUserDict(set)
+scope.register(IMMUNITY)
 
 def add_lynch_immunity(var: GameState, user: User, reason: str):
     """Make user immune to lynching for one day."""
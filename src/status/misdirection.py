@@ -10,6 +10,7 @@ from src.functions import get_players
 from src.messages import messages
 from src.users import User
 from src.cats import Category
+from src import scope
 
 __all__ = ["add_misdirection", "try_misdirection", "add_misdirection_scope", "in_misdirection_scope"]
 
@@ -17,6 +18,7 @@ AS_ACTOR = UserSet()
 AS_TARGET = UserSet()
 ACTOR_SCOPE = set()
 TARGET_SCOPE = set()
+scope.register(AS_ACTOR, AS_TARGET, ACTOR_SCOPE, TARGET_SCOPE)
 
 def _get_target(var: GameState, target: User):
     """Internal helper for try_misdirection. Return one target over."""
@@ -9,10 +9,12 @@ from src.events import Event, event_listener
 from src.cats import All, Category
 from src.users import User
 from src.gamestate import GameState
+from src import scope
 
 __all__ = ["add_protection", "try_protection", "remove_all_protections"]
 
 PROTECTIONS: UserDict[User, UserDict[Optional[User], list[tuple[Category | set[str], str]]]] = UserDict()
+scope.register(PROTECTIONS)
 
 def add_protection(var: GameState, target: User, protector: Optional[User], protector_role: str, scope: Category | set[str] = All):
     """Add a protection to the target affecting the relevant scope."""
@@ -5,10 +5,12 @@ from src.gamestate import GameState
 from src.events import Event, event_listener
 from src.messages import messages
 from src.users import User
+from src import scope
 
 __all__ = ["add_silent", "is_silent"]
 
 SILENT: UserSet[User] = UserSet()
+scope.register(SILENT)
 
 def add_silent(var: GameState, user: User):
     """Silence the target, preventing them from using actions for a day."""
@@ -6,10 +6,12 @@ from src.gamestate import GameState
 from src.functions import get_players
 from src.messages import messages
 from src.users import User
+from src import scope
 
 __all__ = ["add_vote_weight", "remove_vote_weight", "get_vote_weight"]
 
 WEIGHT: UserDict[User, int] = UserDict()
+scope.register(WEIGHT)
 
 def add_vote_weight(var: GameState, target: User, amount : int = 1) -> None:
     """Make the target's votes as having more weight."""
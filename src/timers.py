@@ -0,0 +1,202 @@
+""" Central scheduler for delayed callbacks (phase time limits, join timers, server pings, etc.).
+
+All timers are kept in a single heap and run from one thread, instead of starting a new
+threading.Timer (and OS thread) for every timer. Timers can be given a name, which allows
+them to be looked up (e.g. by !time) or replaced, and a game id, which allows every timer
+belonging to a game to be cancelled at once when that game ends.
+
+The clock can be swapped out and the thread disabled, so that tests can advance time
+manually and call Scheduler.run_pending() instead of sleeping.
+
+Timers belong to the game channel that is active when they are added (see src.scope): names are
+only looked up among the timers of the active channel, and every timer runs with its channel active.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+from src.debug import handle_error
+from src import scope
+
+if TYPE_CHECKING:
+    from src.channels import Channel
+
+__all__ = ["Timer", "Scheduler", "Main"]
+
+class Timer:
+    """A callback scheduled to run once after a delay. Use Scheduler.add to create timers."""
+
+    __slots__ = ("scheduler", "channel", "name", "game_id", "delay", "deadline", "callback", "args", "cancelled", "finished")
+
+    def __init__(self, scheduler: Scheduler, channel: Optional[Channel], name: Optional[str], game_id: Optional[float], delay: float,
+                 deadline: float, callback: Callable[..., Any], args: tuple):
+        self.scheduler = scheduler
+        self.channel = channel
+        self.name = name
+        self.game_id = game_id
+        self.delay = delay
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.finished = False
+
+    def __repr__(self):
+        return "Timer({0!r}, {1!r}, remaining={2:.1f})".format(self.name, self.callback, self.remaining)
+
+    @property
+    def active(self) -> bool:
+        """Whether this timer has neither run nor been cancelled yet."""
+        return not self.cancelled and not self.finished
+
+    @property
+    def remaining(self) -> float:
+        """Number of seconds until this timer runs, or 0 if it is no longer active."""
+        if not self.active:
+            return 0
+        return max(self.deadline - self.scheduler.clock(), 0)
+
+    def cancel(self):
+        """Cancel this timer. Does nothing if it already ran or was cancelled."""
+        self.scheduler._cancel(self)
+
+class Scheduler:
+    """Run callbacks after a delay, from a single thread.
+
+    :param clock: Function returning the current time in seconds, defaults to time.monotonic
+    :param threaded: If False, no thread is started and run_pending() must be called manually
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, *, threaded: bool = True):
+        self.clock = clock
+        self.threaded = threaded
+        self._heap: list[tuple[float, int, Timer]] = []
+        # named timers, keyed by (channel, name)
+        self._named: dict[tuple[Optional[Channel], str], Timer] = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition(threading.RLock())
+        self._thread: Optional[threading.Thread] = None
+
+    def __contains__(self, name: str) -> bool:
+        with self._cond:
+            return (scope.current(), name) in self._named
+
+    def add(self, delay: float, callback: Callable[..., Any], *args, name: Optional[str] = None, game_id: Optional[float] = None) -> Timer:
+        """Schedule callback(*args) to run after delay seconds.
+
+        :param delay: Delay in seconds
+        :param callback: Function to run
+        :param name: If given, the timer can be looked up by name. Any existing timer with the
+            same name in the active channel is cancelled and replaced.
+        :param game_id: If given, the timer is cancelled by cancel_game() for this game id
+        :return: The new timer, which may be cancelled directly
+        """
+        with self._cond:
+            channel = scope.current()
+            timer = Timer(self, channel, name, game_id, delay, self.clock() + delay, callback, args)
+            if name is not None:
+                old = self._named.get((channel, name))
+                if old is not None:
+                    old.cancelled = True
+                self._named[(channel, name)] = timer
+            heapq.heappush(self._heap, (timer.deadline, next(self._counter), timer))
+            if self.threaded and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="timers", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return timer
+
+    def get(self, name: str) -> Optional[Timer]:
+        """Return the active timer with the given name in the active channel, if any."""
+        with self._cond:
+            return self._named.get((scope.current(), name))
+
+    def remaining(self, name: str) -> Optional[float]:
+        """Return the number of seconds until the named timer runs, or None if there is no such timer."""
+        timer = self.get(name)
+        if timer is None:
+            return None
+        return timer.remaining
+
+    def cancel(self, *names: str):
+        """Cancel the timers with the given names in the active channel, if they exist."""
+        with self._cond:
+            channel = scope.current()
+            for name in names:
+                timer = self._named.get((channel, name))
+                if timer is not None:
+                    self._cancel(timer)
+
+    def cancel_game(self, game_id: float):
+        """Cancel every timer belonging to the given game."""
+        with self._cond:
+            for _, _, timer in self._heap:
+                if timer.game_id == game_id:
+                    self._cancel(timer)
+
+    def _cancel(self, timer: Timer):
+        with self._cond:
+            timer.cancelled = True
+            if timer.name is not None and self._named.get((timer.channel, timer.name)) is timer:
+                del self._named[(timer.channel, timer.name)]
+            # cancelled timers are left in the heap and discarded once they're due
+
+    def _pop_due(self) -> Optional[Timer]:
+        with self._cond:
+            while self._heap:
+                deadline, _, timer = self._heap[0]
+                if timer.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+                if deadline > self.clock():
+                    return None
+                heapq.heappop(self._heap)
+                timer.finished = True
+                if timer.name is not None and self._named.get((timer.channel, timer.name)) is timer:
+                    del self._named[(timer.channel, timer.name)]
+                return timer
+            return None
+
+    def next_deadline(self) -> Optional[float]:
+        """Return the clock time at which the next timer is due, or None if there are no timers."""
+        with self._cond:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return self._heap[0][0]
+
+    def run_pending(self) -> int:
+        """Run every timer which is due, and return how many were run."""
+        count = 0
+        while True:
+            timer = self._pop_due()
+            if timer is None:
+                return count
+            with scope.enter(timer.channel):
+                _run_callback(timer.callback, *timer.args)
+            count += 1
+
+    def _run(self):
+        while True:
+            self.run_pending()
+            with self._cond:
+                deadline = self.next_deadline()
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    wait = deadline - self.clock()
+                    if wait > 0:
+                        self._cond.wait(wait)
+
+@handle_error
+def _run_callback(callback: Callable[..., Any], *args):
+    # errors are reported here rather than killing the scheduler thread
+    callback(*args)
+
+Main = Scheduler()
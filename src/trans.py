@@ -3,7 +3,6 @@ from __future__ import annotations
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 from typing import Optional, Callable
-import threading
 import time
 
 from src.transport.irc import get_ircd
@@ -17,12 +16,13 @@ from src.users import User
 from src.events import Event, event_listener
 from src.votes import chk_decision
 from src.cats import Wolfteam, Hidden, Village, Win_Stealer, Wolf_Objective, Village_Objective, role_order
-from src import channels, users, locks, config, db, reaper, relay
+from src import channels, users, locks, config, db, reaper, relay, timers, scope
 from src.dispatcher import MessageDispatcher
+from src.context import Priority, send_priority
+from src.rolestats import reconfigure_stats
 from src.gamestate import GameState, PregameState
 
 NIGHT_IDLE_EXEMPT = UserSet()
-TIMERS: dict[str, tuple[threading.Timer, float | int, int]] = {}
 
 DAY_ID: float | int = 0
 DAY_TIMEDELTA: timedelta = timedelta(0)
@@ -36,6 +36,9 @@ ENDGAME_COMMAND: Optional[Callable] = None
 ADMIN_STOPPED = UserList() # this shouldn't hold more than one user at any point, but we need to keep track of it
 
 ORIGINAL_ACCOUNTS: UserDict[User, str] = UserDict()
+scope.register(NIGHT_IDLE_EXEMPT, ADMIN_STOPPED, ORIGINAL_ACCOUNTS)
+scope.register_globals(__name__, "DAY_ID", "DAY_TIMEDELTA", "DAY_START_TIME", "NIGHT_ID", "NIGHT_TIMEDELTA",
+                                 "NIGHT_START_TIME", "ENDGAME_COMMAND")
 
 @handle_error
 def hurry_up(var: GameState, game_id: int, change: bool, *, admin_forced: bool = False):
@@ -74,7 +77,7 @@ def begin_day(var: GameState):
     # Reset nighttime variables
     var.end_phase_transition()
     msg = messages["villagers_lynch"].format(len(get_players(var)) // 2 + 1)
-    channels.Main.send(msg)
+    channels.Main.send(msg, priority=Priority.CRITICAL)
 
     global DAY_ID
     DAY_ID = time.time()
@@ -87,10 +90,8 @@ def begin_day(var: GameState):
         if value is not None:
             for s in ("warn", "limit"):
                 if getattr(var, value.format(s)):
-                    timer = threading.Timer(getattr(var, value.format(s)), hurry_up, (var, DAY_ID, (s == "limit")))
-                    timer.daemon = True
-                    timer.start()
-                    TIMERS[f"day_{s}"] = (timer, DAY_ID, getattr(var, value.format(s)))
+                    timers.Main.add(getattr(var, value.format(s)), hurry_up, var, DAY_ID, (s == "limit"),
+                                    name=f"day_{s}", game_id=var.game_id)
 
     if not config.Main.get("gameplay.nightchat"):
         modes = []
@@ -126,7 +127,7 @@ def night_warn(var: GameState, gameid: int):
         idle_event = Event("night_idled", {})
         if idle_event.dispatch(var, player):
             player.queue_message(messages["night_idle_notice"])
-    users.User.send_messages()
+    users.User.send_messages(priority=Priority.BACKGROUND)
 
 @handle_error
 def night_timeout(var: GameState, gameid: int):
@@ -319,21 +320,12 @@ def transition_day(var: GameState, game_id: int = 0):
     for msg in message.values():
         to_send.extend(msg)
 
-    channels.Main.send(*to_send, sep="\n")
+    channels.Main.send(*to_send, sep="\n", priority=Priority.CRITICAL)
 
     # chilling howl message was played, give roles the opportunity to update !stats
     # to account for this
-    event = Event("reconfigure_stats", {"new": []})
     for i in range(revt2.data["howl"]):
-        newstats = set()
-        for rs in var.get_role_stats():
-            d = Counter(dict(rs))
-            event.data["new"] = [d]
-            event.dispatch(var, d, "howl")
-            for new_set in event.data["new"]: # type: Counter[str]
-                if min(new_set.values()) >= 0:
-                    newstats.add(frozenset(new_set.items()))
-        var.set_role_stats(newstats)
+        var.set_role_stats(reconfigure_stats(var, var.role_stats, "howl"))
 
     killer_role = {}
     for deadperson in dead:
@@ -383,9 +375,7 @@ def transition_night(var: GameState):
                 modes.append(("-v", player))
         channels.Main.mode(*modes)
 
-    for x, tmr in TIMERS.items(): # cancel daytime timer
-        tmr[0].cancel()
-    TIMERS.clear()
+    timers.Main.cancel("day_warn", "day_limit")
 
     dmsg = []
 
@@ -405,17 +395,15 @@ def transition_night(var: GameState):
         if value is not None:
             for s, fn in (("warn", night_warn), ("limit", night_timeout)):
                 if getattr(var, value.format(s)):
-                    timer = threading.Timer(getattr(var, value.format(s)), fn, (var, NIGHT_ID))
-                    timer.daemon = True
-                    timer.start()
-                    TIMERS[f"night_{s}"] = (timer, NIGHT_ID, getattr(var, value.format(s)))
+                    timers.Main.add(getattr(var, value.format(s)), fn, var, NIGHT_ID, name=f"night_{s}", game_id=var.game_id)
 
     # game ended from bitten / amnesiac turning, narcolepsy totem expiring, or other weirdness
     if chk_win(var):
         return
 
     event_role = Event("send_role", {})
-    event_role.dispatch(var)
+    with send_priority(Priority.CRITICAL):
+        event_role.dispatch(var)
 
     event_end = Event("transition_night_end", {})
     event_end.dispatch(var)
@@ -424,7 +412,7 @@ def transition_night(var: GameState):
 
     if var.night_count:
         dmsg.append(messages["first_night_begin"])
-    channels.Main.send(*dmsg, sep=" ")
+    channels.Main.send(*dmsg, sep=" ", priority=Priority.CRITICAL)
 
     # it's now officially nighttime
     var.end_phase_transition()
@@ -455,10 +443,7 @@ def chk_nightdone(var: GameState):
     nightroles = [p for p in event.data["nightroles"] if not is_silent(var, p)]
 
     if var.current_phase == "night" and actedcount >= len(nightroles):
-        for x, t in TIMERS.items():
-            t[0].cancel()
-
-        TIMERS.clear()
+        timers.Main.cancel("night_warn", "night_limit")
         if var.current_phase == "night":  # Double check
             event.data["transition_day"](var)
 
@@ -532,7 +517,12 @@ def stop_game(var: Optional[GameState | PregameState], winner="", abort=False, a
         channels.Main.send(*roles_msg)
 
         # map player: all roles of that player (for below)
-        allroles = {player: frozenset({role for role, players in rolemap.items() if player in players}) for player in mainroles}
+        player_roles: dict[User, set[str]] = {player: set() for player in mainroles}
+        for role, players in rolemap.items():
+            for player in players:
+                if player in player_roles:
+                    player_roles[player].add(role)
+        allroles = {player: frozenset(roles) for player, roles in player_roles.items()}
 
         # "" indicates everyone died or abnormal game stop
         winners = set()
@@ -734,9 +724,7 @@ def reset(var: Optional[GameState | PregameState]):
     # Reset game timers
     if var is not None:
         with locks.join_timer: # make sure it isn't being used by the ping join handler
-            for timers in TIMERS.values():
-                timers[0].cancel()
-            TIMERS.clear()
+            timers.Main.cancel_game(var.game_id)
 
         # Reset modes
         cmodes = []
@@ -3,7 +3,7 @@ from __future__ import annotations
 import fnmatch
 import time
 import re
-from typing import Callable, Optional, Iterable, TYPE_CHECKING
+from typing import Callable, Generic, Iterator, NamedTuple, Optional, Iterable, TypeVar, TYPE_CHECKING
 
 from src.context import IRCContext, Features, NotLoggedIn, lower
 from src import config, db
@@ -17,14 +17,23 @@ if TYPE_CHECKING:
     from src.channels import Channel
 
 __all__ = ["Bot", "predicate", "get", "add", "users", "disconnected", "complete_match",
-           "parse_rawnick", "parse_rawnick_as_dict", "User", "FakeUser", "BotUser"]
+           "parse_rawnick", "parse_rawnick_as_dict", "User", "FakeUser", "BotUser", "LoweredIdentity"]
 
 Bot: BotUser = None # type: ignore[assignment]
 
+T = TypeVar("T")
+
 _users: CheckedSet[User] = CheckedSet("users._users")
 _ghosts: CheckedSet[User] = CheckedSet("users._ghosts")
 _pending_account_updates: CheckedDict[User, CheckedDict[str, Callable]] = CheckedDict("users._pending_account_updates")
 
+# Casemapped indexes over _users, kept in sync by _register() and _unregister().
+# These narrow down lookups to a handful of candidates instead of scanning every known user.
+_nick_index: dict[str, set[User]] = {}
+_mask_index: dict[tuple[str, Optional[str], Optional[str]], set[User]] = {}
+_account_index: dict[str, set[User]] = {}
+_index_casemapping: Optional[str] = None
+
 _arg_msg = "(user={0:for_tb}, allow_bot={1})"
 
 # This is used to tell if this is a fake nick or not. If this function
@@ -68,7 +77,7 @@ def get(nick=None, ident=None, host=None, account=None, *, allow_multiple=False,
         return [temp] if allow_multiple else temp
 
     potential = []
-    users = set(_users)
+    users = _candidates(nick, ident, host, account)
     if not allow_ghosts:
         users.difference_update(_ghosts)
     if allow_bot:
@@ -80,7 +89,7 @@ def get(nick=None, ident=None, host=None, account=None, *, allow_multiple=False,
     for user in users:
         if update and have_raw_nick:
             # check for variations in case; this is the *only* time when users.get() can be case-insensitive
-            if user.lower().partial_match(temp.lower()):
+            if user.lowered.partial_match(temp.lowered):
                 user.rawnick = raw_nick
                 return [user] if allow_multiple else user
         elif user.partial_match(temp):
@@ -125,7 +134,7 @@ def add(cli, *, nick, ident=None, host=None, account=NotLoggedIn):
         except ValueError:
             pass
         else:
-            _users.add(new)
+            _register(new)
 
     return new
 
@@ -149,14 +158,20 @@ def complete_match(pattern: str, scope: Optional[Iterable[User]] = None):
     :returns: A Match object describing whether or not the match succeeded.
     :rtype: Match[User]
     """
-    if scope is None:
-        scope = _users
     matches: list[User] = []
     nick_search, _, acct_search = lower(pattern).partition(":")
     if not nick_search and not acct_search:
         return Match([])
 
     direct_match = False
+    if scope is None:
+        scope = _users
+        if nick_search:
+            _check_index()
+            if _nick_index.get(nick_search):
+                # an exact nick match always wins over prefix matches, so we needn't look at anyone else
+                scope = _nick_index[nick_search]
+
     for user in scope:
         nick = lower(user.nick)
         stripped_nick = nick.lstrip("[{\\^_`|}]")
@@ -202,6 +217,67 @@ def parse_rawnick_as_dict(rawnick, *, default=None):
 
     return _raw_nick_pattern.search(rawnick).groupdict(default)
 
+def _index_keys(user: User):
+    nick = lower(user.nick)
+    mask = (nick, lower(user.ident), lower(user.host, casemapping="ascii"))
+    return nick, mask, lower(user.account)
+
+def _index_add(user: User):
+    nick, mask, account = _index_keys(user)
+    _nick_index.setdefault(nick, set()).add(user)
+    _mask_index.setdefault(mask, set()).add(user)
+    if account:
+        _account_index.setdefault(account, set()).add(user)
+
+def _index_discard(user: User):
+    for index, key in zip((_nick_index, _mask_index, _account_index), _index_keys(user)):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.discard(user)
+            if not bucket:
+                del index[key]
+
+def _check_index():
+    """Rebuild the indexes if the casemapping changed since they were built."""
+    global _index_casemapping
+    if _index_casemapping != Features.CASEMAPPING:
+        _index_casemapping = Features.CASEMAPPING
+        _nick_index.clear()
+        _mask_index.clear()
+        _account_index.clear()
+        for user in _users:
+            _index_add(user)
+
+def _register(user: User):
+    """Add a user to the registry and its indexes."""
+    _check_index()
+    if user not in _users:
+        _users.add(user)
+        _index_add(user)
+
+def _unregister(user: User):
+    """Remove a user from the registry and its indexes."""
+    _check_index()
+    if user in _users:
+        _users.discard(user)
+        _index_discard(user)
+
+def _candidates(nick=None, ident=None, host=None, account=None) -> set[User]:
+    """Return a new set containing every registered user that may partially match the given properties.
+
+    The returned set may contain users which do not match; callers must still check each candidate.
+    """
+    _check_index()
+    if nick is not None:
+        if ident is not None and host is not None:
+            bucket = _mask_index.get((lower(nick), lower(ident), lower(host, casemapping="ascii")), ())
+            # fake users have no ident or host, so a full mask can partially match them as well
+            return set(bucket).union(u for u in _nick_index.get(lower(nick), ()) if u.is_fake)
+        return set(_nick_index.get(lower(nick), ()))
+    if account:
+        return set(_account_index.get(lower(account), ()))
+    return set(_users)
+
 def _cleanup_user(evt, var: GameState, user: User):
     """Removes a user from our global tracking set once it has left all channels."""
     # if user is in-game, keep them around so that other players can act on them
@@ -213,13 +289,13 @@ def _cleanup_user(evt, var: GameState, user: User):
         user.disconnected = True
     else:
         user.disconnected = False
-        _users.discard(user)
+        _unregister(user)
 
 def _reset(evt, var):
     """Cleans up users that left during game during game end."""
     for user in _ghosts:
         if not user.channels:
-            _users.discard(user)
+            _unregister(user)
     _ghosts.clear()
 
 def _update_account(evt, user):
@@ -238,6 +314,50 @@ EventListener(_cleanup_user).install("cleanup_user")
 EventListener(_reset).install("reset")
 EventListener(_update_account).install("who_end")
 
+class _References(Generic[T]):
+    """Containers that a user belongs to, keyed by identity (containers compare by identity and aren't hashable)."""
+
+    __slots__ = ("_refs",)
+
+    def __init__(self):
+        self._refs: dict[int, T] = {}
+
+    def __contains__(self, container) -> bool:
+        return id(container) in self._refs
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._refs.values())
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def add(self, container: T):
+        self._refs[id(container)] = container
+
+    def discard(self, container: T):
+        self._refs.pop(id(container), None)
+
+    def remove(self, container: T):
+        del self._refs[id(container)]
+
+class LoweredIdentity(NamedTuple):
+    """Casemapped identity of a user, as returned by User.lowered."""
+    nick: Optional[str]
+    ident: Optional[str]
+    host: Optional[str]
+    account: Optional[str]
+
+    def partial_match(self, other: LoweredIdentity) -> bool:
+        """Test if our non-None fields match the non-None fields of the other identity, like User.partial_match."""
+        done = False
+        for ours, theirs in zip(self, other):
+            if ours is None or theirs is None:
+                continue
+            if ours != theirs:
+                return False
+            done = True
+        return done
+
 class User(IRCContext):
 
     is_user = True
@@ -250,10 +370,12 @@ class User(IRCContext):
     timestamp: float
     account_timestamp: float
 
-    sets: list[UserSet]
-    lists: list[UserList]
-    dict_keys: list[UserDict]
-    dict_values: list[UserDict]
+    sets: _References[UserSet]
+    lists: _References[UserList]
+    dict_keys: _References[UserDict]
+    dict_values: _References[UserDict]
+    # (casemapping, identity) tuple, see the lowered property
+    _lowered: Optional[tuple[str, LoweredIdentity]]
 
     def __init__(self, cli, nick, ident, host, account):
         """Make linters happy."""
@@ -270,10 +392,11 @@ class User(IRCContext):
         self._account = account
         self.channels = CheckedDict("users.User.channels")
         self.timestamp = time.time()
-        self.sets = []
-        self.lists = []
-        self.dict_keys = []
-        self.dict_values = []
+        self.sets = _References()
+        self.lists = _References()
+        self.dict_keys = _References()
+        self.dict_values = _References()
+        self._lowered = None
         self.account_timestamp = time.time()
 
         if Bot is not None and nick is not None and Bot.nick.rstrip("_") == nick.rstrip("_") and None in {Bot.ident, Bot.host}:
@@ -286,6 +409,7 @@ class User(IRCContext):
             if host is not None:
                 self._host = host
             self._account = account
+            self._lowered = None
             self.timestamp = time.time()
             self.account_timestamp = time.time()
 
@@ -300,7 +424,7 @@ class User(IRCContext):
             self = Bot
 
         elif nick is not None and ident is not None and host is not None and account is not None:
-            users = set(_users)
+            users = _candidates(nick, ident, host)
             users.add(Bot)
             if self in users:
                 for user in users:
@@ -342,7 +466,7 @@ class User(IRCContext):
             # and instead opt for the sake of clarity that this separation provides.
 
             potential = None
-            users = set(_users)
+            users = _candidates(nick, ident, host, account)
             if Bot is not None:
                 users.add(Bot)
             for user in users:
@@ -423,23 +547,25 @@ class User(IRCContext):
             return # as far as the caller is aware, we've swapped
 
         _ghosts.discard(self)
+        self._lowered = None
         if not self.channels or same_user:
-            _users.discard(self) # Goodbye, my old friend
+            _unregister(self) # Goodbye, my old friend
 
-        for lst in self.lists[:]:
-            while self in lst:
-                lst[lst.index(self)] = new
+        for lst in list(self.lists):
+            for i, item in enumerate(lst):
+                if item is self:
+                    lst[i] = new
 
-        for s in self.sets[:]:
+        for s in list(self.sets):
             s.remove(self)
             s.add(new)
 
-        for dk in self.dict_keys[:]:
+        for dk in list(self.dict_keys):
             dk[new] = dk.pop(self)
 
-        for dv in self.dict_values[:]:
-            for key in dv:
-                if dv[key] is self:
+        for dv in list(self.dict_values):
+            for key, value in dv.items():
+                if value is self:
                     dv[key] = new
 
         if same_user:
@@ -454,7 +580,7 @@ class User(IRCContext):
                         channel.modes[mode].add(self)
 
             if not isinstance(new, BotUser):
-                _users.add(new)
+                _register(new)
 
             if self is Bot:
                 assert isinstance(new, BotUser)
@@ -464,8 +590,25 @@ class User(IRCContext):
         # So if any list is non-empty, something went terribly wrong
         assert not self.lists and not self.sets and not self.dict_keys and not self.dict_values
 
+    @property
+    def lowered(self) -> LoweredIdentity:
+        """The user's nick, ident, host and account, casemapped for comparisons and lookups.
+
+        Unlike lower(), this doesn't create (or look up) another User, and is cached until
+        the user is swapped out or the server's casemapping changes.
+        """
+        casemapping = Features.CASEMAPPING
+        cached = self._lowered
+        if cached is None or cached[0] != casemapping:
+            identity = LoweredIdentity(lower(self.nick, casemapping=casemapping),
+                                       lower(self.ident, casemapping=casemapping),
+                                       lower(self.host, casemapping="ascii"),
+                                       lower(self.account, casemapping=casemapping))
+            cached = self._lowered = (casemapping, identity)
+        return cached[1]
+
     def lower(self):
-        temp = type(self)(self.client, lower(self.nick), lower(self.ident), lower(self.host, casemapping="ascii"), lower(self.account))
+        temp = type(self)(self.client, *self.lowered)
         if temp is not self: # If everything is already lowercase, we'll get back the same instance
             temp.channels = self.channels
             temp.ref = self.ref or self
@@ -476,7 +619,7 @@ class User(IRCContext):
             return False
 
         # FIXME: needs to be transport aware
-        acls = config.Main.get("access.entries")
+        acls = config.Main.view("access.entries")
         accounts = set(e["account"] for e in acls if e["template"] == "owner")
 
         if self.account and self.account in accounts:
@@ -493,7 +636,7 @@ class User(IRCContext):
         if "F" not in flags:
             try:
                 # FIXME: needs to be transport aware
-                acls = config.Main.get("access.entries")
+                acls = config.Main.view("access.entries")
                 accounts = set(e["account"] for e in acls if e["template"] in ("admin", "owner"))
                 if self.account and self.account in accounts:
                     return True
@@ -516,20 +659,20 @@ class User(IRCContext):
     def match_hostmask(self, hostmask):
         """Match n!u@h, u@h, or just h by itself."""
         nick, ident, host = re.match("(?:(?:(.*?)!)?(.*?)@)?(.*)", hostmask).groups("")
-        temp = self.lower()
+        temp = self.lowered
 
         return ((not nick or fnmatch.fnmatch(temp.nick, lower(nick))) and
                 (not ident or fnmatch.fnmatch(temp.ident, lower(ident))) and
                 fnmatch.fnmatch(temp.host, lower(host, casemapping="ascii")))
 
     def prefers_notice(self):
-        return self.lower().account in db.PREFER_NOTICE
+        return self.lowered.account in db.PREFER_NOTICE
 
     def get_pingif_count(self):
-        return db.PING_IF_PREFS.get(self.lower().account, 0)
+        return db.PING_IF_PREFS.get(self.lowered.account, 0)
 
     def set_pingif_count(self, value, old=None):
-        temp = self.lower()
+        temp = self.lowered
 
         if not value:
             if temp.account in db.PING_IF_PREFS:
@@ -550,11 +693,11 @@ class User(IRCContext):
                         db.PING_IF_NUMS[old].discard(temp.account)
 
     def wants_deadchat(self):
-        return self.lower().account not in db.DEADCHAT_PREFS
+        return self.lowered.account not in db.DEADCHAT_PREFS
 
     def stasis_count(self):
         """Return the number of games the user is in stasis for."""
-        return db.STASISED.get(self.lower().account, 0)
+        return db.STASISED.get(self.lowered.account, 0)
 
     def update_account_data(self, command: str, callback: Callable):
         """Refresh stale account data on networks that don't support certain features.
@@ -664,16 +807,15 @@ class User(IRCContext):
             _ghosts.discard(self)
             # ensure dangling users aren't left around in our tracking var
             if not self.channels:
-                _users.discard(self)
+                _unregister(self)
 
     @property
     def game_state(self):
-        # There's only ever one game for now, but if/when the bot supports
-        # running multiple games simultaneously, we can use this to fetch
-        # which game the user is currently playing in (assuming that a
-        # user can only belong to one game at a time)
-        from src import channels
-        return channels.Main.game_state
+        # A user can only play in one game at a time; fetch the game of the
+        # channel they joined it in, or the active channel's if they aren't playing
+        from src import channels, scope
+        channel = scope.channel_of(self)
+        return (channel or channels.Main).game_state
 
 class FakeUser(User):
 
@@ -12,7 +12,7 @@ from src.messages import messages
 from src.status import (try_absent, get_absent, get_forced_votes, get_all_forced_votes, get_forced_abstains,
                         get_vote_weight, try_lynch_immunity, add_dying, kill_players)
 from src.events import Event, event_listener
-from src import channels, pregame, reaper, locks, config
+from src import channels, pregame, reaper, locks, config, scope
 from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
@@ -23,6 +23,8 @@ ABSTAINS: UserSet = UserSet()
 ABSTAINED = False
 LAST_VOTES = None
 LYNCHED: int = 0
+scope.register(VOTES, GAMEMODE_VOTES, ABSTAINS)
+scope.register_globals(__name__, "ABSTAINED", "LAST_VOTES", "LYNCHED")
 
 @command("lynch", playing=True, pm=True, phases=("day",))
 def lynch(wrapper: MessageDispatcher, message: str):
@@ -306,7 +308,8 @@ def chk_decision(var: GameState, *, timeout=False, admin_forced=False):
         elif timeout:
             channels.Main.send(messages["sunset"])
 
-        if chk_win(var):
+        # the game may also have been ended by a lynch (such as the fool's), in which case var is torn down
+        if not var.in_game or chk_win(var):
             return # game ended, just exit out
 
         if timeout or LYNCHED >= num_lynches:
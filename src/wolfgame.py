@@ -35,7 +35,6 @@ import urllib.request
 import urllib.error
 
 from collections import Counter
-from datetime import datetime
 from typing import Optional
 
 import src
@@ -218,6 +217,9 @@ def forced_exit(wrapper: MessageDispatcher, message: str):
             wrapper.pm(messages["stop_bot_ingame_safeguard"].format(what="stop", cmd="fdie"))
             return
 
+    # make sure the results of the last game are written before we exit
+    db.flush()
+
     msg = "{0} quit from {1}"
 
     if message.strip():
@@ -228,6 +230,7 @@ def forced_exit(wrapper: MessageDispatcher, message: str):
 
 def _restart_program(mode=None):
     logging.getLogger("general").info("RESTARTING")
+    db.flush()
 
     python = sys.executable
 
@@ -319,7 +322,7 @@ def mark_prefer_notice(wrapper: MessageDispatcher, message: str):
         # and not an intentional invocation of this command
         return
 
-    temp = wrapper.source.lower()
+    temp = wrapper.source.lowered
 
     account = temp.account
 
@@ -427,17 +430,10 @@ def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str],
         possible = {evt.params.main_role}
     else:
         possible = set(event.data["possible"])
-    newstats = set()
     # For every possible role this person is, try to deduct 1 from that role's count in our stat sets
     # if a stat set doesn't contain the role, then that would lead to an impossible condition and therefore
-    # that set is not added to newstats to indicate that set is no longer possible
-    for p in possible:
-        for rs in var.get_role_stats():
-            d = Counter(dict(rs))
-            if p in d and d[p] >= 1:
-                d[p] -= 1
-                newstats.add(frozenset(d.items()))
-    var.set_role_stats(newstats)
+    # that set is no longer possible
+    var.set_role_stats(var.role_stats.remove_one(possible))
 
 # FIXME: get rid of the priority once we move state transitions into the main event loop instead of having it here
 @event_listener("kill_players", priority=10)
@@ -459,7 +455,7 @@ def on_kill_players(evt: Event, var: GameState, players: set[User]):
                 for mode in channels.Main.old_modes[player]:
                     cmode.append(("+" + mode, player.nick))
                 del channels.Main.old_modes[player]
-            lplayer = player.lower()
+            lplayer = player.lowered
             if lplayer.account not in db.DEADCHAT_PREFS:
                 deadchat.append(player)
 
@@ -603,7 +599,7 @@ def leave(var: Optional[GameState | PregameState], what: str, user: User, why=No
         add_dying(var, user, "bot", what, death_triggers=False)
         kill_players(var)
     else:
-        reaper.DISCONNECTED[user] = (datetime.now(), what)
+        reaper.mark_disconnected(var, user, what)
 
 @hook("error")
 def on_error(cli, pfx, msg: str):
@@ -0,0 +1,37 @@
+from unittest import TestCase
+import src # ensure role categories are frozen
+from src.cats import All, Wolf, Killer, Village, Wolfteam, Category
+
+class TestCategoryAlgebra(TestCase):
+    def test_operators(self):
+        wolves, killers = set(Wolf), set(Killer)
+        self.assertEqual(set(Wolf & Killer), wolves & killers)
+        self.assertEqual(set(Wolf | Killer), wolves | killers)
+        self.assertEqual(set(Wolf + Killer), wolves | killers)
+        self.assertEqual(set(Wolf ^ Killer), wolves ^ killers)
+        self.assertEqual(set(Wolf - Killer), wolves - killers)
+        self.assertEqual(set(~Wolf), set(All) - wolves)
+        self.assertEqual(set({"wolf", "seer"} - Wolf), {"seer"})
+        self.assertEqual(set(Wolf - {"wolf"}), wolves - {"wolf"})
+        self.assertEqual(set(Wolf & frozenset({"wolf", "seer"})), {"wolf"})
+
+    def test_names(self):
+        self.assertEqual(str(Wolf & Killer), "Wolf & Killer")
+        self.assertEqual(str(~Wolf), "~Wolf")
+        self.assertEqual(str(~(Wolf & Killer)), "~(Wolf & Killer)")
+
+    def test_interned(self):
+        self.assertIs(Wolf & Killer, Wolf & Killer)
+        self.assertIs(~Village, ~Village)
+        self.assertIs(Wolfteam - {"traitor"}, Wolfteam - {"traitor"})
+        # equal but differently named categories are distinct instances
+        self.assertEqual(Wolf & Killer, Killer & Wolf)
+        self.assertEqual(str(Killer & Wolf), "Killer & Wolf")
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Wolf | {"not a role"}
+        with self.assertRaises(ValueError): # failures must not be cached
+            Wolf | {"not a role"}
+        self.assertIsInstance(Wolf & set(), Category)
+        self.assertEqual(len(Wolf & set()), 0)
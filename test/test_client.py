@@ -0,0 +1,82 @@
+import threading
+import time
+from unittest import TestCase
+from bench.ircd import FakeIRCd, run_client
+from oyoyo.client import IRCClient, TokenBucket
+from oyoyo.scheduler import Priority
+
+REGISTRATION = [b"CAP LS 302", b"NICK bot", b"USER bot 0 * :bot"]
+
+class TestIRCClient(TestCase):
+    def setUp(self):
+        self.ircd = FakeIRCd()
+        self.ircd.start()
+        self.addCleanup(self.ircd.stop)
+        self.received = []
+        self.done = threading.Event()
+
+    def connect(self, tokenbucket=None, expected=None, coalesce=True):
+        def on_privmsg(cli, prefix, target, message):
+            self.received.append((prefix, target, message))
+            if len(self.received) == expected:
+                self.done.set()
+
+        cli = IRCClient({"privmsg": on_privmsg, "": lambda *args: None},
+                        host="127.0.0.1", port=self.ircd.port, nickname="bot", ident="bot",
+                        stream_handler=lambda output, level=None: None,
+                        tokenbucket=tokenbucket or TokenBucket(1000, 0.001), coalesce=coalesce)
+        thread = run_client(cli)
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.ircd.disconnect)
+        self.ircd.wait_for_client()
+        self.assertEqual(self.ircd.wait_for_lines(3), REGISTRATION)
+        return cli
+
+    def drain(self, cli):
+        cli.tokenbucket._tokens = 0
+        cli.tokenbucket.timestamp = time.time()
+
+    def test_line_framing(self):
+        self.connect(expected=3)
+        lines = [b":a!a@a PRIVMSG #chan :first", b"", b":b!b@b PRIVMSG #chan :second line", b":c!c@c PRIVMSG bot :\xe9"]
+        self.ircd.push(*lines, chunk=7)
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.received, [("a!a@a", "#chan", "first"),
+                                         ("b!b@b", "#chan", "second line"),
+                                         ("c!c@c", "bot", "\xe9")])
+
+    def test_send_threadsafe(self):
+        cli = self.connect(coalesce=False)
+        threads = [threading.Thread(target=lambda n=n: [cli.msg("#chan", "{0} {1}".format(n, i)) for i in range(50)])
+                   for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        lines = self.ircd.wait_for_lines(3 + 200)[3:]
+        for n in range(4):
+            sent = [line for line in lines if line.startswith("PRIVMSG #chan :{0} ".format(n).encode())]
+            self.assertEqual(sent, ["PRIVMSG #chan :{0} {1}".format(n, i).encode() for i in range(50)])
+
+    def test_priority(self):
+        # empty the bucket, so that everything below is queued before the first line can be sent
+        cli = self.connect(tokenbucket=TokenBucket(10, 0.01))
+        self.drain(cli)
+        cli.send("PRIVMSG #wolves :later", priority=Priority.RELAY)
+        cli.send("PRIVMSG #chan :first")
+        cli.send("PRIVMSG #chan :second")
+        cli.send("PONG :server", priority=Priority.CRITICAL)
+        lines = self.ircd.wait_for_lines(6)[3:]
+        self.assertEqual(lines, [b"PONG :server", b"PRIVMSG #chan :first | second", b"PRIVMSG #wolves :later"])
+
+    def test_flood_control(self):
+        cli = self.connect(tokenbucket=TokenBucket(3, 0.05), coalesce=False)
+        self.drain(cli)
+        start = time.perf_counter()
+        for i in range(5):
+            cli.send("PRIVMSG #chan :{0}".format(i))
+        # sending must not wait for the token bucket
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.ircd.wait_for_lines(8)
+        # each line has to wait for a token to be refilled
+        self.assertGreaterEqual(self.ircd.received_at[-1] - start, 0.2)
@@ -0,0 +1,79 @@
+import tempfile
+import threading
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+from src.config import Config
+
+class TestConfigAccess(TestCase):
+    def setUp(self):
+        self.config = Config()
+        self.config.load_metadata(Path(__file__).parent.parent / "src" / "defaultsettings.yml")
+
+    def test_get_copies(self):
+        value = self.config.get("gameplay.disable.commands")
+        value.append("foo")
+        self.assertNotIn("foo", self.config.get("gameplay.disable.commands"))
+
+    def test_get_default(self):
+        self.assertEqual(self.config.get("no.such.key", "default"), "default")
+        self.assertRaises(KeyError, self.config.get, "no.such.key")
+
+    def test_set_invalidates(self):
+        self.assertEqual(self.config.get("gameplay.language"), "en")
+        self.assertEqual(self.config.view("gameplay.language"), "en")
+        self.config.set("gameplay.language", "fr")
+        self.assertEqual(self.config.get("gameplay.language"), "fr")
+        self.assertEqual(self.config.view("gameplay.language"), "fr")
+
+    def test_set_parent_invalidates(self):
+        self.assertEqual(self.config.get("debug.messages.nothrow"), False)
+        self.config.set("debug.messages", {"nothrow": True})
+        self.assertEqual(self.config.get("debug.messages.nothrow"), True)
+
+    def test_view_read_only(self):
+        view = self.config.view("debug")
+        with self.assertRaises(TypeError):
+            view["enabled"] = True
+        self.assertIsInstance(view["containers"]["names"], tuple)
+        self.assertIs(self.config.view("debug"), view)
+
+    def test_reload_invalidates(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            file = Path(tempdir) / "botconfig.yml"
+            file.write_text("gameplay:\n  language: en\n")
+            self.config.load_config(file)
+            self.assertEqual(self.config.get("gameplay.language"), "en")
+            file.write_text("gameplay:\n  language: fr\n")
+            self.config.reload()
+            self.assertEqual(self.config.get("gameplay.language"), "fr")
+
+    def test_concurrent_set(self):
+        # a set() while a key is being looked up must not leave the old value cached
+        walk_key = self.config._walk_key
+        pending = [("gameplay.language", "fr")]
+        def set_during_walk(key):
+            result = walk_key(key)
+            if pending:
+                self.config.set(*pending.pop())
+            return result
+        with patch.object(self.config, "_walk_key", side_effect=set_during_walk):
+            self.config.view("gameplay")
+        self.assertEqual(self.config.view("gameplay")["language"], "fr")
+        self.assertEqual(self.config.get("gameplay.language"), "fr")
+
+    def test_concurrent_set_while_storing(self):
+        # a set() racing with storing a lookup in the cache must not leave the old value cached
+        config = self.config
+        threads = []
+        class RacingDict(dict):
+            def __setitem__(self, key, value):
+                if not threads:
+                    threads.append(threading.Thread(target=config.set, args=("gameplay.language", "fr")))
+                    threads[0].start()
+                    threads[0].join(0.2)
+                super().__setitem__(key, value)
+        config._views = RacingDict()
+        self.assertEqual(config.view("gameplay")["language"], "en")
+        threads[0].join()
+        self.assertEqual(config.view("gameplay")["language"], "fr")
@@ -0,0 +1,190 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+from src import db
+from src.messages import messages
+
+def game(accounts, winner="wolves", mode="default", roles=("wolf", "gunner"), team_win=True):
+    players = [{"version": 3, "account": acc, "main_role": roles[0], "all_roles": list(roles), "special": ["lover"],
+                "team_win": team_win, "individual_win": False, "dced": False} for acc in accounts]
+    return mode, len(players), "2024-01-01 00:00:00", "2024-01-01 00:10:00", winner, players, {}
+
+class DatabaseTestCase(TestCase):
+    def setUp(self):
+        # use a fresh database for every test
+        self.cwd = os.getcwd()
+        self.tempdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tempdir.name)
+        self.ts = db._ts
+        db._ts = threading.local()
+        db._invalidate_ids()
+        db._init()
+
+    def tearDown(self):
+        db._ts = self.ts
+        db._invalidate_ids()
+        os.chdir(self.cwd)
+        self.tempdir.cleanup()
+
+    def query(self, sql, params=()):
+        c = db._conn().cursor()
+        c.execute(sql, params)
+        return c.fetchall()
+
+class TestWriter(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.writer = db._Writer()
+        patcher = patch.object(db, "_writer", self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_add_game(self):
+        db.add_game(*game(["alice", "bob"]))
+        db.add_game(*game(["bob", "carol", "dave"], "villagers"))
+        self.writer.flush()
+        self.assertEqual(self.query("SELECT winner, gamesize FROM game ORDER BY id"), [("wolves", 2), ("villagers", 3)])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM player"), [(4,)])
+        rows = self.query("""SELECT pl.account_display, gpr.role, gpr.special
+                             FROM game_player_role gpr
+                             JOIN game_player gp ON gp.id = gpr.game_player
+                             JOIN player pl ON pl.id = gp.player
+                             WHERE gp.game = 2 AND pl.account_display = 'carol'
+                             ORDER BY gpr.role""")
+        self.assertEqual(rows, [("carol", "gunner", 0), ("carol", "lover", 1), ("carol", "wolf", 0)])
+
+    def test_failed_write(self):
+        def bad_write(c):
+            c.execute("INSERT INTO no_such_table VALUES (1)")
+
+        db.add_game(*game(["alice"]))
+        self.writer.submit(bad_write)
+        db.add_game(*game(["bob"]))
+        self.writer.flush()
+        # the bad write is reported, but doesn't lose the writes batched with it
+        self.assertEqual(self.query("SELECT COUNT(*) FROM game"), [(2,)])
+
+    def test_ids_resolved_by_caller(self):
+        # renaming an account reloads the access tables, which must not happen on the writer thread
+        db._get_ids("alice", add=True)
+        threads = []
+        with patch.object(db, "init_vars", side_effect=lambda: threads.append(threading.current_thread())):
+            db.add_game(*game(["Alice", "bob"]))
+            db.flush()
+        self.assertTrue(threads)
+        self.assertEqual(set(threads), {threading.current_thread()})
+        self.assertEqual(self.query("SELECT account_display FROM player ORDER BY id"), [("Alice",), ("bob",)])
+
+class TestIdCache(DatabaseTestCase):
+    def test_hits(self):
+        before = db._id_cache_info()
+        ids = db._get_ids("Alice", add=True)
+        self.assertEqual(db._get_ids("Alice"), ids)
+        self.assertEqual(db._get_ids("Bob"), (None, None))
+        after = db._id_cache_info()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 2)
+
+    def test_normalize_case(self):
+        ids = db._get_ids("Alice", add=True)
+        self.assertEqual(db._get_ids("ALICE"), ids)
+        self.assertEqual(self.query("SELECT account_display FROM player"), [("ALICE",)])
+        self.assertEqual(db._get_ids("ALICE"), ids)
+
+    def test_set_primary_player(self):
+        peid, plid = db._get_ids("alice", add=True)
+        db.set_primary_player("alice")
+        self.assertNotIn("alice", db._id_cache)
+        self.assertEqual(db._get_ids("alice"), (peid, plid))
+
+    def test_eviction(self):
+        with patch.object(db, "ID_CACHE_SIZE", 2):
+            for acc in ("a", "b", "c"):
+                db._get_ids(acc, add=True)
+            db._get_ids("b")
+            db._get_ids("d", add=True)
+            self.assertEqual(list(db._id_cache), ["b", "d"])
+
+class TestStatsTables(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        db.add_game(*game(["alice", "bob"]))
+        db.add_game(*game(["alice", "carol"], "villagers", roles=("seer",), team_win=False))
+        db.add_game(*game(["bob", "carol", "dave"], None, mode="foolish"))
+        db.add_game(*game(["alice", "bob"], mode="foolish"))
+        db.flush()
+
+    def test_incremental(self):
+        self.assertEqual(db.check_stats(), [])
+        self.assertEqual(self.query("SELECT gamemode, gamesize, winner, games FROM stats_game ORDER BY gamemode, winner"),
+                         [("default", 2, "villagers", 1), ("default", 2, "wolves", 1), ("foolish", 3, None, 1), ("foolish", 2, "wolves", 1)])
+        self.assertEqual(self.query("SELECT wins, games FROM stats_person WHERE person = ?", (db._get_ids("alice")[0],)), [(2, 3)])
+        self.assertEqual(db.get_role_stats("wolf", "foolish"), db.get_role_stats("wolf", "FOOLISH"))
+        self.assertEqual(db.get_role_stats("wolf"), messages["db_role_stats_global"].format(
+            role="wolf", team=7, teamp=1.0, indiv=0, indivp=0.0, overall=7, overallp=1.0, total=7))
+
+    def test_check_and_repair(self):
+        self.query("UPDATE stats_role SET games = games + 1 WHERE role = 'seer'")
+        self.query("DELETE FROM stats_person")
+        self.assertEqual(db.check_stats(), ["stats_role", "stats_person"])
+        self.assertEqual(db.check_stats(repair=True), ["stats_role", "stats_person"])
+        self.assertEqual(db.check_stats(), [])
+
+    def test_upgrade(self):
+        for table in ("stats_game", "stats_role", "stats_person_role", "stats_person"):
+            self.query("DROP TABLE {0}".format(table))
+        self.query("PRAGMA user_version = 9")
+        db._conn().commit()
+        with contextlib.redirect_stderr(io.StringIO()):
+            db._init()
+        self.assertEqual(self.query("PRAGMA user_version"), [(db.SCHEMA_VERSION,)])
+        self.assertEqual(self.query("SELECT SUM(games) FROM stats_game"), [(4,)])
+        self.assertEqual(db.check_stats(), [])
+
+class TestWarningCache(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        db.init_vars()
+
+    def test_updates(self):
+        future = datetime.utcnow() + timedelta(days=1)
+        first = db.add_warning("alice", None, 2, "reason", None, future)
+        second = db.add_warning("alice", None, 3, "reason", None, None)
+        db.add_warning("bob", None, 1, "reason", None, None)
+        self.assertEqual(db.get_warning_points("Alice"), 5)
+        self.assertEqual(db.get_unacknowledged_accounts(["alice", "bob", "carol"]), {"alice", "bob"})
+        db.acknowledge_warning(first)
+        db.acknowledge_warning(second)
+        self.assertFalse(db.has_unacknowledged_warnings("alice"))
+        db.del_warning(second, "bob")
+        self.assertEqual(db.get_warning_points("alice"), 2)
+        db.set_warning(first, datetime.utcnow() - timedelta(days=1), "reason", None)
+        self.assertEqual(db.get_warning_points("alice"), 0)
+        # the cache matches a full reload
+        cached = dict(db.WARNINGS)
+        db.init_vars()
+        self.assertEqual(dict(db.WARNINGS), cached)
+
+    def test_expiry(self):
+        db.add_warning("alice", None, 2, "reason", None, datetime.utcnow() + timedelta(seconds=1))
+        self.assertEqual(db.get_warning_points("alice"), 2)
+        with patch("time.gmtime", return_value=time.gmtime(time.time() + 5)):
+            self.assertEqual(db.get_warning_points("alice"), 0)
+            self.assertFalse(db.has_unacknowledged_warnings("alice"))
+
+    def test_expire_tempbans(self):
+        alice = db.add_warning("alice", None, 5, "reason", None, None)
+        db.add_warning("bob", None, 5, "reason", None, None)
+        self.query("INSERT INTO bantrack (player, warning_amount) VALUES (?, 4)", (db._get_ids("alice")[1],))
+        self.query("INSERT INTO bantrack (player, warning_amount) VALUES (?, 3)", (db._get_ids("bob")[1],))
+        self.query("INSERT INTO bantrack (player, expires) VALUES (?, datetime('now', '-1 minute'))", (db._get_ids("carol", add=True)[1],))
+        self.assertEqual(db.expire_tempbans(), {"carol"})
+        db.del_warning(alice, "bob")
+        self.assertEqual(db.expire_tempbans(), {"alice"})
+        self.assertEqual(self.query("SELECT COUNT(*) FROM bantrack"), [(1,)])
@@ -0,0 +1,68 @@
+from unittest import TestCase
+from src.events import Event, EventListener, find_listener, EVENT_CALLBACKS
+
+class TestEventDispatch(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.installed = []
+
+    def tearDown(self):
+        for listener, event in self.installed:
+            listener.remove(event)
+        EVENT_CALLBACKS.pop("test_event", None)
+
+    def listen(self, name, priority=5, callback=None, event="test_event"):
+        if callback is None:
+            callback = lambda evt, *args: self.calls.append(name)
+        listener = EventListener(callback, listener_id=name, priority=priority)
+        listener.install(event)
+        self.installed.append((listener, event))
+        return listener
+
+    def test_priority_order(self):
+        self.listen("c", 6)
+        self.listen("a", 1)
+        self.listen("b1", 5)
+        self.listen("b2", 5)
+        self.listen("b3", 5)
+        Event("test_event", {}).dispatch()
+        self.assertEqual(self.calls, ["a", "b1", "b2", "b3", "c"])
+
+    def test_install_during_dispatch(self):
+        def install_more(evt):
+            self.calls.append("first")
+            if len(self.calls) == 1:
+                self.listen("added", 0)
+                find_listener("test_event", "last").remove("test_event")
+
+        self.listen("first", 1, install_more)
+        self.listen("last", 9)
+        Event("test_event", {}).dispatch()
+        self.assertEqual(self.calls, ["first", "last"])
+        self.calls.clear()
+        Event("test_event", {}).dispatch()
+        self.assertEqual(self.calls, ["added", "first"])
+
+    def test_find_and_remove(self):
+        listener = self.listen("x")
+        self.assertIs(find_listener("test_event", "x"), listener)
+        with self.assertRaises(ValueError):
+            EventListener(lambda evt: None, listener_id="x").install("test_event")
+        listener.remove("test_event")
+        listener.remove("test_event") # removing twice does nothing
+        with self.assertRaises(Exception):
+            find_listener("test_event", "x")
+        self.assertTrue(Event("test_event", {}).dispatch())
+        self.assertEqual(self.calls, [])
+
+    def test_stop_processing(self):
+        def stop(evt):
+            evt.stop_processing = True
+            evt.prevent_default = True
+
+        self.listen("stop", 1, stop)
+        self.listen("after", 2)
+        self.assertFalse(Event("test_event", {}).dispatch())
+        self.assertEqual(self.calls, [])
+        self.assertTrue(Event("no_listeners_at_all", {}).dispatch())
+        self.assertNotIn("no_listeners_at_all", EVENT_CALLBACKS)
@@ -0,0 +1,156 @@
+import copy
+import random
+from unittest import TestCase
+from src.containers import UserSet, UserDict
+from src.gamestate import GameState, PregameState
+from src import users
+from src.users import FakeUser, BotUser
+from src.cats import Village, Wolf
+from src.functions import get_players, get_all_players
+from src.status.dying import DYING
+
+class TestRoleIndex(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        users.Bot = BotUser(None, "bot", "bot", "bot.user", "bot")
+
+    def setUp(self):
+        self.var = GameState(PregameState())
+        self.var.begin_setup()
+        self.players = [FakeUser.from_nick(str(i)) for i in range(12)]
+
+    def tearDown(self):
+        self.var.roles.clear()
+
+    def assertIndexed(self):
+        for player in self.players:
+            expected = {role for role, players in self.var.roles.items() if player in players}
+            self.assertEqual(self.var.get_all_roles(player), expected)
+        self.assertEqual(set(self.var.roles.players), {p for players in self.var.roles.values() for p in players})
+
+    def test_random_changes(self):
+        rng = random.Random(3)
+        roles = sorted(self.var.roles)
+        for _ in range(2000):
+            players = self.var.roles[rng.choice(roles)]
+            player = rng.choice(self.players)
+            action = rng.randrange(6)
+            if action == 0:
+                players.add(player)
+            elif action == 1:
+                players.discard(player)
+            elif action == 2 and players:
+                players.pop()
+            elif action == 3:
+                players.update(rng.sample(self.players, 3))
+            elif action == 4:
+                players.difference_update(rng.sample(self.players, 3))
+            elif rng.random() < 0.1:
+                with UserSet(rng.sample(self.players, 2)) as players:
+                    self.var.roles[rng.choice(roles)] = players
+            self.assertIndexed()
+
+    def test_swap(self):
+        old, new = self.players[0], FakeUser.from_nick("new")
+        self.var.roles["wolf"].add(old)
+        self.var.roles["cursed villager"].add(old)
+        old.swap(new)
+        self.assertEqual(self.var.get_all_roles(old), set())
+        self.assertEqual(self.var.get_all_roles(new), {"wolf", "cursed villager"})
+        self.assertIn(self.var.roles.players, new.dict_keys)
+
+    def test_copies_untracked(self):
+        player = self.players[0]
+        self.var.roles["seer"].add(player)
+        with copy.deepcopy(self.var.roles) as rolemap:
+            self.assertIs(type(rolemap), UserDict)
+            rolemap["seer"].remove(player)
+            rolemap["wolf"].add(player)
+            self.assertEqual(self.var.get_all_roles(player), {"seer"})
+        popped = self.var.roles.pop("seer")
+        self.assertIs(type(popped), UserSet)
+        self.assertEqual(self.var.get_all_roles(player), set())
+        popped.clear()
+
+    def test_set_operations_untracked(self):
+        seer, wolf = self.players[:2]
+        self.var.roles["seer"].add(seer)
+        results = [self.var.roles["seer"].union([wolf]),
+                   self.var.roles["seer"].difference([wolf]),
+                   self.var.roles["seer"].intersection([seer, wolf]),
+                   self.var.roles["seer"].symmetric_difference([wolf])]
+        self.assertEqual([set(x) for x in results], [{seer, wolf}, {seer}, {seer}, {seer, wolf}])
+        for result in results:
+            self.assertIs(type(result), UserSet)
+            result.clear()
+        self.assertEqual(self.var.get_all_roles(seer), {"seer"})
+        self.assertEqual(self.var.get_all_roles(wolf), set())
+
+    def test_popitem(self):
+        player = self.players[0]
+        self.var.roles["seer"].add(player)
+        last = list(self.var.roles)[-1]
+        role, players = self.var.roles.popitem()
+        self.assertEqual(role, last)
+        self.assertIs(type(players), UserSet)
+        self.assertNotIn(last, self.var.roles)
+        players.clear()
+        while self.var.roles:
+            self.var.roles.popitem()
+        self.assertEqual(self.var.get_all_roles(player), set())
+        self.assertRaises(KeyError, self.var.roles.popitem)
+
+    def test_clear(self):
+        self.var.roles["seer"].update(self.players)
+        self.var.roles.clear()
+        self.assertFalse(self.var.roles.players)
+        for player in self.players:
+            self.assertFalse(player.dict_keys)
+            self.assertFalse(player.sets)
+
+class TestPlayerCache(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        users.Bot = BotUser(None, "bot", "bot", "bot.user", "bot")
+
+    def setUp(self):
+        self.var = GameState(PregameState())
+        self.var.begin_setup()
+        self.players = [FakeUser.from_nick(str(i)) for i in range(6)]
+        for player, role in zip(self.players, ["wolf", "seer", "villager", "wolf", "villager", "cursed villager"]):
+            self.var.players.append(player)
+            self.var.roles[role].add(player)
+            self.var.main_roles[player] = role
+
+    def tearDown(self):
+        DYING.clear()
+        self.var.roles.clear()
+        self.var.main_roles.clear()
+        self.var.players.clear()
+
+    def test_cached(self):
+        self.assertEqual(self.var.get_players(), tuple(self.players))
+        self.assertIs(self.var.get_players({"wolf", "seer"}), self.var.get_players(frozenset({"seer", "wolf"})))
+        self.assertEqual(self.var.get_players({"wolf", "seer"}), tuple(self.players[:2] + self.players[3:4]))
+        self.assertEqual(get_players(self.var, Wolf), [self.players[0], self.players[3]])
+        self.assertEqual(self.var.get_player_set(Village), frozenset(self.players[1:3] + self.players[4:]))
+
+    def test_invalidated(self):
+        self.var.get_players()
+        self.var.get_all_players({"cursed villager"})
+        DYING[self.players[0]] = ("wolf", "night_kill", True)
+        self.assertNotIn(self.players[0], self.var.get_player_set())
+        self.var.main_roles[self.players[1]] = "wolf"
+        self.assertEqual(get_players(self.var, {"wolf"}), [self.players[1], self.players[3]])
+        self.var.roles["cursed villager"].add(self.players[2])
+        self.assertEqual(self.var.get_all_players({"cursed villager"}), {self.players[2], self.players[5]})
+        del self.var.players[3]
+        self.assertEqual(self.var.get_players({"wolf"}), (self.players[1],))
+
+    def test_swap(self):
+        new = FakeUser.from_nick("new")
+        self.var.get_players()
+        self.players[2].swap(new)
+        self.assertIn(new, self.var.get_player_set())
+        self.assertIn(new, get_all_players(self.var, {"villager"}))
+        self.assertNotIn(self.players[2], self.var.get_players())
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+from antlr4 import InputStream, CommonTokenStream, ParseTreeWalker
+from src.messages import message_formatter, catalog
+from src.messages.compiler import compile_message, clear_cache
+from src.messages.lexer import Lexer
+from src.messages.listener import Listener, MessageErrorListener
+from src.messages.message import Message
+from src.messages.parser import Parser
+
+def format_antlr(message, args, kwargs):
+    error_listener = MessageErrorListener()
+    lexer = Lexer(message.key, InputStream(message.value))
+    lexer.addErrorListener(error_listener)
+    parser = Parser(message.key, CommonTokenStream(lexer))
+    parser.addErrorListener(error_listener)
+    tree = parser.main()
+    listener = Listener(message, args, kwargs)
+    ParseTreeWalker().walk(listener, tree)
+    return listener.value()
+
+class TestMessageCompiler(TestCase):
+    def assertSameOutput(self, value, *args, **kwargs):
+        message = Message("test", value)
+        self.assertEqual(message.format(*args, **kwargs), format_antlr(message, args, kwargs))
+
+    def test_literal(self):
+        self.assertSameOutput("")
+        self.assertSameOutput("no substitutions here")
+        self.assertSameOutput("escaped {{braces}} and [[brackets]]")
+
+    def test_sub(self):
+        self.assertSameOutput("{0} and {1}", "foo", "bar")
+        self.assertSameOutput("{name} says hi", name="foo")
+        self.assertSameOutput("{0[1]} {0[0]}", ["a", "b"])
+        self.assertSameOutput("{=literal} {=some,list:join}")
+
+    def test_convert_and_spec(self):
+        self.assertSameOutput("{0!role:bold}", "seer")
+        self.assertSameOutput("{0!role:article} {0!role}", "wolf")
+        self.assertSameOutput("{0!role:plural(2)}", "villager")
+        self.assertSameOutput("{0:join(!role:bold)}", ["seer", "wolf", "harlot"])
+        self.assertSameOutput("{0:sort_simple}", ["c", "a", "b"])
+        self.assertSameOutput("{0:>10}", "pad")
+
+    def test_nested_sub(self):
+        self.assertSameOutput("{0!role:plural({1})}", "wolf", ["a", "b", "c"])
+        self.assertSameOutput("{0!role:plural({1})}", "wolf", 1)
+        self.assertSameOutput("{={0},{1}:join}", "x", "y")
+
+    def test_tags(self):
+        self.assertSameOutput("[b]bold {0}[/b]", "text")
+        self.assertSameOutput("[if={0}]shown[/if][nif={0}]hidden[/nif]", True)
+        self.assertSameOutput("[if={0}]shown[/if][nif={0}]hidden[/nif]", 0)
+        self.assertSameOutput("[if={0} {1}]both[/if]", "a", "b")
+
+    def test_errors(self):
+        with self.assertRaises(RuntimeError):
+            compile_message("test", "{0")
+        with self.assertRaises(ValueError):
+            compile_message("test", "[b]mismatch[/if]")
+        with self.assertRaises(ValueError):
+            compile_message("test", "[nosuchtag]x[/nosuchtag]")
+
+    def test_cache(self):
+        clear_cache()
+        first = compile_message("test", "{0}")
+        self.assertIs(compile_message("test", "{0}"), first)
+        self.assertIsNot(compile_message("test", "{0}!"), first)
+        self.assertEqual(first.render(message_formatter, ("foo",), {}), "foo")
+
+class TestMessageCatalog(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        patcher = mock.patch.object(catalog, "CACHE_DIR", self.tempdir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.source = os.path.join(self.tempdir.name, "test.json")
+        self.missing = os.path.join(self.tempdir.name, "messages.json")
+        self.messages = {"_metadata": {}, "greeting": "hello {0}", "choices": ["a {0}", "b {0}"]}
+        with open(self.source, "w") as f:
+            json.dump(self.messages, f)
+
+    def test_build_errors(self):
+        templates, errors = catalog.build({"good": "{0}", "bad": "{0", "_ignored": "{"})
+        self.assertIn(("good", "{0}"), [t[:2] for t in templates])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith("bad: "))
+
+    def test_roundtrip(self):
+        self.assertIsNone(catalog.load("test"))
+        self.assertEqual(catalog.save("test", [self.source, self.missing], self.messages), [])
+        self.assertEqual(catalog.load("test"), self.messages)
+
+    def test_touched_source(self):
+        catalog.save("test", [self.source, self.missing], self.messages)
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(catalog.load("test"), self.messages)
+
+    def test_modified_source(self):
+        catalog.save("test", [self.source, self.missing], self.messages)
+        with open(self.source, "a") as f:
+            f.write("\n")
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNone(catalog.load("test"))
+
+    def test_created_source(self):
+        catalog.save("test", [self.source, self.missing], self.messages)
+        with open(self.missing, "w") as f:
+            f.write("{}")
+        self.assertIsNone(catalog.load("test"))
+
+    def test_version(self):
+        catalog.save("test", [self.source, self.missing], self.messages)
+        with mock.patch.object(catalog, "CACHE_VERSION", catalog.CACHE_VERSION + 1):
+            self.assertIsNone(catalog.load("test"))
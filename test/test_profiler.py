@@ -0,0 +1,66 @@
+import json
+import logging
+from unittest import TestCase
+from src import profiler
+from src.events import Event, EventListener, EVENT_CALLBACKS
+from src.logger import StructuredFormatter
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        profiler.reset()
+        self.listeners = [EventListener(lambda evt: None, listener_id="fast", priority=1),
+                          EventListener(lambda evt: sum(range(1000)), listener_id="slow", priority=2)]
+        for listener in self.listeners:
+            listener.install("profiled_event")
+
+    def tearDown(self):
+        profiler.disable()
+        profiler.reset()
+        for listener in self.listeners:
+            listener.remove("profiled_event")
+        EVENT_CALLBACKS.pop("profiled_event", None)
+
+    def test_disabled(self):
+        Event("profiled_event", {}).dispatch()
+        self.assertEqual(profiler.snapshot(), [])
+
+    def test_events(self):
+        profiler.enable()
+        for _ in range(5):
+            Event("profiled_event", {}).dispatch()
+        profiler.record("command", "stats", "", 2_000_000)
+        data = json.loads(profiler.dump())
+        self.assertTrue(data["enabled"])
+        events = {(t["name"], t["listener"]): t for t in data["timings"] if t["kind"] == "event"}
+        self.assertEqual(set(events), {("profiled_event", "fast"), ("profiled_event", "slow")})
+        self.assertEqual(events["profiled_event", "slow"]["calls"], 5)
+        for timing in events.values():
+            self.assertLessEqual(timing["p50_ms"], timing["p99_ms"])
+            self.assertLessEqual(timing["p99_ms"], timing["max_ms"])
+        self.assertEqual(profiler.snapshot("command"), [{"kind": "command", "name": "stats", "listener": None, "calls": 1,
+                                                         "total_ms": 2.0, "mean_ms": 2.0, "p50_ms": 2.0, "p99_ms": 2.0, "max_ms": 2.0}])
+
+    def test_sample_bounded(self):
+        for i in range(profiler.SAMPLE_SIZE * 2):
+            profiler.record("event", "x", "y", i)
+        entry = profiler.snapshot()[0]
+        self.assertEqual(entry["calls"], profiler.SAMPLE_SIZE * 2)
+        self.assertEqual(entry["max_ms"], (profiler.SAMPLE_SIZE * 2 - 1) / 1e6)
+
+    def test_log(self):
+        profiler.record("command", "stats", "", 1_000_000)
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger = logging.getLogger("debug.profiler")
+        logger.addHandler(handler)
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            profiler.log()
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+        formatter = StructuredFormatter({"enabled": False, "format": "", "utc": False})
+        obj = json.loads(formatter.format(records[0]))
+        self.assertEqual(obj["data"]["timings"][0]["name"], "stats")
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+from src import config, reaper, timers, users
+from src.users import BotUser
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestReaperDeadlines(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        users.Bot = BotUser(None, "bot", "bot", "bot.user", "bot")
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        patcher = patch.object(timers, "Main", timers.Scheduler(self.clock, threaded=False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.alice = users.add(None, nick="Alice", ident="alice", host="alice.host", account="alice")
+        self.bob = users.add(None, nick="Bob", ident="bob", host="bob.host", account="bob")
+        self.var = SimpleNamespace(current_phase="day", game_id=1, in_game=True, in_phase_transition=False)
+        patcher = patch.object(reaper, "get_players", lambda var: [self.alice, self.bob])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        reaper.start(self.var)
+
+    def tearDown(self):
+        reaper._clear()
+        for container in (reaper.LAST_SAID_TIME, reaper.DISCONNECTED, reaper.IDLE_WARNED, reaper.IDLE_WARNED_PM):
+            container.clear()
+        for user in list(users.users()):
+            users._unregister(user)
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        return reaper._pop_due(self.clock.now)
+
+    def test_idle_stages(self):
+        self.assertEqual(timers.Main.next_deadline(), 1180)
+        self.assertEqual(self.advance(179), ([], [], [], []))
+        reaper.LAST_SAID_TIME[self.bob] = self.clock.now
+        self.assertEqual(self.advance(1), ([self.alice], [], [], []))
+        self.assertEqual(self.advance(60), ([], [self.alice], [], []))
+        self.assertEqual(self.advance(59), ([], [], [], []))
+        self.assertEqual(self.advance(1), ([], [], [self.alice], []))
+        # bob spoke at 179 seconds, so his deadlines were pushed back
+        self.assertEqual(self.advance(58), ([], [], [], []))
+        self.assertEqual(self.advance(1), ([self.bob], [], [], []))
+
+    def test_night_pause(self):
+        get = config.Main.get
+        patcher = patch.object(config.Main, "get", lambda key: False if key == "gameplay.nightchat" else get(key))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.advance(100)
+        reaper.on_begin_night(None, self.var)
+        self.assertEqual(self.advance(500), ([], [], [], []))
+        reaper.on_begin_day(None, self.var)
+        self.assertEqual(timers.Main.next_deadline(), self.clock.now + 80)
+        self.assertEqual(self.advance(79), ([], [], [], []))
+        self.assertEqual(self.advance(1), ([self.alice, self.bob], [], [], []))
+
+    def test_disconnected(self):
+        reaper.mark_disconnected(self.var, self.alice, "part")
+        self.assertEqual(timers.Main.next_deadline(), 1030)
+        self.advance(10)
+        # rejoining and leaving again restarts the grace period
+        del reaper.DISCONNECTED[self.alice]
+        reaper.mark_disconnected(self.var, self.alice, "part")
+        self.assertEqual(self.advance(20), ([], [], [], []))
+        self.assertEqual(self.advance(10), ([], [], [], [(self.alice, "part")]))
+
+    def test_swap(self):
+        new_alice = users.add(None, nick="Alice_", ident="alice", host="alice.host", account="alice")
+        self.alice.swap(new_alice)
+        self.assertEqual(self.advance(180), ([new_alice, self.bob], [], [], []))
@@ -0,0 +1,25 @@
+from unittest import TestCase
+from unittest.mock import patch
+from src import relay, users
+from src.messages import messages
+from src.users import BotUser
+
+class TestRelayFanOut(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        users.Bot = BotUser(None, "bot", "bot", "bot.user", "bot")
+
+    def setUp(self):
+        self.wolves = [users.add(None, nick="wolf{0}".format(i), ident="wolf", host="wolf{0}.host".format(i)) for i in range(3)]
+        self.spectator = users.add(None, nick="spec", ident="spec", host="spec.host")
+
+    def tearDown(self):
+        users.User._messages.clear()
+        for user in list(users.users()):
+            users._unregister(user)
+
+    def test_format_once(self):
+        with patch.object(type(messages["relay_message"]), "format", autospec=True, side_effect=lambda msg, *args: msg.key) as fmt:
+            relay._fan_out(self.wolves[0], "relay_message", "hi", self.wolves[1:], [self.spectator], "relay_message_wolfchat")
+        self.assertEqual(fmt.call_count, 2)
+        self.assertEqual(dict(users.User._messages), {"relay_message": self.wolves[1:], "relay_message_wolfchat": [self.spectator]})
@@ -0,0 +1,95 @@
+import itertools
+import random
+from collections import Counter
+from unittest import TestCase
+from src.rolestats import RoleStats
+
+def legacy_start(fixed, role_sets):
+    # the previous implementation from pregame.start
+    possible_rolesets = [Counter(fixed)]
+    for rs, amt in role_sets:
+        rs = Counter(rs)
+        for r in rs:
+            for pr in possible_rolesets:
+                pr[r] += 0
+        temp_rolesets = []
+        for c in itertools.combinations(rs.elements(), amt):
+            for pr in possible_rolesets:
+                temp = Counter(pr)
+                temp.update(Counter(c))
+                temp_rolesets.append(temp)
+        possible_rolesets = temp_rolesets
+    return {frozenset(pr.items()) for pr in possible_rolesets}
+
+def legacy_remove(stats, possible):
+    newstats = set()
+    for p in possible:
+        for rs in stats:
+            d = Counter(dict(rs))
+            if p in d and d[p] >= 1:
+                d[p] -= 1
+                newstats.add(frozenset(d.items()))
+    return newstats
+
+def legacy_convert(stats, old, new):
+    newstats = set()
+    for rs in stats:
+        d = Counter(dict(rs))
+        newstats.add(rs)
+        if old in d and d[old] >= 1:
+            d[old] -= 1
+            d[new] += 1
+            newstats.add(frozenset(d.items()))
+    return newstats
+
+class TestRoleStats(TestCase):
+    def test_from_role_sets(self):
+        fixed = {"wolf": 2, "seer": 1, "villager": 5}
+        role_sets = [({"gunner": 4, "sharpshooter": 1}, 2), ({"wolf": 1, "traitor": 1, "cursed villager": 2}, 3)]
+        stats = RoleStats.from_role_sets(fixed, role_sets)
+        self.assertEqual(stats.as_frozensets(), legacy_start(fixed, role_sets))
+        self.assertEqual(stats.ranges(), {"wolf": (2, 3), "seer": (1, 1), "villager": (5, 5), "gunner": (1, 2),
+                                          "sharpshooter": (0, 1), "traitor": (0, 1), "cursed villager": (1, 2)})
+
+    def test_remove_one(self):
+        stats = RoleStats([{"wolf": 1, "traitor": 1, "villager": 2}, {"wolf": 2, "traitor": 0, "villager": 2}])
+        stats = stats.remove_one({"traitor", "villager"})
+        self.assertEqual(stats.ranges(), {"wolf": (1, 2), "traitor": (0, 1), "villager": (1, 2)})
+        self.assertEqual(len(stats), 3)
+        stats = stats.remove_one({"seer"})
+        self.assertFalse(stats)
+
+    def test_convert_one(self):
+        stats = RoleStats([{"seer": 1, "villager": 2}, {"seer": 0, "villager": 3}])
+        stats = stats.convert_one("seer", "doomsayer")
+        self.assertEqual(stats.ranges(), {"seer": (0, 1), "villager": (2, 3), "doomsayer": (0, 1)})
+        self.assertEqual(len(stats), 3)
+
+    def test_transform(self):
+        stats = RoleStats([{"wolf cub": 1, "wolf": 1}, {"wolf cub": 2, "wolf": 0}])
+
+        def func(rs):
+            if rs["wolf"] == 0:
+                rs["wolf"], rs["wolf cub"] = rs["wolf cub"], 0
+            return [rs, Counter({"wolf": -1})]
+
+        stats = stats.transform(func)
+        self.assertEqual(stats.as_frozensets(), {frozenset({("wolf cub", 1), ("wolf", 1)}), frozenset({("wolf cub", 0), ("wolf", 2)})})
+
+    def test_random_sequences(self):
+        rng = random.Random(7)
+        roles = ["wolf", "traitor", "seer", "villager", "gunner", "sharpshooter", "cursed villager"]
+        for _ in range(50):
+            fixed = {role: rng.randrange(4) for role in roles}
+            role_sets = [({role: rng.randrange(1, 4) for role in rng.sample(roles, 3)}, rng.randrange(1, 3)) for _ in range(2)]
+            stats = RoleStats.from_role_sets(fixed, role_sets)
+            legacy = legacy_start(fixed, role_sets)
+            self.assertEqual(stats.as_frozensets(), legacy)
+            for _ in range(6):
+                if rng.random() < 0.8:
+                    possible = set(rng.sample(roles, rng.randrange(1, 4)))
+                    stats, legacy = stats.remove_one(possible), legacy_remove(legacy, possible)
+                else:
+                    old, new = rng.sample(roles, 2)
+                    stats, legacy = stats.convert_one(old, new), legacy_convert(legacy, old, new)
+                self.assertEqual(stats.as_frozensets(), legacy)
@@ -0,0 +1,94 @@
+from unittest import TestCase
+from oyoyo.scheduler import OutboundScheduler, Priority
+from src.context import IRCFeatures
+
+class TestOutboundScheduler(TestCase):
+    def setUp(self):
+        self.max_length = 50
+        self.max_targets = {"PRIVMSG": 2, "NOTICE": 1}
+        self.queue = OutboundScheduler(lambda head: self.max_length, lambda command: self.max_targets[command])
+
+    def push(self, *lines, priority=Priority.INTERACTIVE):
+        for line in lines:
+            self.queue.push(line.encode(), priority)
+
+    def drain(self):
+        lines = []
+        while self.queue:
+            lines.append(self.queue.pop().decode().rstrip("\r\n"))
+        self.assertIsNone(self.queue.pop())
+        return lines
+
+    def test_priority(self):
+        self.push("PRIVMSG #chan :relay", priority=Priority.RELAY)
+        self.push("WHO #chan", priority=Priority.BACKGROUND)
+        self.push("MODE #chan +v foo")
+        self.push("PONG :server", priority=Priority.CRITICAL)
+        self.assertEqual(self.drain(), ["PONG :server", "MODE #chan +v foo", "PRIVMSG #chan :relay", "WHO #chan"])
+
+    def test_priority_same_target(self):
+        # the night announcement must not overtake the lynch announcement queued before it
+        self.push("PRIVMSG #chan :lynched", "PRIVMSG alice :reply", "PRIVMSG #chan :" + "x" * 45)
+        self.push("PRIVMSG bob :role", "PRIVMSG #chan :night", priority=Priority.CRITICAL)
+        self.assertEqual(self.drain(), ["PRIVMSG #chan :lynched", "PRIVMSG #chan :" + "x" * 45, "PRIVMSG bob :role",
+                                        "PRIVMSG #chan :night", "PRIVMSG alice :reply"])
+        stats = self.queue.stats()
+        self.assertEqual(stats[Priority.CRITICAL]["lines"], 4)
+        self.assertEqual(stats[Priority.INTERACTIVE]["lines"], 1)
+
+    def test_priority_promote_targets(self):
+        # promoting a line sent to several targets also promotes what is queued before it for those targets
+        self.push("PRIVMSG bob :first", priority=Priority.RELAY)
+        self.push("PRIVMSG alice :hi", "PRIVMSG bob :hi")
+        self.push("PRIVMSG carol :other")
+        self.push("PRIVMSG alice :now", priority=Priority.CRITICAL)
+        self.assertEqual(self.drain(), ["PRIVMSG bob :first", "PRIVMSG alice,bob :hi", "PRIVMSG alice :now", "PRIVMSG carol :other"])
+        self.push("PRIVMSG alice :one", priority=Priority.RELAY)
+        self.push("PRIVMSG bob :two", "PRIVMSG alice :two")
+        # alice can join bob's line, but only once "one" is sent before it
+        self.assertEqual(self.drain(), ["PRIVMSG alice :one", "PRIVMSG bob,alice :two"])
+
+    def test_coalesce_target(self):
+        self.push("PRIVMSG alice :one", "PRIVMSG bob :two", "PRIVMSG alice :three", "NOTICE alice :four")
+        self.assertEqual(self.drain(), ["PRIVMSG alice :one | three", "PRIVMSG bob :two", "NOTICE alice :four"])
+
+    def test_coalesce_limit(self):
+        self.push("PRIVMSG alice :" + "a" * 30, "PRIVMSG alice :" + "b" * 30, "PRIVMSG alice :c")
+        self.assertEqual(self.drain(), ["PRIVMSG alice :" + "a" * 30, "PRIVMSG alice :" + "b" * 30 + " | c"])
+
+    def test_no_coalesce(self):
+        self.push("PRIVMSG alice :one", "PRIVMSG alice :two", priority=Priority.CRITICAL)
+        self.push("PRIVMSG alice :\x01ACTION waves\x01", "PRIVMSG alice :three")
+        self.assertEqual(self.drain(), ["PRIVMSG alice :one", "PRIVMSG alice :two",
+                                        "PRIVMSG alice :\x01ACTION waves\x01", "PRIVMSG alice :three"])
+        self.queue.coalesce = False
+        self.push("PRIVMSG alice :one", "PRIVMSG alice :two")
+        self.assertEqual(self.drain(), ["PRIVMSG alice :one", "PRIVMSG alice :two"])
+
+    def test_coalesce_targets(self):
+        self.push("PRIVMSG alice :hi", "PRIVMSG bob :hi", "PRIVMSG carol :hi", "NOTICE alice :hi", "NOTICE bob :hi")
+        self.assertEqual(self.drain(), ["PRIVMSG alice,bob :hi", "PRIVMSG carol :hi", "NOTICE alice :hi", "NOTICE bob :hi"])
+
+    def test_coalesce_order(self):
+        # bob must not receive "hi" before "first", so he can't be added to alice's line
+        self.push("PRIVMSG alice :hi", "PRIVMSG bob :first", "PRIVMSG bob :hi")
+        self.assertEqual(self.drain(), ["PRIVMSG alice :hi", "PRIVMSG bob :first | hi"])
+        self.push("CPRIVMSG alice #chan :one", "CPRIVMSG alice #other :two", "CPRIVMSG alice #chan :three")
+        self.assertEqual(self.drain(), ["CPRIVMSG alice #chan :one | three", "CPRIVMSG alice #other :two"])
+
+    def test_stats(self):
+        self.push("PRIVMSG alice :one", "PRIVMSG alice :two", "PRIVMSG bob :three")
+        stats = self.queue.stats()[Priority.INTERACTIVE]
+        self.assertEqual((stats["queued"], stats["messages"], stats["coalesced"], stats["sent"]), (2, 3, 1, 0))
+        self.drain()
+        stats = self.queue.stats()[Priority.INTERACTIVE]
+        self.assertEqual((stats["queued"], stats["sent"], stats["lines"]), (0, 3, 2))
+        self.assertGreaterEqual(stats["max_wait"], stats["wait"])
+
+    def test_targmax(self):
+        features = IRCFeatures()
+        features._features = {}
+        features.TARGMAX = "PRIVMSG:4,NOTICE:,JOIN:"
+        self.assertEqual(features.TARGMAX["PRIVMSG"], 4)
+        self.assertGreater(features.TARGMAX["notice"], 1000)
+        self.assertEqual(features.TARGMAX["KICK"], 1)
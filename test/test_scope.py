@@ -0,0 +1,206 @@
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+from src import channels, gamejoin, scope, users
+from src.decorators import COMMANDS
+from src.gamemodes.boreal import BorealMode
+from src.messages import messages
+from src.containers import UserDict, UserList, UserSet
+from src.gamestate import PregameState
+from src.timers import Scheduler
+from src.users import FakeUser, BotUser
+
+class FakeChannel:
+    def __init__(self, name):
+        self.name = name
+        self.game_state = None
+
+    def __format__(self, format_spec):
+        return self.name
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+COUNTER = 0
+
+class TestScope(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        users.Bot = BotUser(None, "bot", "bot", "bot.user", "bot")
+
+    def setUp(self):
+        self.saved = {name: getattr(scope, name) for name in
+                      ("_channels", "_current", "_containers", "_globals", "_saved", "_index", "_index_key", "_depth")}
+        self.main = channels.Main
+        scope._channels = []
+        scope._current = None
+        scope._containers = []
+        scope._globals = []
+        scope._saved = {}
+        scope._index = {}
+        scope._index_key = ()
+        scope._depth = 0
+        self.first = FakeChannel("#first")
+        self.second = FakeChannel("#second")
+        scope.add_channel(self.first)
+        scope.add_channel(self.second)
+
+    def tearDown(self):
+        global COUNTER
+        COUNTER = 0
+        for name, value in self.saved.items():
+            setattr(scope, name, value)
+        channels.Main = self.main
+
+    def test_add_channel(self):
+        scope.add_channel(self.first)
+        self.assertEqual(scope.game_channels(), [self.first, self.second])
+        self.assertIs(scope.current(), self.first)
+        self.assertTrue(scope.is_game_channel(self.second))
+        self.assertFalse(scope.is_game_channel(FakeChannel("#first")))
+
+    def test_switch_user_containers(self):
+        user = FakeUser.from_nick("1")
+        targets = UserDict()
+        seen = UserSet()
+        scope.register(targets, seen)
+        targets[user] = user
+        seen.add(user)
+        with scope.enter(self.second):
+            self.assertIs(channels.Main, self.second)
+            self.assertEqual(len(targets), 0)
+            self.assertEqual(len(seen), 0)
+            seen.add(user)
+        self.assertIs(scope.current(), self.second)
+        with scope.enter(self.first):
+            self.assertIs(targets[user], user)
+            self.assertIn(user, seen)
+            seen.clear()
+        with scope.enter(self.second):
+            self.assertIn(user, seen)
+            self.assertEqual(len(targets), 0)
+
+    def test_swap_inactive(self):
+        # a dead player or spectator changing nicks is handled with another channel active
+        old, new, other = FakeUser.from_nick("old"), FakeUser.from_nick("new"), FakeUser.from_nick("other")
+        targets = UserDict()
+        dead = UserSet()
+        order = UserList()
+        scope.register(targets, dead, order)
+        targets[old] = other
+        targets[other] = old
+        dead.add(old)
+        order.extend([other, old])
+        with scope.enter(self.second):
+            old.swap(new)
+        with scope.enter(self.first):
+            self.assertEqual(dict(targets), {new: other, other: new})
+            self.assertEqual(set(dead), {new})
+            self.assertEqual(list(order), [other, new])
+            self.assertFalse(old.dict_keys or old.dict_values or old.sets or old.lists)
+            targets.clear()
+            dead.clear()
+            order.clear()
+
+    def test_switch_plain_containers(self):
+        counts = {"a": 1}
+        order = []
+        scope.register(counts, order)
+        counts["b"] = 2
+        order.append("x")
+        with scope.enter(self.second):
+            self.assertEqual(counts, {"a": 1})
+            self.assertEqual(order, [])
+            counts["c"] = 3
+        with scope.enter(self.first):
+            self.assertEqual(counts, {"a": 1, "b": 2})
+            self.assertEqual(order, ["x"])
+        with scope.enter(self.second):
+            self.assertEqual(counts, {"a": 1, "c": 3})
+
+    def test_switch_globals(self):
+        global COUNTER
+        scope.register_globals(__name__, "COUNTER")
+        COUNTER = 5
+        with scope.enter(self.second):
+            self.assertEqual(COUNTER, 0)
+            COUNTER = 7
+        with scope.enter(self.first):
+            self.assertEqual(COUNTER, 5)
+        with scope.enter(self.second):
+            self.assertEqual(COUNTER, 7)
+
+    def test_nested_enter(self):
+        with scope.enter(self.first):
+            with scope.enter(self.second):
+                self.assertIs(scope.current(), self.second)
+            self.assertIs(scope.current(), self.first)
+            with scope.enter(None):
+                self.assertIs(scope.current(), self.first)
+
+    def test_resolve(self):
+        other = FakeChannel("#other")
+        self.assertIs(scope.resolve(self.second), self.second)
+        self.assertIs(scope.resolve(other), self.first)
+        self.assertIs(scope.resolve(), self.first)
+        scope._channels = []
+        self.assertIsNone(scope.resolve(other))
+
+    def test_timer_names(self):
+        timers = Scheduler(VirtualClock(), threaded=False)
+        calls = []
+        timers.add(10, lambda: calls.append(scope.current()), name="day_limit")
+        with scope.enter(self.second):
+            self.assertNotIn("day_limit", timers)
+            timers.add(5, lambda: calls.append(scope.current()), name="day_limit")
+            self.assertIn("day_limit", timers)
+        with scope.enter(self.first):
+            timers.cancel("day_limit")
+            self.assertNotIn("day_limit", timers)
+        timers.clock.now += 20
+        self.assertEqual(timers.run_pending(), 1)
+        self.assertEqual(calls, [self.second])
+
+    def test_mode_overrides(self):
+        original = messages.messages["lynch_reveal"]
+        first, second = BorealMode(), BorealMode()
+        first.startup()
+        self.first.game_state = SimpleNamespace(current_mode=first)
+        self.assertNotEqual(messages.messages["lynch_reveal"], original)
+        with scope.enter(self.second):
+            # the other game's messages and commands don't apply here
+            self.assertEqual(messages.messages["lynch_reveal"], original)
+            self.assertNotIn(first.feed_command, COMMANDS["feed"])
+            second.startup()
+            self.second.game_state = SimpleNamespace(current_mode=second)
+        with scope.enter(self.first):
+            self.assertIn(first.feed_command, COMMANDS["feed"])
+            self.assertNotIn(second.feed_command, COMMANDS["feed"])
+            first.teardown()
+            self.first.game_state = None
+            self.assertEqual(messages.messages["lynch_reveal"], original)
+        with scope.enter(self.second):
+            self.assertNotEqual(messages.messages["lynch_reveal"], original)
+            second.teardown()
+            self.second.game_state = None
+        self.assertEqual(messages.messages["lynch_reveal"], original)
+        self.assertNotIn(second.feed_command, COMMANDS["feed"])
+
+    def test_join_other_channel(self):
+        user = FakeUser.from_nick("1")
+        self.first.game_state = PregameState()
+        self.first.game_state.players.append(user)
+        try:
+            self.assertIs(scope.channel_of(user), self.first)
+            with scope.enter(self.second), patch.object(FakeUser, "send") as send:
+                wrapper = SimpleNamespace(source=user, game_state=self.second.game_state)
+                self.assertFalse(gamejoin._join_player(wrapper, user))
+                send.assert_called_once_with("You're already playing in #first!", notice=True)
+                self.assertIsNone(self.second.game_state)
+            self.assertIs(scope.channel_of(user), self.first)
+        finally:
+            self.first.game_state.players.clear()
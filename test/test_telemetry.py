@@ -0,0 +1,122 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+from unittest.mock import patch
+from src import config
+from src.debug import decorators
+
+class StandIn(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append(body["c"])
+        if len(server.requests) <= server.failures:
+            self.send_response(500)
+            self.end_headers()
+            return
+        data = json.dumps({"url": "https://paste.example/{0}".format(len(server.requests))}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestErrorUploader(TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), StandIn)
+        self.server.requests = []
+        self.server.failures = 0
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        endpoint = "http://127.0.0.1:{0}/submit".format(self.server.server_port)
+        get = config.Main.get
+        for patcher in (patch.object(config.Main, "get", lambda key: endpoint if key == "telemetry.errors.endpoint" else get(key)),
+                        patch.object(decorators, "_tracebacks", OrderedDict()),
+                        patch.object(decorators, "UPLOAD_BACKOFF", 0.01)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.uploader = decorators._Uploader()
+        self.logger = logging.getLogger("test.telemetry")
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, "propagate", True)
+
+    def test_upload(self):
+        with self.assertLogs(self.logger, logging.ERROR) as logs:
+            self.assertTrue(self.uploader.submit("key", "traceback", self.logger))
+            self.uploader.join()
+        self.assertEqual(self.server.requests, ["traceback"])
+        self.assertEqual(decorators._tracebacks, {"key": "https://paste.example/1"})
+        self.assertIn("https://paste.example/1", logs.output[0])
+
+    def test_cache_recently_used(self):
+        with patch.object(decorators, "TRACEBACK_CACHE_SIZE", 2):
+            decorators._add_link("a", "https://paste.example/a")
+            decorators._add_link("b", "https://paste.example/b")
+            self.assertEqual(decorators._get_link("a"), "https://paste.example/a")
+            decorators._add_link("c", "https://paste.example/c")
+        # b was used least recently, so it is evicted rather than a
+        self.assertEqual(list(decorators._tracebacks), ["a", "c"])
+        self.assertIsNone(decorators._get_link("b"))
+
+    def test_retry(self):
+        self.server.failures = 2
+        with self.assertLogs(self.logger, logging.ERROR):
+            self.uploader.submit("key", "traceback", self.logger)
+            self.uploader.join()
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(decorators._tracebacks, {"key": "https://paste.example/3"})
+
+    def test_give_up(self):
+        self.server.failures = decorators.UPLOAD_ATTEMPTS
+        with self.assertLogs(self.logger, logging.ERROR) as logs:
+            self.uploader.submit("key", "traceback", self.logger)
+            self.uploader.join()
+        self.assertEqual(decorators._tracebacks, {})
+        self.assertIsNotNone(logs.records[0].paste_error)
+
+    def test_dedupe_pending(self):
+        with patch.object(decorators, "_upload", return_value="https://paste.example/x") as upload:
+            # hold the worker so both submissions are pending at once
+            gate = threading.Event()
+            upload.side_effect = lambda contents: gate.wait() and "https://paste.example/x"
+            with self.assertLogs(self.logger, logging.ERROR):
+                self.uploader.submit("key", "traceback", self.logger)
+                self.uploader.submit("key", "traceback", self.logger)
+                gate.set()
+                self.uploader.join()
+        self.assertEqual(upload.call_count, 1)
+
+    def test_queue_full(self):
+        gate = threading.Event()
+        with patch.object(decorators, "UPLOAD_QUEUE_SIZE", 1), patch.object(decorators, "_upload", side_effect=lambda c: gate.wait() and "x"):
+            uploader = decorators._Uploader()
+            with self.assertLogs(self.logger, logging.ERROR):
+                self.assertTrue(uploader.submit("a", "a", self.logger))
+                # wait for the worker to take the first upload off the queue
+                while uploader._queue.qsize():
+                    pass
+                self.assertTrue(uploader.submit("b", "b", self.logger))
+                self.assertFalse(uploader.submit("c", "c", self.logger))
+                gate.set()
+                uploader.join()
+
+    def test_print_traceback(self):
+        get = config.Main.get
+        with patch.object(config.Main, "get", lambda key: False if key == "debug.enabled" else get(key)), \
+             patch.object(decorators, "_uploader") as uploader, self.assertLogs("exception", logging.ERROR):
+            for _ in range(2):
+                with decorators.print_traceback():
+                    raise ValueError("oops")
+        self.assertEqual(uploader.submit.call_count, 2)
+        (key1, contents, _), (key2, _, _) = [args for args, kwargs in uploader.submit.call_args_list]
+        self.assertEqual(key1, key2)
+        self.assertIn("ValueError", contents)
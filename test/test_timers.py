@@ -0,0 +1,93 @@
+import threading
+from unittest import TestCase
+from src.timers import Scheduler
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestScheduler(TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.timers = Scheduler(self.clock, threaded=False)
+        self.calls = []
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        return self.timers.run_pending()
+
+    def test_phase_timeout(self):
+        # mirrors how begin_day schedules its warning and limit
+        self.timers.add(90, self.calls.append, "warn", name="day_warn", game_id=1)
+        self.timers.add(120, self.calls.append, "limit", name="day_limit", game_id=1)
+        self.assertEqual(self.advance(89), 0)
+        self.assertEqual(self.timers.remaining("day_warn"), 1)
+        self.assertEqual(self.advance(1), 1)
+        self.assertEqual(self.calls, ["warn"])
+        self.assertNotIn("day_warn", self.timers)
+        self.assertEqual(self.timers.remaining("day_limit"), 30)
+        self.advance(1000)
+        self.assertEqual(self.calls, ["warn", "limit"])
+        self.assertIsNone(self.timers.remaining("day_limit"))
+        self.assertIsNone(self.timers.next_deadline())
+
+    def test_order(self):
+        self.timers.add(3, self.calls.append, "c")
+        self.timers.add(1, self.calls.append, "a")
+        self.timers.add(2, self.calls.append, "b")
+        self.timers.add(2, self.calls.append, "b2")
+        self.assertEqual(self.advance(5), 4)
+        self.assertEqual(self.calls, ["a", "b", "b2", "c"])
+
+    def test_cancel(self):
+        timer = self.timers.add(10, self.calls.append, "handle")
+        self.timers.add(10, self.calls.append, "named", name="night_limit")
+        timer.cancel()
+        self.timers.cancel("night_limit", "not_a_timer")
+        self.assertFalse(timer.active)
+        self.assertEqual(timer.remaining, 0)
+        self.assertEqual(self.advance(20), 0)
+        self.assertEqual(self.calls, [])
+
+    def test_replace(self):
+        old = self.timers.add(10, self.calls.append, "old", name="join_pinger")
+        self.advance(5)
+        new = self.timers.add(10, self.calls.append, "new", name="join_pinger")
+        self.assertFalse(old.active)
+        self.assertIs(self.timers.get("join_pinger"), new)
+        self.advance(5)
+        self.assertEqual(self.calls, [])
+        self.advance(5)
+        self.assertEqual(self.calls, ["new"])
+
+    def test_cancel_game(self):
+        self.timers.add(10, self.calls.append, "game 1", name="join", game_id=1)
+        self.timers.add(10, self.calls.append, "game 1 unnamed", game_id=1)
+        self.timers.add(10, self.calls.append, "game 2", game_id=2)
+        self.timers.add(10, self.calls.append, "global", name="server_ping")
+        self.timers.cancel_game(1)
+        self.assertNotIn("join", self.timers)
+        self.advance(10)
+        self.assertEqual(sorted(self.calls), ["game 2", "global"])
+
+    def test_reschedule_from_callback(self):
+        def ping():
+            self.calls.append(self.clock())
+            if len(self.calls) < 3:
+                self.timers.add(60, ping, name="server_ping")
+
+        self.timers.add(60, ping, name="server_ping")
+        for _ in range(5):
+            self.advance(60)
+        self.assertEqual(self.calls, [1060, 1120, 1180])
+
+    def test_thread(self):
+        timers = Scheduler()
+        done = threading.Event()
+        timers.add(0.05, done.set)
+        timers.add(0.01, self.calls.append, "first")
+        self.assertTrue(done.wait(5))
+        self.assertEqual(self.calls, ["first"])
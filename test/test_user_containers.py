@@ -83,3 +83,46 @@ class TestUserContainers(TestCase):
         self.assertIn(value, user1.sets)
         self.assertNotIn(value, user2.sets)
         self.assertEqual(str(value), "UserSet(1)")
+
+    def test_list_duplicates(self):
+        user = FakeUser.from_nick("1")
+        value = UserList([user, user])
+        value.remove(user)
+        self.assertIn(value, user.lists)
+        value.pop()
+        self.assertNotIn(value, user.lists)
+
+    def test_list_setitem(self):
+        user1 = FakeUser.from_nick("1")
+        user2 = FakeUser.from_nick("2")
+        value = UserList([user1, user1])
+        value[0] = user2
+        self.assertIn(value, user1.lists)
+        self.assertIn(value, user2.lists)
+        value[1] = user2
+        self.assertNotIn(value, user1.lists)
+        value.clear()
+        self.assertNotIn(value, user2.lists)
+
+    def test_dict_values(self):
+        user1 = FakeUser.from_nick("1")
+        user2 = FakeUser.from_nick("2")
+        value = UserDict({"a": user1, "b": user1})
+        value["a"] = user2
+        self.assertIn(value, user1.dict_values)
+        del value["b"]
+        self.assertNotIn(value, user1.dict_values)
+        self.assertIs(value.pop("c", user1), user1)
+        self.assertNotIn(value, user1.dict_values)
+        value.pop("a")
+        self.assertNotIn(value, user2.dict_values)
+
+    def test_swap(self):
+        user1 = FakeUser.from_nick("1")
+        user2 = FakeUser.from_nick("2")
+        lst, st, dct = UserList([user1, user2, user1]), UserSet([user1]), UserDict({user1: user1, user2: user1})
+        user1.swap(user2)
+        self.assertEqual(list(lst), [user2, user2, user2])
+        self.assertEqual(set(st), {user2})
+        self.assertEqual(dict(dct), {user2: user2})
+        self.assertFalse(user1.lists or user1.sets or user1.dict_keys or user1.dict_values)
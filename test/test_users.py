@@ -0,0 +1,111 @@
+from unittest import TestCase
+from unittest.mock import patch
+from src import users
+from src.context import Features, NotLoggedIn, lower
+from src.users import BotUser
+
+class TestUserRegistry(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # set up a mock BotUser
+        users.Bot = BotUser(None, "bot", "bot", "bot.user", "bot")
+
+    def tearDown(self):
+        for user in list(users.users()):
+            users._unregister(user)
+
+    def add(self, nick, ident, host, account=NotLoggedIn):
+        return users.add(None, nick=nick, ident=ident, host=host, account=account)
+
+    def assertIndexed(self):
+        # every registered user must be findable through the indexes, and nothing else may be in them
+        indexed = set()
+        for index in (users._nick_index, users._mask_index):
+            for bucket in index.values():
+                indexed.update(bucket)
+        self.assertSetEqual(indexed, set(users.users()))
+
+    def test_get_by_nick(self):
+        alice = self.add("Alice", "alice", "alice.host")
+        self.add("Bob", "bob", "bob.host")
+        self.assertIs(users.get("Alice"), alice)
+        self.assertIsNone(users.get("alice", allow_none=True))
+        self.assertIs(users.get("Alice!alice@alice.host"), alice)
+        users.get("alice!alice@alice.host", update=True)
+        self.assertIsNone(users.get("Alice", allow_none=True))
+        self.assertEqual(users.get("alice").host, "alice.host")
+        self.assertIndexed()
+
+    def test_get_by_account(self):
+        alice = self.add("Alice", "alice", "alice.host", "AliceAcct")
+        self.add("Bob", "bob", "bob.host", "BobAcct")
+        self.assertIs(users.get(account="AliceAcct"), alice)
+        self.assertEqual(users.get(account="Nobody", allow_multiple=True), [])
+
+    def test_get_multiple(self):
+        first = self.add("Alice", "alice", "first.host")
+        second = self.add("Alice", "alice", "second.host")
+        self.assertSetEqual(set(users.get("Alice", allow_multiple=True)), {first, second})
+        self.assertRaises(ValueError, users.get, "Alice")
+        self.assertIs(users.get("Alice", "alice", "second.host"), second)
+
+    def test_add_existing(self):
+        alice = self.add("Alice", "alice", "alice.host")
+        self.assertIs(self.add("Alice", "alice", "alice.host"), alice)
+        self.assertEqual(len(list(users.users())), 1)
+
+    def test_swap(self):
+        alice = self.add("Alice", "alice", "alice.host", "AliceAcct")
+        alice.nick = "Carol"
+        carol = users.get("Carol")
+        self.assertIsNot(carol, alice)
+        self.assertIsNone(users.get("Alice", allow_none=True))
+        carol.account = "CarolAcct"
+        self.assertIsNone(users.get(account="AliceAcct", allow_none=True))
+        self.assertEqual(users.get(account="CarolAcct").nick, "Carol")
+        self.assertIndexed()
+
+    def test_partial_user(self):
+        alice = self.add("Alice", "alice", "alice.host")
+        self.assertIs(users.User(None, "Alice", None, None, None), alice)
+
+    def test_complete_match(self):
+        self.add("Alice", "alice", "alice.host")
+        self.add("Alicia", "alicia", "alicia.host")
+        self.assertEqual(users.complete_match("alice").get().nick, "Alice")
+        self.assertEqual(len(users.complete_match("ali")), 2)
+
+class TestLoweredIdentity(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        users.Bot = BotUser(None, "bot", "bot", "bot.user", "bot")
+
+    def tearDown(self):
+        for user in list(users.users()):
+            users._unregister(user)
+
+    def test_casemappings(self):
+        self.assertEqual(lower("[Foo]^"), "{foo}~")
+        self.assertEqual(lower("[Foo]^", casemapping="strict-rfc1459"), "{foo}^")
+        self.assertEqual(lower("[Foo]^", casemapping="ascii"), "[foo]^")
+        with patch.dict(Features._features, {"CASEMAPPING": "rfc1459-strict"}):
+            self.assertEqual(Features.CASEMAPPING, "strict-rfc1459")
+            self.assertEqual(lower("[Foo]^"), "{foo}^")
+
+    def test_cached(self):
+        user = users.add(None, nick="[Alice]", ident="Alice", host="Alice.Host", account="Alice^")
+        before = len(list(users.users()))
+        self.assertEqual(user.lowered, ("{alice}", "alice", "alice.host", "alice~"))
+        self.assertIs(user.lowered, user.lowered)
+        self.assertEqual(len(list(users.users())), before)
+        with patch.dict(Features._features, {"CASEMAPPING": "ascii"}):
+            self.assertEqual(user.lowered.nick, "[alice]")
+        self.assertEqual(user.lowered.nick, "{alice}")
+
+    def test_swap(self):
+        user = users.add(None, nick="Alice", ident="alice", host="alice.host")
+        self.assertEqual(user.lowered.nick, "alice")
+        user.nick = "Alice_"
+        new = users.get("Alice_")
+        self.assertEqual(new.lowered.nick, "alice_")
+        self.assertIsNone(user._lowered)
@@ -21,6 +21,7 @@ import traceback
 import sys
 import os
 import argparse
+import importlib.util
 import logging
 from pathlib import Path
 
@@ -31,9 +32,11 @@ if ver < (3, 7):
     sys.exit(1)
 
 try: # need to manually add dependencies here
-    import antlr4
     import requests
     import ruamel.yaml
+    # antlr4 is only imported when messages need to be compiled, which usually doesn't happen on startup
+    if importlib.util.find_spec("antlr4") is None:
+        raise ImportError("antlr4")
 except ImportError:
     command = "python3"
     if os.name == "nt":
@@ -73,6 +76,7 @@ if args.config:
 from oyoyo.client import IRCClient, TokenBucket
 
 from src import handler, config
+from src.context import Features
 
 def main():
     # fetch IRC transport
@@ -144,6 +148,8 @@ def main():
             config.Main.get("transports[0].flood.max_burst"),
             config.Main.get("transports[0].flood.sustained_rate"),
             init=config.Main.get("transports[0].flood.initial_burst")),
+        coalesce=config.Main.get("transports[0].flood.coalesce"),
+        max_targets=lambda command: Features.TARGMAX[command],
         connect_cb=handler.connect_callback,
         stream_handler=stream_handler,
     )